@@ -4,6 +4,8 @@ import os
 import matplotlib.pyplot as plt
 import numpy as np
 
+from fitting import chi_squared_from, model_data_from
+
 
 class Analysis(af.Analysis):
     def __init__(self, data, noise_map):
@@ -13,6 +15,12 @@ class Analysis(af.Analysis):
         self.data = data
         self.noise_map = noise_map
 
+        """
+        The x-values and inverse noise-map do not change during the model-fit, so we compute them once here.
+        """
+        self.xvalues = np.arange(self.data.shape[0])
+        self.inverse_noise_map = 1.0 / self.noise_map
+
     def log_likelihood_function(self, instance):
         """
         Determine the log likelihood of a fit of multiple profiles to the dataset.
@@ -32,15 +40,14 @@ class Analysis(af.Analysis):
         which in this example is a `Gaussian` (with name `gaussian) and Exponential (with name `exponential`):
         """
 
-        xvalues = np.arange(self.data.shape[0])
+        model_data = model_data_from(instance=instance, xvalues=self.xvalues)
 
-        model_data = sum(
-            [line.profile_from_xvalues(xvalues=xvalues) for line in instance]
+        chi_squared = chi_squared_from(
+            data=self.data,
+            model_data=model_data,
+            inverse_noise_map=self.inverse_noise_map,
         )
-
-        residual_map = self.data - model_data
-        chi_squared_map = (residual_map / self.noise_map) ** 2.0
-        log_likelihood = -0.5 * sum(chi_squared_map)
+        log_likelihood = -0.5 * chi_squared
 
         return log_likelihood
 
@@ -98,6 +98,47 @@ class Gaussian(Profile):
             np.exp(-0.5 * np.square(np.divide(transformed_xvalues, self.sigma))),
         )
 
+    @staticmethod
+    def profiles_from_xvalues(xvalues, centre, intensity, sigma, profiles=None):
+        """
+        Calculate the intensity of many `Gaussian` profiles on a line of Cartesian x coordinates in one vectorized
+        call, where every parameter is an array of shape (total_profiles,).
+
+        This is used to evaluate a whole population of models (e.g. every Emcee walker or PySwarms particle) without
+        a Python loop. The returned array has shape (total_profiles, total_xvalues) and is computed in place, so
+        passing a preallocated `profiles` array avoids any temporary arrays being created.
+
+        Parameters
+        ----------
+        xvalues : np.ndarray
+            The x coordinates in the original reference frame of the grid.
+        centre : np.ndarray
+            The x coordinate of the centre of every profile.
+        intensity : np.ndarray
+            The overall intensity normalisation of every profile.
+        sigma : np.ndarray
+            The sigma value controlling the size of every profile.
+        profiles : np.ndarray, optional
+            A buffer of shape (total_profiles, total_xvalues) the profiles are written into.
+        """
+        centre = np.asarray(centre, dtype="float")[:, None]
+        sigma = np.asarray(sigma, dtype="float")[:, None]
+        normalization = np.asarray(intensity, dtype="float")[:, None] / (
+            sigma * np.sqrt(2.0 * np.pi)
+        )
+
+        if profiles is None:
+            profiles = np.empty(shape=(centre.shape[0], np.shape(xvalues)[0]))
+
+        np.subtract(xvalues, centre, out=profiles)
+        np.divide(profiles, sigma, out=profiles)
+        np.square(profiles, out=profiles)
+        np.multiply(profiles, -0.5, out=profiles)
+        np.exp(profiles, out=profiles)
+        np.multiply(profiles, normalization, out=profiles)
+
+        return profiles
+
 
 class Exponential(Profile):
     def __init__(
@@ -138,3 +179,40 @@ class Exponential(Profile):
         return self.intensity * np.multiply(
             self.rate, np.exp(-1.0 * self.rate * abs(transformed_xvalues))
         )
+
+    @staticmethod
+    def profiles_from_xvalues(xvalues, centre, intensity, rate, profiles=None):
+        """
+        Calculate the intensity of many Exponential profiles on a line of Cartesian x coordinates in one vectorized
+        call, where every parameter is an array of shape (total_profiles,).
+
+        The returned array has shape (total_profiles, total_xvalues) and is computed in place, so passing a
+        preallocated `profiles` array avoids any temporary arrays being created.
+
+        Parameters
+        ----------
+        xvalues : np.ndarray
+            The x coordinates in the original reference frame of the grid.
+        centre : np.ndarray
+            The x coordinate of the centre of every profile.
+        intensity : np.ndarray
+            The overall intensity normalisation of every profile.
+        rate : np.ndarray
+            The decay rate of every profile.
+        profiles : np.ndarray, optional
+            A buffer of shape (total_profiles, total_xvalues) the profiles are written into.
+        """
+        centre = np.asarray(centre, dtype="float")[:, None]
+        rate = np.asarray(rate, dtype="float")[:, None]
+        normalization = np.asarray(intensity, dtype="float")[:, None] * rate
+
+        if profiles is None:
+            profiles = np.empty(shape=(centre.shape[0], np.shape(xvalues)[0]))
+
+        np.subtract(xvalues, centre, out=profiles)
+        np.abs(profiles, out=profiles)
+        np.multiply(profiles, -1.0 * rate, out=profiles)
+        np.exp(profiles, out=profiles)
+        np.multiply(profiles, normalization, out=profiles)
+
+        return profiles
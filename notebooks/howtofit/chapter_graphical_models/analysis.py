@@ -5,6 +5,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 import pickle
 
+from fitting import chi_squared_from, model_data_from
+from visualization import BackgroundVisualizer
+
 
 def plot_line(
     xvalues,
@@ -32,42 +35,128 @@ def plot_line(
     plt.clf()
 
 
-class Analysis(af.Analysis):
+class FitContext:
     def __init__(self, data, noise_map):
+        """
+        The quantities used by every fit of an `Analysis` which depend only on its data and noise-map.
+
+        These do not change during a non-linear search, so they are computed once and reused by every call to the
+        log likelihood function, instead of being recomputed (and reallocated) millions of times. Every array is
+        read-only, so that a fit cannot accidentally modify the context shared by all fits.
+
+        Parameters
+        ----------
+        data : np.ndarray
+            The data that is fitted.
+        noise_map : np.ndarray
+            The noise-map of the data.
+        """
+        self.xvalues = np.arange(data.shape[0])
+        self.inverse_noise_map = 1.0 / noise_map
+        self.noise_normalization = np.sum(np.log(2 * np.pi * noise_map ** 2.0))
+
+        self.xvalues.flags.writeable = False
+        self.inverse_noise_map.flags.writeable = False
+
+
+class Analysis(af.Analysis):
+    def __init__(
+        self, data, noise_map, visualize_in_background=False, visualize_interval=0.0
+    ):
 
         super().__init__()
 
         self.data = data
         self.noise_map = noise_map
 
+        self._fit_context = FitContext(data=self.data, noise_map=self.noise_map)
+
+        """
+        Visualization outputs four images every update, which can be performed in a background process so that
+        the non-linear search does not wait for it (see `BackgroundVisualizer`).
+        """
+        self.background_visualizer = (
+            BackgroundVisualizer(
+                plot_function=self.plot_fit, interval=visualize_interval
+            )
+            if visualize_in_background
+            else None
+        )
+
+    """
+    The `data` and `noise_map` are properties, so that reassigning either of them invalidates the `FitContext`, which
+    is then recomputed the next time it is used.
+    """
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+        self._fit_context = None
+
+    @property
+    def noise_map(self):
+        return self._noise_map
+
+    @noise_map.setter
+    def noise_map(self, noise_map):
+        self._noise_map = noise_map
+        self._fit_context = None
+
+    @property
+    def fit_context(self):
+        if self._fit_context is None:
+            self._fit_context = FitContext(data=self.data, noise_map=self.noise_map)
+        return self._fit_context
+
     def log_likelihood_function(self, instance):
+        fit_context = self.fit_context
+
         model_data = self.model_data_from_instance(instance=instance)
 
-        residual_map = self.data - model_data
-        chi_squared_map = (residual_map / self.noise_map) ** 2.0
-        chi_squared = sum(chi_squared_map)
-        noise_normalization = np.sum(np.log(2 * np.pi * self.noise_map ** 2.0))
-        log_likelihood = -0.5 * (chi_squared + noise_normalization)
+        chi_squared = chi_squared_from(
+            data=self.data,
+            model_data=model_data,
+            inverse_noise_map=fit_context.inverse_noise_map,
+        )
+        log_likelihood = -0.5 * (chi_squared + fit_context.noise_normalization)
 
         return log_likelihood
 
     def model_data_from_instance(self, instance):
         """
-        To create the summed profile of all individual profiles in an instance, we can use a dictionary comprehension
-        to iterate over all profiles in the instance.
+        To create the summed profile of all individual profiles in an instance, we iterate over all profiles in the
+        instance and add each to the model data in place.
         """
-        xvalues = np.arange(self.data.shape[0])
-
-        return sum(
-            [profile.profile_from_xvalues(xvalues=xvalues) for profile in instance]
-        )
+        return model_data_from(instance=instance, xvalues=self.fit_context.xvalues)
 
     def visualize(self, paths, instance, during_analysis):
         """
         This method is identical to the previous tutorial, except it now uses the `model_data_from_instance` method
         to create the profile.
+
+        If visualization is performed in the background, the images of the final instance are output straight away
+        after the background process has stopped.
+        """
+        if self.background_visualizer is not None:
+
+            if during_analysis:
+                self.background_visualizer.plot(paths.image_path, instance)
+                return
+
+            self.background_visualizer.close()
+
+        self.plot_fit(image_path=paths.image_path, instance=instance)
+
+    def plot_fit(self, image_path, instance):
+        """
+        Plot the data, model data, residuals and chi-squareds of the fit of a model instance, outputting the images
+        to the `image_path` folder.
         """
-        xvalues = np.arange(self.data.shape[0])
+        xvalues = self.fit_context.xvalues
 
         model_data = self.model_data_from_instance(instance=instance)
 
@@ -84,7 +173,7 @@ class Analysis(af.Analysis):
             title="Data",
             ylabel="Data Values",
             color="k",
-            output_path=paths.image_path,
+            output_path=image_path,
             output_filename="data",
         )
 
@@ -94,7 +183,7 @@ class Analysis(af.Analysis):
             title="Model Data",
             ylabel="Model Data Values",
             color="k",
-            output_path=paths.image_path,
+            output_path=image_path,
             output_filename="model_data",
         )
 
@@ -104,7 +193,7 @@ class Analysis(af.Analysis):
             title="Residual Map",
             ylabel="Residuals",
             color="k",
-            output_path=paths.image_path,
+            output_path=image_path,
             output_filename="residual_map",
         )
 
@@ -114,7 +203,7 @@ class Analysis(af.Analysis):
             title="Chi-Squared Map",
             ylabel="Chi-Squareds",
             color="k",
-            output_path=paths.image_path,
+            output_path=image_path,
             output_filename="chi_squared_map",
         )
 
@@ -0,0 +1,107 @@
+"""
+Benchmarks: Chi Squared
+=======================
+
+This script benchmarks the cost of the log likelihood function of the `Analysis` class of the overview
+(`scripts/overview/complex/analysis.py`), comparing the original implementation (which sums a list of profiles and a
+chi-squared map using the builtin Python `sum`) to the `model_data_from` and `chi_squared_from` functions of
+`fitting.py`, which accumulate profiles in place and reduce the residuals with a single dot product.
+
+Every approach is timed on datasets of 100, 10^4 and 10^6 pixels, fitting a `Gaussian` + `Exponential` model.
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+from os import path
+import sys
+
+import numpy as np
+import timeit
+
+"""
+The benchmark measures the `model.py` and `analysis.py` modules of the overview, whose folder is found relative to
+this script (rather than the folder it is run from) and is put first on the path, so that no other module named
+`model` or `analysis` is imported instead.
+"""
+benchmarks_path = path.dirname(path.abspath(__file__))
+
+sys.path.insert(0, path.join(path.dirname(benchmarks_path), "overview", "complex"))
+
+import model as m
+import analysis as a
+
+"""
+__Original__
+
+The original log likelihood function, which the benchmark compares against.
+"""
+
+
+def log_likelihood_via_sum(data, noise_map, xvalues, instance):
+
+    model_data = sum([line.profile_from_xvalues(xvalues=xvalues) for line in instance])
+
+    residual_map = data - model_data
+    chi_squared_map = (residual_map / noise_map) ** 2.0
+    return -0.5 * sum(chi_squared_map)
+
+
+"""
+__Benchmark__
+
+For every dataset size we simulate a noisy `Gaussian` + `Exponential` line and time both log likelihood functions,
+after checking that they compute the same log likelihood. The builtin `sum` over a 10^6 pixel array is slow, so fewer
+repeats are used for larger datasets.
+"""
+instance = [
+    m.Gaussian(centre=0.5, intensity=25.0, sigma=0.1),
+    m.Exponential(centre=0.5, intensity=40.0, rate=5.0),
+]
+
+for pixels, number in [(100, 10000), (10 ** 4, 1000), (10 ** 6, 5)]:
+
+    xvalues = np.arange(pixels) / pixels
+
+    noise_map = np.full(fill_value=0.04, shape=pixels)
+    data = np.random.normal(0.0, 0.04, pixels) + sum(
+        [profile.profile_from_xvalues(xvalues=xvalues) for profile in instance]
+    )
+
+    """
+    The profiles are centred on the middle of the dataset, so we scale their x-values to be between 0 and 1.
+    """
+    analysis = a.Analysis(data=data, noise_map=noise_map)
+    analysis.xvalues = xvalues
+
+    assert np.isclose(
+        log_likelihood_via_sum(
+            data=data, noise_map=noise_map, xvalues=xvalues, instance=instance
+        ),
+        analysis.log_likelihood_function(instance=instance),
+    )
+
+    time_via_sum = min(
+        timeit.repeat(
+            lambda: log_likelihood_via_sum(
+                data=data, noise_map=noise_map, xvalues=xvalues, instance=instance
+            ),
+            number=number,
+            repeat=3,
+        )
+    )
+    time_via_dot = min(
+        timeit.repeat(
+            lambda: analysis.log_likelihood_function(instance=instance),
+            number=number,
+            repeat=3,
+        )
+    )
+
+    print(f"Pixels = {pixels}")
+    print(f"Builtin sum: {1e6 * time_via_sum / number:.2f} microseconds per call")
+    print(f"Dot product: {1e6 * time_via_dot / number:.2f} microseconds per call")
+    print(f"Speed up: {time_via_sum / time_via_dot:.2f}x")
+    print()
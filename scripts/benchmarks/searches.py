@@ -0,0 +1,485 @@
+"""
+Benchmarks: Searches
+====================
+
+This script benchmarks every non-linear search used in the `searches` examples (`DynestyStatic`, `DynestyDynamic`,
+`MultiNest`, `UltraNest`, `Emcee`, `Zeus`, `PySwarmsGlobal` and `PySwarmsLocal`) on three of the workspace datasets:
+
+ - `gaussian_x1`: a single `Gaussian` (N=3).
+ - `gaussian_x2__exponential_x1`: two `Gaussian`'s and an `Exponential` (N=9).
+ - `gaussian_x3`: three `Gaussian`'s (N=9).
+
+For every search and dataset it reports:
+
+ - The number of likelihood evaluations, the wall-clock time of the fit, the time of its updates and the number of
+ evaluations per second outside of updates.
+ - The maximum log likelihood and, for nested samplers, the log evidence and its difference from the median log
+ evidence of all nested samplers on the same dataset (which shows whether they agree, not whether they are accurate).
+ - The peak memory of the process performing the fit.
+
+Every fit is performed in a new process from a fixed random seed with a new output folder (so no search resumes
+from a previous run), and the results are output to a .json file. If the .json file of a previous run (e.g. before
+upgrading **PyAutoFit**) is given as the `reference_file`, the results are compared to it.
+
+The `Analysis` does not visualize. Every search still performs its own updates, where it outputs its samples and
+plots them (e.g. the `progress.png` image of the samples, via **matplotlib**), as it does in every model-fit. The time
+of the updates is therefore recorded separately, so that the searches can be compared with and without it. A search
+which is not installed (e.g. `MultiNest` requires **PyMultiNest**) records the error rather than stopping the
+benchmark.
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+import autofit as af
+from autoconf import conf
+import json
+import multiprocessing as mp
+import numpy as np
+import os
+from os import path
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+"""
+The benchmark measures the `model.py` and `analysis.py` modules of the overview, whose folder is found relative to
+this script (rather than the folder it is run from) and is put first on the path, so that no other module named
+`model` or `analysis` is imported instead.
+"""
+benchmarks_path = path.dirname(path.abspath(__file__))
+
+sys.path.insert(0, path.join(path.dirname(benchmarks_path), "overview", "complex"))
+
+import model as m
+import analysis as a
+
+"""
+__Settings__
+
+The random seed of every fit, the number of likelihood evaluations every search is limited to (approximately, as
+each search stops at the end of an iteration), the file the results are output to and (optionally) the file of a
+previous run they are compared to.
+"""
+seed = 1
+max_evaluations = 50000
+output_file = path.join("output", "benchmarks", "searches.json")
+reference_file = None
+
+"""
+The profiles of the model fitted to each dataset.
+"""
+dataset_profiles = {
+    "gaussian_x1": {"gaussian_0": m.Gaussian},
+    "gaussian_x2__exponential_x1": {
+        "gaussian_0": m.Gaussian,
+        "gaussian_1": m.Gaussian,
+        "exponential": m.Exponential,
+    },
+    "gaussian_x3": {
+        "gaussian_0": m.Gaussian,
+        "gaussian_1": m.Gaussian,
+        "gaussian_2": m.Gaussian,
+    },
+}
+
+"""
+The settings of every search, which follow the `searches` examples. Every search uses one core, so that every
+likelihood evaluation is counted and the timings are not affected by how many cores are available.
+
+Searches which have not converged after `max_evaluations` evaluations stop, so the benchmark finishes in a
+predictable time and searches are compared for the same cost. Their `max_log_likelihood` and `log_evidence` then show
+how far they got.
+
+`Dynesty` and `UltraNest` limit the number of likelihood evaluations themselves. `Emcee` and `PySwarms` evaluate
+the likelihood once per walker (or particle) per step, so their number of steps follows from `max_evaluations`.
+
+`MultiNest` only limits its number of iterations and `Zeus` evaluates the likelihood a varying number of times per
+step, so for these searches the `Analysis` stops the fit once `max_evaluations` evaluations have been performed. The
+benchmark of a search stopped this way has no `log_evidence` and its `max_log_likelihood` is the highest value the
+`Analysis` computed.
+
+The random seed of `MultiNest` is not a setting of the search, but is set in the `[settings]` section of its config
+file (`config/non_linear/nest/MultiNest.ini`).
+"""
+search_settings = {
+    "DynestyStatic": dict(
+        nlive=50, bound="multi", sample="auto", walks=25, maxcall=max_evaluations
+    ),
+    "DynestyDynamic": dict(
+        nlive=50, bound="multi", sample="auto", walks=25, maxcall=max_evaluations
+    ),
+    "MultiNest": dict(
+        n_live_points=50,
+        sampling_efficiency=0.2,
+        evidence_tolerance=0.5,
+        max_iter=max_evaluations,
+    ),
+    "UltraNest": dict(
+        min_num_live_points=50,
+        dlogz=0.5,
+        max_ncalls=max_evaluations,
+        show_status=False,
+    ),
+    "Emcee": dict(
+        nwalkers=30,
+        nsteps=max_evaluations // 30,
+        initializer=af.InitializerBall(lower_limit=0.49, upper_limit=0.51),
+    ),
+    "Zeus": dict(
+        nwalkers=30,
+        nsteps=max_evaluations // 30,
+        initializer=af.InitializerBall(lower_limit=0.49, upper_limit=0.51),
+    ),
+    "PySwarmsGlobal": dict(
+        n_particles=50,
+        iters=max_evaluations // 50,
+        cognitive=0.5,
+        social=0.3,
+        inertia=0.9,
+    ),
+    "PySwarmsLocal": dict(
+        n_particles=50,
+        iters=max_evaluations // 50,
+        cognitive=0.5,
+        social=0.3,
+        inertia=0.9,
+        number_of_k_neighbors=3,
+        minkowski_p_norm=2,
+    ),
+}
+
+nested_samplers = ("DynestyStatic", "DynestyDynamic", "MultiNest", "UltraNest")
+searches_stopped_by_analysis = ("MultiNest", "Zeus")
+
+"""
+__Analysis__
+
+The `Analysis` used by the benchmark counts its likelihood evaluations, records the highest log likelihood it has
+computed and does not visualize. If it is given a `max_evaluations` it raises an `EvaluationLimitReached` exception
+once that many evaluations have been performed, which stops the search.
+"""
+
+
+class EvaluationLimitReached(Exception):
+    pass
+
+
+class CountingAnalysis(a.Analysis):
+    def __init__(self, data, noise_map, max_evaluations=None):
+
+        super().__init__(data=data, noise_map=noise_map)
+
+        self.max_evaluations = max_evaluations
+
+        self.total_evaluations = 0
+        self.max_log_likelihood = -np.inf
+
+    def log_likelihood_function(self, instance):
+
+        if (
+            self.max_evaluations is not None
+            and self.total_evaluations >= self.max_evaluations
+        ):
+            raise EvaluationLimitReached(
+                f"The limit of {self.max_evaluations} likelihood evaluations was reached."
+            )
+
+        self.total_evaluations += 1
+
+        log_likelihood = super().log_likelihood_function(instance=instance)
+
+        self.max_log_likelihood = max(self.max_log_likelihood, log_likelihood)
+
+        return log_likelihood
+
+    def visualize(self, paths, instance, during_analysis):
+        pass
+
+
+"""
+__Updates__
+
+The `perform_update` method of every search is replaced with a `TimedUpdate`, which records the total time of its
+updates (including the outputs and plots of the search).
+"""
+
+
+class TimedUpdate:
+    def __init__(self, perform_update):
+
+        self.perform_update = perform_update
+        self.time = 0.0
+
+    def __call__(self, model, analysis, during_analysis):
+
+        start = time.perf_counter()
+
+        try:
+            return self.perform_update(
+                model=model, analysis=analysis, during_analysis=during_analysis
+            )
+        finally:
+            self.time += time.perf_counter() - start
+
+
+"""
+__Memory__
+
+The peak memory of a process is read via the `resource` module, which is only available on Linux and macOS. On
+Windows it is read via **psutil** if it is installed, and is otherwise not recorded (its values are `None`).
+"""
+
+
+def peak_memory_mb():
+    """
+    Returns the peak memory of this process in megabytes, or `None` if it cannot be measured.
+
+    The peak memory given by `resource` (`ru_maxrss`) is in bytes on macOS and in kilobytes on Linux, so it is
+    converted according to the platform.
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+
+        memory_info = psutil.Process().memory_info()
+
+        return getattr(memory_info, "peak_wset", memory_info.rss) / 1024.0 ** 2
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if sys.platform == "darwin":
+        return max_rss / 1024.0 ** 2
+
+    return max_rss / 1024.0
+
+
+"""
+__Benchmark__
+
+A fit of one search to one dataset, which is performed in a new process so that its peak memory is its own.
+"""
+
+
+def benchmark_from(search_name, dataset_name, seed):
+
+    np.random.seed(seed)
+    random.seed(seed)
+
+    dataset_path = path.join("dataset", "example_1d", dataset_name)
+
+    data = af.util.numpy_array_from_json(file_path=path.join(dataset_path, "data.json"))
+    noise_map = af.util.numpy_array_from_json(
+        file_path=path.join(dataset_path, "noise_map.json")
+    )
+
+    analysis = CountingAnalysis(
+        data=data,
+        noise_map=noise_map,
+        max_evaluations=max_evaluations
+        if search_name in searches_stopped_by_analysis
+        else None,
+    )
+
+    model = af.Collection(**dataset_profiles[dataset_name])
+
+    benchmark = {
+        "search": search_name,
+        "dataset": dataset_name,
+        "parameters": model.prior_count,
+    }
+
+    output_path = tempfile.mkdtemp()
+    conf.instance.output_path = output_path
+
+    memory_start = peak_memory_mb()
+
+    result = None
+
+    try:
+
+        search = getattr(af, search_name)(
+            name=search_name, number_of_cores=1, **search_settings[search_name]
+        )
+
+        timed_update = TimedUpdate(perform_update=search.perform_update)
+        search.perform_update = timed_update
+
+        start = time.perf_counter()
+
+        try:
+            result = search.fit(model=model, analysis=analysis)
+        except EvaluationLimitReached:
+            pass
+
+        wall_time = time.perf_counter() - start
+
+    except Exception as exception:
+
+        benchmark["error"] = f"{type(exception).__name__}: {exception}"
+        return benchmark
+
+    finally:
+
+        shutil.rmtree(output_path, ignore_errors=True)
+
+    memory_end = peak_memory_mb()
+
+    """
+    `MultiNest` calls the likelihood from compiled code, which may not pass the exception on, so a fit which reached
+    the limit is treated as stopped even if the search returned a result.
+    """
+    stopped_by_analysis = result is None or (
+        analysis.max_evaluations is not None
+        and analysis.total_evaluations >= analysis.max_evaluations
+    )
+
+    if stopped_by_analysis:
+
+        max_log_likelihood = analysis.max_log_likelihood
+        log_evidence = None
+
+    else:
+
+        max_log_likelihood = result.samples.max_log_likelihood_sample.log_likelihood
+        log_evidence = (
+            result.samples.log_evidence if search_name in nested_samplers else None
+        )
+
+    benchmark.update(
+        {
+            "evaluations": analysis.total_evaluations,
+            "stopped_by_analysis": stopped_by_analysis,
+            "wall_time": wall_time,
+            "update_time": timed_update.time,
+            "evaluations_per_second": analysis.total_evaluations
+            / (wall_time - timed_update.time),
+            "max_log_likelihood": float(max_log_likelihood),
+            "log_evidence": None if log_evidence is None else float(log_evidence),
+            "peak_memory_mb": memory_end,
+            "memory_increase_mb": None
+            if memory_end is None
+            else memory_end - memory_start,
+        }
+    )
+
+    return benchmark
+
+
+"""
+__Run__
+
+We fit every dataset with every search. The `maxtasksperchild` of the pool means every fit is performed by a new
+process.
+
+The benchmark is run inside an `if __name__ == "__main__":` block, so that the processes of the pool (which import
+this script when they are started by the `spawn` method, the default on macOS and Windows) do not run it again.
+"""
+if __name__ == "__main__":
+
+    benchmarks = []
+
+    with mp.Pool(processes=1, maxtasksperchild=1) as pool:
+
+        for dataset_name in dataset_profiles:
+            for search_name in search_settings:
+
+                benchmark = pool.apply(
+                    benchmark_from,
+                    kwds=dict(
+                        search_name=search_name, dataset_name=dataset_name, seed=seed
+                    ),
+                )
+
+                print(benchmark)
+
+                benchmarks.append(benchmark)
+
+    """
+    The spread of the log evidences of the nested samplers is the difference of each from their median on the same
+    dataset. This shows whether the nested samplers agree, but not whether they are accurate, as all of them may be
+    biased in the same way.
+    """
+    for dataset_name in dataset_profiles:
+
+        log_evidences = [
+            benchmark["log_evidence"]
+            for benchmark in benchmarks
+            if benchmark["dataset"] == dataset_name
+            and benchmark.get("log_evidence") is not None
+        ]
+
+        for benchmark in benchmarks:
+            if (
+                benchmark["dataset"] == dataset_name
+                and benchmark.get("log_evidence") is not None
+            ):
+                benchmark["log_evidence_spread"] = benchmark[
+                    "log_evidence"
+                ] - float(np.median(log_evidences))
+
+    """
+    __Output__
+
+    The results are output with the versions of the software used, so that runs before and after an upgrade can be
+    compared.
+    """
+    os.makedirs(path.dirname(output_file), exist_ok=True)
+
+    with open(output_file, "w+") as f:
+        json.dump(
+            {
+                "autofit_version": af.__version__,
+                "numpy_version": np.__version__,
+                "seed": seed,
+                "benchmarks": benchmarks,
+            },
+            f,
+            indent=4,
+        )
+
+    """
+    __Comparison__
+
+    If the results of a previous run are given, we print the ratio of the wall-clock time and number of evaluations
+    of every fit to those of the previous run, and the change in its log evidence.
+    """
+    if reference_file is not None:
+
+        with open(reference_file, "r") as f:
+            reference_benchmarks = {
+                (benchmark["search"], benchmark["dataset"]): benchmark
+                for benchmark in json.load(f)["benchmarks"]
+            }
+
+        for benchmark in benchmarks:
+
+            reference = reference_benchmarks.get(
+                (benchmark["search"], benchmark["dataset"])
+            )
+
+            if reference is None or "error" in reference or "error" in benchmark:
+                continue
+
+            print(
+                f"{benchmark['search']} on {benchmark['dataset']}: "
+                f"wall time x{benchmark['wall_time'] / reference['wall_time']:.2f}, "
+                f"evaluations x{benchmark['evaluations'] / reference['evaluations']:.2f}"
+            )
+
+            if (
+                benchmark["log_evidence"] is not None
+                and reference["log_evidence"] is not None
+            ):
+                print(
+                    f"    log evidence change: "
+                    f"{benchmark['log_evidence'] - reference['log_evidence']:.3f}"
+                )
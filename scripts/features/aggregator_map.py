@@ -0,0 +1,124 @@
+"""
+Feature: Aggregator Map
+=======================
+
+The `map` method of the `Aggregator` applies a function to every fit, which is how we post-process the results of
+many model-fits (e.g. plotting the residuals of the maximum likelihood model of every fit). It applies the function to
+one fit after another in one process, so for a database of many fits an expensive function (e.g. one refitting the
+maximum likelihood model) takes a long time.
+
+The `map_aggregator` function in `parallel.py` applies the function to every fit in a pool of processes, where every
+process reads fits from its own connection to the database. The results are returned in the order of the fits, as
+they are computed.
+
+This example uses the results of the `database.py` example, which must be run first.
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+import autofit as af
+from os import path
+import time
+
+import analysis as a
+import parallel
+
+"""
+__Function__
+
+The function applied to every fit loads the dataset it fitted (using its `unique_tag`, which is the dataset name) and
+evaluates the log likelihood of its maximum likelihood model.
+
+The function is passed the fit's entry in the database, whose `unique_tag` and results (e.g. `fit["samples"]`) are
+loaded in the process the function is applied in. Functions applied in parallel must be defined at the top-level of
+a script or module, and return results which can be pickled.
+"""
+
+
+def log_likelihood_from(fit):
+
+    dataset_path = path.join("dataset", "example_1d", fit.unique_tag)
+
+    data = af.util.numpy_array_from_json(file_path=path.join(dataset_path, "data.json"))
+    noise_map = af.util.numpy_array_from_json(
+        file_path=path.join(dataset_path, "noise_map.json")
+    )
+
+    analysis = a.Analysis(data=data, noise_map=noise_map)
+
+    instance = fit["samples"].max_log_likelihood_instance
+
+    return fit.unique_tag, analysis.log_likelihood_function(instance=instance)
+
+
+"""
+__Map__
+
+We open the database written by the `database.py` example with the same call it uses, `af.db.open_database`, so that
+we load the same file, and create the `Aggregator` from its session.
+
+The timings below are only meaningful if the database contains fits, so we check that it does.
+
+The example is run inside an `if __name__ == "__main__":` block, so that the processes which apply the function
+(which import this script when they are started by the `spawn` method, the default on macOS and Windows) do not run
+it again.
+"""
+if __name__ == "__main__":
+
+    session = af.db.open_database("database.sqlite")
+
+    agg = af.Aggregator(session=session)
+
+    if len(agg) == 0:
+        raise ValueError(
+            "The database contains no fits, run the `database.py` example before this example."
+        )
+
+    """
+    We apply the function to every fit in serial via the `Aggregator`.
+    """
+
+    start = time.perf_counter()
+
+    for unique_tag, log_likelihood in agg.map(func=log_likelihood_from):
+        print(unique_tag, log_likelihood)
+
+    print(f"Serial map: {time.perf_counter() - start:.6f} seconds\n")
+
+    """
+    We now apply it in parallel using 2 processes. The `chunk_size` is the number of fits sent to a process at once and
+    `prefetch` is the number of chunks each process computes ahead of the results being used, which limits how many
+    results are held in memory when the database has many fits.
+    """
+    start = time.perf_counter()
+
+    for unique_tag, log_likelihood in parallel.map_aggregator(
+        aggregator=agg,
+        func=log_likelihood_from,
+        number_of_cores=2,
+        chunk_size=1,
+        prefetch=2,
+    ):
+        print(unique_tag, log_likelihood)
+
+    print(f"Parallel map: {time.perf_counter() - start:.6f} seconds\n")
+
+    """
+    Queries are applied before mapping, so only the fits matching the query are processed.
+    """
+    agg_query = agg.query(agg.unique_tag == "gaussian_x1_1")
+
+    print(
+        list(
+            parallel.map_aggregator(
+                aggregator=agg_query, func=log_likelihood_from, number_of_cores=2
+            )
+        )
+    )
+
+"""
+Finish.
+"""
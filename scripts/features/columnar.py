@@ -0,0 +1,569 @@
+from collections.abc import Sequence
+import math
+import numpy as np
+import os
+from os import path
+import pickle
+import sys
+
+"""
+The binary files are written and read by `util.py` of the simulators, whose folder is found relative to this module
+rather than the folder scripts are run from.
+"""
+features_path = path.dirname(path.abspath(__file__))
+simulators_path = path.join(path.dirname(features_path), "simulators")
+
+if simulators_path not in sys.path:
+    sys.path.append(simulators_path)
+
+import util
+
+"""
+The `columnar.py` module stores the samples of a non-linear search as columns of NumPy arrays.
+
+The `Samples` of a search store every sample as a Python object, so the samples of a long `Emcee` or `DynestyDynamic`
+run can take gigabytes of memory and are slow to pickle and load. `ColumnarSamples` instead store the parameters of
+every sample in one (total_samples, total_parameters) array and the log likelihood, log prior and weight of every
+sample in one array each.
+
+They are saved to a single binary file (in the format of the binary datasets of `simulators/util.py`), which
+is memory-mapped when it is loaded, so loading is instantaneous and values are only read from hard-disk when they are
+used. They pickle as the bytes of this file, so they can also be saved to the database via `paths.save_object`.
+"""
+columnar_magic = b"AFSAMP01"
+
+
+def values_from(samples, *names):
+    """
+    Returns the first of a list of attributes which a `Samples` object has, so that the names used by different
+    versions of **PyAutoFit** (e.g. `parameter_lists` and `parameters`) are both supported.
+    """
+    for name in names:
+        if hasattr(samples, name):
+            return getattr(samples, name)
+
+    raise AttributeError(f"The samples have none of the attributes {names}.")
+
+
+class RowList(Sequence):
+    def __init__(self, array):
+        """
+        A read-only view of a 2D array which behaves as a list of lists, where every row is converted to a list
+        only when it is accessed.
+        """
+        self.array = array
+
+    def __len__(self):
+        return self.array.shape[0]
+
+    def __getitem__(self, index):
+
+        if isinstance(index, slice):
+            return [row.tolist() for row in self.array[index]]
+
+        return self.array[index].tolist()
+
+
+class ColumnarSamples:
+
+    """
+    The attributes of `Samples` which are stored with the arrays, if the `Samples` have them.
+    """
+    info_names = (
+        "log_evidence",
+        "number_live_points",
+        "total_samples",
+        "total_walkers",
+        "total_steps",
+        "unconverged_sample_size",
+        "time",
+    )
+
+    def __init__(
+        self,
+        model,
+        parameters,
+        log_likelihoods,
+        log_priors,
+        weights,
+        info=None,
+        samples_after_burn_in=None,
+    ):
+        """
+        The samples of a non-linear search, stored as columns of NumPy arrays.
+
+        The list properties of `Samples` (e.g. `parameter_lists`, `log_likelihood_list`) are views of the arrays,
+        so they can be used as before without creating a Python object for every sample.
+
+        The median PDF values and errors are identical to those of `Samples`. For the samples of an MCMC search (e.g.
+        `Emcee`), which are given their `samples_after_burn_in`, they are computed from the samples after burn-in
+        as they are by `MCMCSamples`.
+
+        Parameters
+        ----------
+        model : af.Collection
+            The model fitted by the search, which maps vectors of parameters to instances.
+        parameters : np.ndarray
+            The parameters of every sample, with shape (total_samples, total_parameters).
+        log_likelihoods : np.ndarray
+            The log likelihood of every sample.
+        log_priors : np.ndarray
+            The log prior of every sample.
+        weights : np.ndarray
+            The weight of every sample.
+        info : dict
+            Attributes of the samples which are not one value per sample (e.g. the `log_evidence`).
+        samples_after_burn_in : np.ndarray
+            For the samples of an MCMC search, the parameters of the samples after the burn-in period.
+        """
+        self.model = model
+
+        self.parameters = parameters
+        self.log_likelihoods = log_likelihoods
+        self.log_priors = log_priors
+        self.weights = weights
+
+        self.info = info or {}
+
+        self.samples_after_burn_in = samples_after_burn_in
+
+        self._log_posteriors = None
+        self._sorted_parameters = None
+        self._cdfs = None
+        self._quantiles = {}
+        self._vectors_at_sigma = {}
+
+    @classmethod
+    def from_samples(cls, samples):
+        """
+        Create `ColumnarSamples` from the `Samples` of a non-linear search.
+
+        Parameters
+        ----------
+        samples : af.Samples
+            The samples of a non-linear search (e.g. `result.samples`).
+        """
+        info = {}
+
+        for name in cls.info_names:
+
+            value = getattr(samples, name, None)
+
+            if isinstance(value, (int, float, np.integer, np.floating)):
+                info[name] = value.item() if isinstance(value, np.generic) else value
+
+        info["samples_type"] = type(samples).__name__
+
+        try:
+            samples_after_burn_in = np.asarray(
+                samples.samples_after_burn_in, dtype="float"
+            )
+        except (AttributeError, NotImplementedError, ValueError):
+            samples_after_burn_in = None
+
+        return ColumnarSamples(
+            model=samples.model,
+            parameters=np.asarray(
+                values_from(samples, "parameter_lists", "parameters"), dtype="float"
+            ),
+            log_likelihoods=np.asarray(
+                values_from(samples, "log_likelihood_list", "log_likelihoods"),
+                dtype="float",
+            ),
+            log_priors=np.asarray(
+                values_from(samples, "log_prior_list", "log_priors"), dtype="float"
+            ),
+            weights=np.asarray(
+                values_from(samples, "weight_list", "weights"), dtype="float"
+            ),
+            info=info,
+            samples_after_burn_in=samples_after_burn_in,
+        )
+
+    def __getattr__(self, item):
+
+        if item != "info" and item in self.__dict__.get("info", {}):
+            return self.info[item]
+
+        raise AttributeError(item)
+
+    @property
+    def parameter_lists(self):
+        return RowList(array=self.parameters)
+
+    @property
+    def log_likelihood_list(self):
+        return self.log_likelihoods
+
+    @property
+    def log_prior_list(self):
+        return self.log_priors
+
+    @property
+    def log_posteriors(self):
+
+        if self._log_posteriors is None:
+            self._log_posteriors = self.log_likelihoods + self.log_priors
+
+        return self._log_posteriors
+
+    @property
+    def log_posterior_list(self):
+        return self.log_posteriors
+
+    @property
+    def weight_list(self):
+        return self.weights
+
+    @property
+    def total_samples(self):
+        return self.info.get("total_samples", self.parameters.shape[0])
+
+    @property
+    def max_log_likelihood_index(self):
+        return int(np.argmax(self.log_likelihoods))
+
+    @property
+    def max_log_likelihood_vector(self):
+        return self.parameters[self.max_log_likelihood_index].tolist()
+
+    @property
+    def max_log_likelihood_instance(self):
+        return self.model.instance_from_vector(vector=self.max_log_likelihood_vector)
+
+    @property
+    def max_log_posterior_index(self):
+        return int(np.argmax(self.log_posteriors))
+
+    @property
+    def max_log_posterior_vector(self):
+        return self.parameters[self.max_log_posterior_index].tolist()
+
+    @property
+    def max_log_posterior_instance(self):
+        return self.model.instance_from_vector(vector=self.max_log_posterior_vector)
+
+    def vector_from_sample_index(self, sample_index):
+        return self.parameters[sample_index].tolist()
+
+    def instance_from_sample_index(self, sample_index):
+        return self.model.instance_from_vector(
+            vector=self.vector_from_sample_index(sample_index=sample_index)
+        )
+
+    @property
+    def is_mcmc(self):
+        return self.samples_after_burn_in is not None
+
+    @property
+    def pdf_converged(self):
+        """
+        Whether the samples are converged enough to estimate the probability density function (PDF), which is not
+        the case if one sample has more than 99% of the weight or, for MCMC samples, if there are no samples after
+        the burn-in period.
+        """
+        if self.is_mcmc:
+            return len(self.samples_after_burn_in) > 0
+
+        return np.max(self.weights) <= 0.99
+
+    @property
+    def unconverged_sample_size(self):
+        return min(
+            self.info.get("unconverged_sample_size", 100), self.parameters.shape[0]
+        )
+
+    def _sort(self):
+        """
+        Sort the samples of every parameter and compute their cumulative weights, which all quantiles are computed
+        from.
+
+        Every parameter is sorted in one `argsort` of the parameters array, which is performed once and reused for
+        every quantile. The cumulative weights follow *corner.py*, so quantiles are identical to those of `Samples`.
+        """
+        indexes = np.argsort(self.parameters, axis=0)
+
+        self._sorted_parameters = np.take_along_axis(self.parameters, indexes, axis=0)
+
+        cumulative_weights = np.cumsum(self.weights[indexes], axis=0)[:-1]
+        cumulative_weights /= cumulative_weights[-1]
+
+        self._cdfs = np.concatenate(
+            (np.zeros((1, self.parameters.shape[1])), cumulative_weights), axis=0
+        )
+
+    def quantiles(self, q):
+        """
+        The weighted quantiles of every parameter marginalized in 1D, returned as an array of shape
+        (len(q), total_parameters).
+
+        Quantiles are memoized, so every quantile is only computed once.
+
+        Parameters
+        ----------
+        q : [float]
+            The quantiles which are computed (e.g. 0.5 for the median).
+        """
+        q = [float(value) for value in np.atleast_1d(q)]
+
+        if any(value < 0.0 or value > 1.0 for value in q):
+            raise ValueError("Quantiles must be between 0 and 1")
+
+        q_new = sorted(set(value for value in q if value not in self._quantiles))
+
+        if q_new:
+
+            if self._cdfs is None:
+                self._sort()
+
+            values = np.array(
+                [
+                    np.interp(
+                        q_new, self._cdfs[:, index], self._sorted_parameters[:, index]
+                    )
+                    for index in range(self.parameters.shape[1])
+                ]
+            ).reshape(self.parameters.shape[1], len(q_new))
+
+            for value, column in zip(q_new, values.T):
+                self._quantiles[value] = column
+
+        return np.array([self._quantiles[value] for value in q])
+
+    @property
+    def median_pdf_vector(self):
+        """
+        The median of the PDF of every parameter marginalized in 1D, returned as a list of values.
+        """
+        if self.pdf_converged:
+
+            if self.is_mcmc:
+                return np.percentile(self.samples_after_burn_in, 50, axis=0).tolist()
+
+            return self.quantiles(q=0.5)[0].tolist()
+
+        return self.max_log_likelihood_vector
+
+    @property
+    def median_pdf_instance(self):
+        return self.model.instance_from_vector(vector=self.median_pdf_vector)
+
+    def vector_at_sigma(self, sigma):
+        """
+        The value of every parameter marginalized in 1D at an input sigma value of its PDF, returned as a list of
+        (lower, upper) values.
+
+        As for `Samples`, these are the values at the 1 - erf(sigma / sqrt(2)) and erf(sigma / sqrt(2)) quantiles of
+        the PDF (e.g. 31.7% and 68.3% for sigma = 1.0).
+
+        If the samples are not converged, the minimum and maximum value of every parameter in the most recent samples
+        is used. The values are memoized for every sigma.
+
+        Parameters
+        ----------
+        sigma : float
+            The sigma within which the PDF is used to estimate errors (e.g. sigma = 1.0 uses 0.6826 of the PDF).
+        """
+        sigma = float(sigma)
+
+        if sigma not in self._vectors_at_sigma:
+
+            limit = math.erf(0.5 * sigma * math.sqrt(2))
+
+            if self.pdf_converged and self.is_mcmc:
+
+                lowers, uppers = np.percentile(
+                    self.samples_after_burn_in,
+                    [100.0 * (1.0 - limit), 100.0 * limit],
+                    axis=0,
+                )
+
+            elif self.pdf_converged:
+
+                lowers, uppers = self.quantiles(q=[1.0 - limit, limit])
+
+            else:
+
+                parameters = self.parameters[-self.unconverged_sample_size :]
+
+                lowers = np.min(parameters, axis=0)
+                uppers = np.max(parameters, axis=0)
+
+            self._vectors_at_sigma[sigma] = list(zip(lowers.tolist(), uppers.tolist()))
+
+        return self._vectors_at_sigma[sigma]
+
+    def vector_at_upper_sigma(self, sigma):
+        return [upper for lower, upper in self.vector_at_sigma(sigma=sigma)]
+
+    def vector_at_lower_sigma(self, sigma):
+        return [lower for lower, upper in self.vector_at_sigma(sigma=sigma)]
+
+    def error_vector_at_upper_sigma(self, sigma):
+        return [
+            upper - median
+            for upper, median in zip(
+                self.vector_at_upper_sigma(sigma=sigma), self.median_pdf_vector
+            )
+        ]
+
+    def error_vector_at_lower_sigma(self, sigma):
+        return [
+            median - lower
+            for lower, median in zip(
+                self.vector_at_lower_sigma(sigma=sigma), self.median_pdf_vector
+            )
+        ]
+
+    def error_vector_at_sigma(self, sigma):
+        return list(
+            zip(
+                self.error_vector_at_lower_sigma(sigma=sigma),
+                self.error_vector_at_upper_sigma(sigma=sigma),
+            )
+        )
+
+    def error_magnitude_vector_at_sigma(self, sigma):
+        return [upper - lower for lower, upper in self.vector_at_sigma(sigma=sigma)]
+
+    def instance_at_upper_sigma(self, sigma):
+        return self.model.instance_from_vector(
+            vector=self.vector_at_upper_sigma(sigma=sigma),
+            assert_priors_in_limits=False,
+        )
+
+    def instance_at_lower_sigma(self, sigma):
+        return self.model.instance_from_vector(
+            vector=self.vector_at_lower_sigma(sigma=sigma),
+            assert_priors_in_limits=False,
+        )
+
+    def error_instance_at_sigma(self, sigma):
+        return self.model.instance_from_vector(
+            vector=self.error_magnitude_vector_at_sigma(sigma=sigma),
+            assert_priors_in_limits=False,
+        )
+
+    def error_instance_at_upper_sigma(self, sigma):
+        return self.model.instance_from_vector(
+            vector=self.error_vector_at_upper_sigma(sigma=sigma),
+            assert_priors_in_limits=False,
+        )
+
+    def error_instance_at_lower_sigma(self, sigma):
+        return self.model.instance_from_vector(
+            vector=self.error_vector_at_lower_sigma(sigma=sigma),
+            assert_priors_in_limits=False,
+        )
+
+    def summary(self, sigmas=(1.0, 2.0, 3.0)):
+        """
+        A table of the results of every parameter, returned as a list with one dictionary per parameter containing
+        its name, maximum log likelihood value, median PDF value and lower and upper values at every input sigma (e.g.
+        `lower_3` and `upper_3` for sigma = 3.0).
+
+        All values are computed from the same sorted samples, so the summary costs little more than one of its values.
+
+        Parameters
+        ----------
+        sigmas : [float]
+            The sigma values the lower and upper values of every parameter are computed at.
+        """
+        columns = {
+            "max_log_likelihood": self.max_log_likelihood_vector,
+            "median_pdf": self.median_pdf_vector,
+        }
+
+        for sigma in sigmas:
+            columns[f"lower_{sigma:g}"] = self.vector_at_lower_sigma(sigma=sigma)
+            columns[f"upper_{sigma:g}"] = self.vector_at_upper_sigma(sigma=sigma)
+
+        return [
+            {
+                "parameter": name,
+                **{column: values[index] for column, values in columns.items()},
+            }
+            for index, name in enumerate(
+                self.model.model_component_and_parameter_names
+            )
+        ]
+
+    def to_bytes(self):
+        """
+        Returns the bytes of the binary file of the samples, which contains the arrays, the info and the pickled model.
+        """
+        arrays = {
+            "parameters": self.parameters,
+            "log_likelihoods": self.log_likelihoods,
+            "log_priors": self.log_priors,
+            "weights": self.weights,
+            "model": np.frombuffer(pickle.dumps(self.model), dtype="uint8"),
+        }
+
+        if self.is_mcmc:
+            arrays["samples_after_burn_in"] = self.samples_after_burn_in
+
+        return util.bytes_from_arrays(
+            arrays=arrays, metadata=self.info, magic=columnar_magic
+        )
+
+    @classmethod
+    def from_bytes(cls, buffer):
+        """
+        Create `ColumnarSamples` from the bytes (or a memory-map) of their binary file, where the arrays are views of
+        the buffer rather than copies.
+        """
+        arrays, info = util.arrays_from_buffer(buffer=buffer, magic=columnar_magic)
+
+        return ColumnarSamples(
+            model=pickle.loads(arrays["model"].tobytes()),
+            parameters=arrays["parameters"],
+            log_likelihoods=arrays["log_likelihoods"],
+            log_priors=arrays["log_priors"],
+            weights=arrays["weights"],
+            info=info,
+            samples_after_burn_in=arrays.get("samples_after_burn_in"),
+        )
+
+    def __reduce__(self):
+        return ColumnarSamples.from_bytes, (self.to_bytes(),)
+
+    def save(self, file_path, overwrite=False):
+        """
+        Save the samples to a binary file.
+
+        Parameters
+        ----------
+        file_path : str
+            The full path of the file that is output, including the file name and extension.
+        overwrite : bool
+            If `True` and a file already exists with the input file_path it is overwritten. If `False`, an error will
+            be raised.
+        """
+        if path.exists(file_path) and not overwrite:
+            raise FileExistsError(
+                f"The file {file_path} already exists. Set overwrite=True to overwrite this file."
+            )
+
+        file_dir = path.split(file_path)[0]
+
+        if file_dir and not path.exists(file_dir):
+            os.makedirs(file_dir)
+
+        with open(file_path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Load samples from a binary file output by `save`.
+
+        The file is memory-mapped, meaning the load is instantaneous and the values of samples are only read from
+        hard-disk when they are used. The arrays are read-only.
+
+        Parameters
+        ----------
+        file_path : str
+            The full path of the binary file.
+        """
+        return cls.from_bytes(buffer=np.memmap(file_path, dtype="uint8", mode="r"))
@@ -0,0 +1,164 @@
+"""
+Feature: Columnar Samples
+=========================
+
+The `Samples` of a non-linear search store the parameters, log likelihood, log prior and weight of every sample as
+Python lists (e.g. `samples.parameter_lists`, `samples.log_likelihood_list`). For a long `Emcee` or `DynestyDynamic`
+run with hundreds of thousands of samples, these lists take gigabytes of memory and are slow to pickle, which makes
+the output folder large and loading results via the `Aggregator` slow.
+
+The `ColumnarSamples` in `columnar.py` store the same samples as contiguous NumPy arrays (a (total_samples,
+total_parameters) array of parameters and one array per sample quantity), which are output to a single binary file
+that is memory-mapped when it is loaded. Their list properties (e.g. `parameter_lists`) are views of the arrays, so
+code written for `Samples` works unchanged.
+
+This example fits 3 datasets, writes their `ColumnarSamples` to a database and compares them to the `Samples`.
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+import autofit as af
+from os import path
+import pickle
+import time
+
+import model as m
+import analysis as a
+import columnar
+import database_util
+
+"""
+__Analysis__
+
+An `Analysis` can save any object to the database (or the pickles folder of the output folder) after the model-fit
+via its `save_results_for_aggregator` method. We extend our `Analysis` to save the `ColumnarSamples`.
+"""
+
+
+class Analysis(a.Analysis):
+    def save_results_for_aggregator(self, paths, model, samples):
+        paths.save_object(
+            "columnar_samples", columnar.ColumnarSamples.from_samples(samples=samples)
+        )
+
+
+"""
+__Model-Fits__
+
+We fit the same 3 datasets as the `database.py` example, writing the results to a database in the output folder
+(whose path is given by `database_util.database_path_from`, which the aggregator is also loaded from).
+"""
+dataset_names = ["gaussian_x1_0", "gaussian_x1_1", "gaussian_x1_2"]
+
+model = af.Collection(gaussian=m.Gaussian)
+
+session = af.db.open_database(
+    database_util.database_path_from(filename="columnar_samples.sqlite")
+)
+
+for dataset_name in dataset_names:
+
+    dataset_path = path.join("dataset", "example_1d", dataset_name)
+
+    data = af.util.numpy_array_from_json(file_path=path.join(dataset_path, "data.json"))
+    noise_map = af.util.numpy_array_from_json(
+        file_path=path.join(dataset_path, "noise_map.json")
+    )
+
+    analysis = Analysis(data=data, noise_map=noise_map)
+
+    dynesty = af.DynestyStatic(
+        path_prefix=path.join("features", "columnar_samples"),
+        unique_tag=dataset_name,
+        session=session,
+        nlive=50,
+    )
+
+    result = dynesty.fit(model=model, analysis=analysis)
+
+session.commit()
+
+"""
+__Aggregator__
+
+The `ColumnarSamples` are loaded via the `Aggregator` like the `Samples`, and support the same list properties.
+"""
+agg = af.Aggregator.from_database(
+    database_util.database_path_from(filename="columnar_samples.sqlite")
+)
+
+for samples in agg.values("columnar_samples"):
+    print("All parameters of the very first sample")
+    print(samples.parameter_lists[0])
+    print("The tenth sample`s third parameter")
+    print(samples.parameter_lists[9][2])
+    print("Maximum Log Likelihood Instance Centre")
+    print(samples.max_log_likelihood_instance.gaussian.centre, "\n")
+
+"""
+The arrays can also be used directly, which for many samples is much faster than looping over lists.
+"""
+for samples in agg.values("columnar_samples"):
+    print("Mean of every parameter weighted by the sample weights")
+    print(samples.weights @ samples.parameters / samples.weights.sum(), "\n")
+
+"""
+__Summary__
+
+The median PDF values and errors of `ColumnarSamples` are computed from one sort of the samples of every parameter,
+which is reused for every quantile, and are memoized for every sigma. Using several of them for the same samples, as
+we do below, therefore costs little more than using one.
+"""
+for samples in agg.values("columnar_samples"):
+    print("Median PDF Centre and its errors at 3.0 sigma")
+    print(samples.median_pdf_instance.gaussian.centre)
+    print(samples.error_instance_at_upper_sigma(sigma=3.0).gaussian.centre)
+    print(samples.error_instance_at_lower_sigma(sigma=3.0).gaussian.centre, "\n")
+
+"""
+The `summary` method returns a table of every parameter's maximum likelihood value, median PDF value and lower and
+upper values at every sigma.
+"""
+for samples in agg.values("columnar_samples"):
+    for row in samples.summary(sigmas=[1.0, 2.0, 3.0]):
+        print(row)
+
+"""
+__Size and Load Time__
+
+The pickled `ColumnarSamples` are smaller than the pickled `Samples` and load faster.
+"""
+samples = result.samples
+columnar_samples = columnar.ColumnarSamples.from_samples(samples=samples)
+
+for name, obj in (("Samples", samples), ("ColumnarSamples", columnar_samples)):
+
+    obj_bytes = pickle.dumps(obj)
+
+    start = time.perf_counter()
+    pickle.loads(obj_bytes)
+    load_time = time.perf_counter() - start
+
+    print(f"{name}: {len(obj_bytes)} bytes, loaded in {load_time:.6f} seconds")
+
+"""
+__Memory-Mapping__
+
+`ColumnarSamples` can also be saved to their own binary file, which is memory-mapped when it is loaded. The load is
+instantaneous however many samples there are, and only the samples which are used are read from hard-disk.
+"""
+file_path = path.join("output", "features", "columnar_samples", "samples.bin")
+
+columnar_samples.save(file_path=file_path, overwrite=True)
+
+columnar_samples = columnar.ColumnarSamples.load(file_path=file_path)
+
+print(columnar_samples.parameter_lists[0])
+print(columnar_samples.log_likelihood_list[0])
+
+"""
+Finish.
+"""
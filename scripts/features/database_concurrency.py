@@ -0,0 +1,125 @@
+"""
+Feature: Database Concurrency
+=============================
+
+The `database.py` example passes one `session` from `af.db.open_database` to searches which fit each dataset one
+after another. When we instead fit many datasets at once, for example with one process per dataset on a cluster
+node, every process opens its own session of the same database. SQLite only lets one process write at a time, so
+searches which complete at the same time queue up to write their results, and fail with a `database is locked`
+error if they wait more than 5 seconds.
+
+The `open_database` function in `database_util.py` opens a session which uses SQLite's write-ahead log, so that many
+processes can write their results at once without these errors, and the database can be read (e.g. via the
+`Aggregator`) while they do.
+
+This example fits 3 datasets in 3 processes which write to one database, and then benchmarks many processes writing
+to a database at once.
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+import autofit as af
+import multiprocessing as mp
+from os import path
+
+import model as m
+import analysis as a
+import database_util
+
+"""
+__Model-Fits__
+
+The function below fits one dataset, writing its results to the database. It is run in its own process, so it opens
+its own session of the database via `database_util.open_database`, which every search of the process uses.
+
+On a cluster, the body of this function would be the script run by every job.
+"""
+
+
+def fit_dataset(dataset_name):
+
+    session = database_util.open_database("database_concurrency.sqlite")
+
+    dataset_path = path.join("dataset", "example_1d", dataset_name)
+
+    data = af.util.numpy_array_from_json(file_path=path.join(dataset_path, "data.json"))
+    noise_map = af.util.numpy_array_from_json(
+        file_path=path.join(dataset_path, "noise_map.json")
+    )
+
+    analysis = a.Analysis(data=data, noise_map=noise_map)
+
+    dynesty = af.DynestyStatic(
+        path_prefix=path.join("features", "database_concurrency"),
+        unique_tag=dataset_name,
+        session=session,
+        nlive=50,
+    )
+
+    result = dynesty.fit(model=af.Collection(gaussian=m.Gaussian), analysis=analysis)
+
+    session.commit()
+
+    return dataset_name, result.log_likelihood
+
+
+"""
+We fit the same 3 datasets as the `database.py` example, all at once.
+
+The rest of the example is run inside an `if __name__ == "__main__":` block, so that the processes of the pool (which
+import this script when they are started by the `spawn` method, the default on macOS and Windows) only define
+`fit_dataset` rather than running the example again.
+"""
+if __name__ == "__main__":
+
+    dataset_names = ["gaussian_x1_0", "gaussian_x1_1", "gaussian_x1_2"]
+
+    with mp.Pool(processes=3) as pool:
+        for dataset_name, log_likelihood in pool.map(fit_dataset, dataset_names):
+            print(dataset_name, log_likelihood)
+
+    """
+    The results of every process are loaded via the `Aggregator`, as usual. The database is in the output folder, at the
+    path given by `database_util.database_path_from`.
+    """
+    agg = af.Aggregator.from_database(
+        database_util.database_path_from(filename="database_concurrency.sqlite")
+    )
+
+    print("Total Fits = ", len(agg))
+    print("Unique Tags = ", [fit.unique_tag for fit in agg], "\n")
+
+    """
+    __Benchmark__
+
+    The `benchmark_database_writes` function simulates many searches writing to one database at once. Each of
+    `number_of_writers` processes simulates `fits_per_writer` searches, one after another, where every search commits
+    its start, "fits" for `fit_time` seconds and then commits `total_objects` objects of results.
+
+    We run it with every process opening its session via `af.db.open_database` and via `database_util.open_database`, and
+    compare the number of searches whose results failed to be written because the database was locked. Increase the
+    `number_of_writers` to the number of searches you run at once.
+    """
+    for concurrent in (False, True):
+
+        benchmark = database_util.benchmark_database_writes(
+            filename="database_concurrency_benchmark.sqlite",
+            number_of_writers=64,
+            fits_per_writer=5,
+            fit_time=0.5,
+            total_objects=100,
+            concurrent=concurrent,
+        )
+
+        print(
+            "database_util.open_database" if concurrent else "af.db.open_database",
+            f"Written: {benchmark['written']}, Locked: {benchmark['locked']}, "
+            f"Time: {benchmark['time']:.2f} seconds",
+        )
+
+"""
+Finish.
+"""
@@ -0,0 +1,161 @@
+"""
+Feature: Database Serialization
+===============================
+
+In the `database.py` example, every result of a model-fit is written to the database as a pickle, including the
+`data` and `noise_map` saved by the `save_attributes_for_aggregator` method of the `Analysis` and the `Samples`. Every
+`agg.values(...)` therefore unpickles full objects, which is slow for many fits and requires the modules of the model
+(e.g. `model.py`) to be importable.
+
+The `serialization.py` module instead saves results in a typed binary encoding: arrays as their raw bytes, samples as
+the arrays of their `ColumnarSamples` and models as .json. These are smaller than pickles, are loaded without copying
+their arrays and can be read without the modules of the model.
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+import autofit as af
+from os import path
+import pickle
+import time
+
+import model as m
+import analysis as a
+import database_util
+import serialization
+
+"""
+__Analysis__
+
+We extend our `Analysis` to save the data, noise-map, model and samples via `serialization.save_object`, rather than
+`paths.save_object`.
+
+Their names (e.g. `typed_data`) differ from those of the pickles saved by other examples (e.g. `data`), so that code
+loading a pickle via `agg.values("data")` never receives an encoded object.
+"""
+
+
+class Analysis(a.Analysis):
+    def save_attributes_for_aggregator(self, paths):
+        serialization.save_object(paths=paths, name="typed_data", obj=self.data)
+        serialization.save_object(
+            paths=paths, name="typed_noise_map", obj=self.noise_map
+        )
+
+    def save_results_for_aggregator(self, paths, model, samples):
+        serialization.save_object(paths=paths, name="typed_model", obj=model)
+        serialization.save_object(paths=paths, name="typed_samples", obj=samples)
+
+
+"""
+__Model-Fits__
+
+We fit the same 3 datasets as the `database.py` example, writing the results to a database in the output folder
+(whose path is given by `database_util.database_path_from`, which the aggregator is also loaded from).
+"""
+dataset_names = ["gaussian_x1_0", "gaussian_x1_1", "gaussian_x1_2"]
+
+model = af.Collection(gaussian=m.Gaussian)
+
+session = af.db.open_database(
+    database_util.database_path_from(filename="database_serialization.sqlite")
+)
+
+for dataset_name in dataset_names:
+
+    dataset_path = path.join("dataset", "example_1d", dataset_name)
+
+    data = af.util.numpy_array_from_json(file_path=path.join(dataset_path, "data.json"))
+    noise_map = af.util.numpy_array_from_json(
+        file_path=path.join(dataset_path, "noise_map.json")
+    )
+
+    analysis = Analysis(data=data, noise_map=noise_map)
+
+    dynesty = af.DynestyStatic(
+        path_prefix=path.join("features", "database_serialization"),
+        unique_tag=dataset_name,
+        session=session,
+        nlive=50,
+    )
+
+    result = dynesty.fit(model=model, analysis=analysis)
+
+session.commit()
+
+"""
+__Loading__
+
+Objects saved via `serialization.save_object` are loaded via `serialization.values`, which reads them for every fit
+of the aggregator with a single query. (They cannot be loaded via `agg.values`, which unpickles every object).
+
+Every object is returned with the id of its fit, in the order of the ids, so the objects of the same fit are paired
+by their ids.
+"""
+agg = af.Aggregator.from_database(
+    database_util.database_path_from(filename="database_serialization.sqlite")
+)
+
+samples_dict = dict(serialization.values(aggregator=agg, name="typed_samples"))
+
+for fit_id, data in serialization.values(aggregator=agg, name="typed_data"):
+
+    samples = samples_dict[fit_id]
+
+    print("Maximum value of the data:")
+    print(data.max())
+    print("Median PDF Centre:")
+    print(samples.median_pdf_instance.gaussian.centre, "\n")
+
+"""
+Models are loaded as models, which can be printed and used to create instances.
+"""
+for fit_id, typed_model in serialization.values(aggregator=agg, name="typed_model"):
+    print(typed_model.info, "\n")
+
+"""
+__Batched Loading__
+
+Zipping the generators of every name, as we did above, reads every object of every fit with its own query. The
+`values_many` function instead reads the objects of every name for a batch of fits with one query, which is much
+faster when the database is on a network drive, where every query waits for the network.
+
+It loads both encoded objects (e.g. the `typed_data`) and pickled objects saved by the search (e.g. the `samples`).
+"""
+for data, noise_map, samples in serialization.values_many(
+    aggregator=agg, names=["typed_data", "typed_noise_map", "samples"], batch_size=100
+):
+    print("Maximum signal-to-noise of the data:")
+    print((data / noise_map).max())
+    print("Maximum Log Likelihood Centre:")
+    print(samples.max_log_likelihood_instance.gaussian.centre, "\n")
+
+"""
+__Size and Load Time__
+
+We compare the size and load time of the samples of the final fit when pickled and when encoded.
+"""
+samples = result.samples
+
+samples_bytes = pickle.dumps(samples)
+
+start = time.perf_counter()
+pickle.loads(samples_bytes)
+print(
+    f"Pickled: {len(samples_bytes)} bytes, loaded in {time.perf_counter() - start:.6f} seconds"
+)
+
+samples_bytes = serialization.encode(samples)
+
+start = time.perf_counter()
+serialization.decode(samples_bytes)
+print(
+    f"Encoded: {len(samples_bytes)} bytes, loaded in {time.perf_counter() - start:.6f} seconds"
+)
+
+"""
+Finish.
+"""
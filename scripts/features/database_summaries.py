@@ -0,0 +1,188 @@
+"""
+Feature: Database Summaries
+===========================
+
+The `database.py` example loads the results of every fit via `agg.values("samples")`, for example:
+
+    mp_instances = [samps.median_pdf_instance for samps in agg.values("samples")]
+
+This unpickles the `Samples` of every fit just to read a handful of numbers. For a database of many fits, most of the
+time of every such loop is spent loading `Samples`.
+
+The `summaries.py` module instead saves scalar summaries of every fit (the maximum likelihood and median PDF value of
+every parameter and their errors) to the database when the fit is written, as plain text. They are then read for every
+fit in a database with a single SQL query, without loading any `Samples`.
+
+The maximum likelihood and median PDF value of every parameter are also written to an indexed `parameter_summary`
+table of the database, so that queries on them are fast for databases of many fits.
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+import autofit as af
+from os import path
+import time
+
+import model as m
+import analysis as a
+import summaries
+
+"""
+__Analysis__
+
+We extend our `Analysis` to save the summaries of the samples after the model-fit, via its
+`save_results_for_aggregator` method. The `sigmas` are the sigma values the errors of every parameter are saved at.
+"""
+
+
+class Analysis(a.Analysis):
+    def save_results_for_aggregator(self, paths, model, samples):
+        summaries.save_summaries(paths=paths, samples=samples, sigmas=[1.0, 3.0])
+
+
+"""
+__Model-Fits__
+
+We fit the same 3 datasets as the `database.py` example, writing the results to a database.
+"""
+dataset_names = ["gaussian_x1_0", "gaussian_x1_1", "gaussian_x1_2"]
+
+model = af.Collection(gaussian=m.Gaussian)
+
+"""
+We open the database via `summaries.open_database`, which creates the `parameter_summary` table. The database is
+in the output folder.
+"""
+session = summaries.open_database("database_summaries.sqlite")
+
+for dataset_name in dataset_names:
+
+    dataset_path = path.join("dataset", "example_1d", dataset_name)
+
+    data = af.util.numpy_array_from_json(file_path=path.join(dataset_path, "data.json"))
+    noise_map = af.util.numpy_array_from_json(
+        file_path=path.join(dataset_path, "noise_map.json")
+    )
+
+    analysis = Analysis(data=data, noise_map=noise_map)
+
+    dynesty = af.DynestyStatic(
+        path_prefix=path.join("features", "database_summaries"),
+        unique_tag=dataset_name,
+        session=session,
+        nlive=50,
+    )
+
+    result = dynesty.fit(model=model, analysis=analysis)
+
+session.commit()
+
+"""
+__Summaries__
+
+The name of a summary is the quantity followed by the path of the parameter in the model, for example
+`median_pdf.gaussian.centre`. The `summaries_from` function lists every summary of a fit.
+"""
+print(list(summaries.summaries_from(samples=result.samples, sigmas=[1.0, 3.0])))
+
+"""
+The `values` function returns the value of a summary for every fit of an aggregator, as `(fit_id, value)` tuples in
+the order of the ids of the fits.
+
+We load the aggregator via `summaries.aggregator_from_database`, which loads the same database in the output folder
+without changing it. The database was opened via `summaries.open_database`, so it has the `parameter_summary` table
+the queries below use. A database written via `af.db.open_database` is migrated once, before it is queried, via
+`summaries.migrate_database("database.sqlite")`, which creates the table and fills it with the summaries of its fits.
+"""
+agg = summaries.aggregator_from_database("database_summaries.sqlite")
+
+print("Median PDF Centres:")
+print(summaries.values(aggregator=agg, name="median_pdf.gaussian.centre"))
+print("Upper Errors of Centres at 3.0 sigma:")
+print(summaries.values(aggregator=agg, name="error_upper_sigma_3.gaussian.centre"))
+print("Log Evidences:")
+print(summaries.values(aggregator=agg, name="log_evidence"), "\n")
+
+"""
+Summaries can be used with queries, like all other results of the aggregator.
+"""
+agg_query = agg.query(agg.unique_tag == "gaussian_x1_1")
+
+print(summaries.values(aggregator=agg_query, name="median_pdf.gaussian.sigma"))
+
+"""
+__Querying__
+
+The `database.py` example queries for every fit whose inferred value of `sigma` is less than 3.0 via
+`agg.query(agg.gaussian.sigma < 3.0)`. The query below selects fits whose median PDF `sigma` is less than 3.0 via the
+`parameter_summary` table, where the database finds them using the index on the table rather than by comparing the
+value of every fit.
+"""
+agg_query = agg.query(summaries.median_pdf("gaussian.sigma") < 3.0)
+
+print("Total Fits In Query `median_pdf sigma < 3.0` = ", len(agg_query))
+
+"""
+These queries are combined with all other queries using `&`, `|` and `~`.
+"""
+agg_query = agg.query(
+    (agg.gaussian == m.Gaussian)
+    & (summaries.max_log_likelihood("gaussian.centre") >= 49.0)
+    & ~(summaries.median_pdf("gaussian.sigma") < 3.0)
+)
+
+print(
+    "Total Fits In Query `Gaussian & centre >= 49.0 & not sigma < 3.0` = ",
+    len(agg_query),
+    "\n",
+)
+
+"""
+__Load Time__
+
+We compare the time taken to read the median PDF centre of every fit via the summaries and via the `Samples`.
+"""
+start = time.perf_counter()
+summaries.values(aggregator=agg, name="median_pdf.gaussian.centre")
+print(f"Via summaries: {time.perf_counter() - start:.6f} seconds")
+
+start = time.perf_counter()
+[samples.median_pdf_instance.gaussian.centre for samples in agg.values("samples")]
+print(f"Via samples: {time.perf_counter() - start:.6f} seconds")
+
+"""
+__Export__
+
+The `to_arrow` function exports the summaries, `unique_tag` and `info` of every fit to an Apache Arrow table with one
+row per fit, which is converted to a **pandas** `DataFrame` for analysis (this requires **pyarrow** to be installed,
+e.g. via `pip install pyarrow`).
+"""
+table = summaries.to_arrow(aggregator=agg)
+
+print(table.to_pandas())
+
+"""
+The `to_parquet` function writes them to a Parquet file, which is read by **pandas**, **polars**, DuckDB, Spark and most
+other data analysis tools. The fits are written in batches, so exporting a database of many fits does not load all of
+their results into memory at once.
+
+The `columns` input selects the columns which are exported.
+"""
+summaries.to_parquet(
+    aggregator=agg,
+    file_path=path.join("output", "features", "database_summaries.parquet"),
+    columns=[
+        "unique_tag",
+        "median_pdf.gaussian.centre",
+        "median_pdf.gaussian.sigma",
+        "log_evidence",
+        "time",
+    ],
+)
+
+"""
+Finish.
+"""
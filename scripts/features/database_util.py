@@ -0,0 +1,351 @@
+import autofit as af
+from autoconf import conf
+import multiprocessing as mp
+import os
+from os import path
+import pickle
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+import time
+
+"""
+The `database_util.py` module contains tools for the .sqlite databases that searches write their results to.
+
+The `database_path_from` function gives the path of a database in the output folder, which sessions are opened and
+aggregators are loaded with.
+
+The `fit_batches_from` function reads the fits of an aggregator in batches with SQL queries, without loading every
+`Fit` at once.
+
+The `open_database` function opens a session of a database which many searches running at once (e.g. one process
+per dataset) can write their results to, without lock errors or waiting for one another.
+"""
+
+
+def database_path_from(filename):
+    """
+    The full path of the .sqlite file of a database in the output folder.
+
+    Some versions of `af.db.open_database` put the file in the output folder and others use the filename as given,
+    so sessions are opened (and aggregators loaded) with this path, which is the same file for every version.
+
+    The output folder is created if it does not exist, as SQLite cannot create a database in a missing folder.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the .sqlite file of the database, which is in the output folder.
+    """
+    os.makedirs(conf.instance.output_path, exist_ok=True)
+
+    return path.abspath(path.join(conf.instance.output_path, filename))
+
+
+def fit_ids_query_from(aggregator):
+    """
+    The SQL query which selects the ids of the fits of an `Aggregator` of a database (which may have been queried or
+    sliced).
+
+    Queries on the results of the fits use it as a subquery (e.g. `... WHERE fit_id IN (<query>)`), so the database
+    selects the fits itself and no `Fit` is loaded. Colons in the query (e.g. in a `unique_tag` it compares to) are
+    escaped, so that the query can be used in a `text` query with bound parameters.
+
+    Parameters
+    ----------
+    aggregator : af.Aggregator
+        The aggregator of the fits, which may have been queried.
+    """
+    limit = -1 if aggregator._limit is None else int(aggregator._limit)
+
+    fit_query = aggregator._predicate.fit_query.replace(":", "\\:")
+
+    return (
+        f"SELECT id FROM fit WHERE id IN ({fit_query}) "
+        f"LIMIT {limit} OFFSET {int(aggregator._offset)}"
+    )
+
+
+def values_from(aggregator, name):
+    """
+    Returns a list of the id and the object with a name saved via `paths.save_object` of every fit of an `Aggregator`,
+    as `(fit_id, value)` tuples in the order of the ids. The value of a fit which does not have the object is `None`.
+
+    For an `Aggregator` of a database, the value is the string or bytes stored in the database (it is not unpickled)
+    and every value is read with a single SQL query, which selects the fits of the `Aggregator` as a subquery, so no
+    `Fit` is loaded. For an `Aggregator` of an output folder, the value is loaded by the `Aggregator` and the id of a
+    fit is the name of its output folder (which is its id in a database).
+
+    Parameters
+    ----------
+    aggregator : af.Aggregator
+        The aggregator of the fits, which may have been queried.
+    name : str
+        The name of the objects.
+    """
+    if not hasattr(aggregator, "session"):
+        return sorted(
+            zip(
+                [path.basename(search_output.directory) for search_output in aggregator],
+                aggregator.values(name),
+            ),
+            key=lambda fit_id_and_value: fit_id_and_value[0],
+        )
+
+    fit_ids_query = fit_ids_query_from(aggregator=aggregator)
+
+    rows = aggregator.session.execute(
+        text(
+            f"SELECT fit.id, pickle.string FROM ({fit_ids_query}) AS fit "
+            "LEFT JOIN pickle ON pickle.fit_id IS NOT NULL "
+            "AND pickle.fit_id = fit.id AND pickle.name = :name ORDER BY fit.id"
+        ),
+        {"name": name},
+    )
+
+    return [(fit_id, value) for fit_id, value in rows]
+
+
+"""
+The names of the columns of the `fit` table, which every `Fit` of a database has as attributes.
+"""
+fit_columns = tuple(column.name for column in af.db.Fit.__table__.columns)
+
+
+def fit_batches_from(aggregator, batch_size, columns=("id", "unique_tag")):
+    """
+    Returns a generator of batches of the rows of the fits of an `Aggregator` of a database, in the order of their
+    ids, where every row has the input columns of the `fit` table (e.g. the `id` and `unique_tag` of the fit).
+
+    Every batch is read with its own SQL query, which selects the next `batch_size` fits of the `Aggregator` after
+    the last fit of the previous batch, so no `Fit` is loaded and the ids of every fit are never held in memory at
+    once.
+
+    Parameters
+    ----------
+    aggregator : af.Aggregator
+        The aggregator of the fits, which may have been queried.
+    batch_size : int
+        The number of fits in every batch.
+    columns : (str)
+        The columns of the `fit` table of every row, which must include the `id`.
+    """
+    if not hasattr(aggregator, "session"):
+        raise ValueError(
+            "Only the fits of an Aggregator of a database can be read in batches."
+        )
+
+    unknown_columns = [column for column in columns if column not in fit_columns]
+
+    if unknown_columns:
+        raise KeyError(f"The fit table has no columns {unknown_columns}.")
+
+    batch_query = text(
+        f"SELECT {', '.join(columns)} FROM fit "
+        f"WHERE id IN ({fit_ids_query_from(aggregator=aggregator)}) "
+        "AND (:last_id IS NULL OR id > :last_id) ORDER BY id LIMIT :batch_size"
+    )
+
+    last_id = None
+
+    while True:
+
+        batch = aggregator.session.execute(
+            batch_query, {"last_id": last_id, "batch_size": batch_size}
+        ).fetchall()
+
+        if len(batch) == 0:
+            return
+
+        yield batch
+
+        last_id = batch[-1].id
+
+
+"""
+__Database Writes__
+
+A search writes its results to the database in one batch when it completes (hundreds of rows of its samples, model
+and pickles). When many searches write to one database at once (e.g. one process per dataset on a cluster node),
+SQLite only lets one of them write at a time, and a session opened via `af.db.open_database`:
+
+ - Synchronizes every commit to hard-disk several times (via its rollback journal), so every write holds the lock
+ for longer than it takes to write the rows.
+ - Cannot write while another process reads the database (e.g. a search checking whether its fit is complete, or
+ the `Aggregator`), and vice versa.
+ - Raises a `database is locked` error if it waits longer than 5 seconds for the lock.
+
+When hundreds of searches complete at once, the writes queue up for longer than 5 seconds and searches fail after
+their model-fit has completed. A session opened via `open_database` instead uses SQLite's write-ahead log (WAL), where
+a commit is appended to the log without synchronizing it to hard-disk and reads never wait for writes (or writes for
+reads), and it waits up to `timeout` seconds for the lock.
+
+The database must be on a local disk (not a network file system), as SQLite's write-ahead log uses shared memory.
+"""
+
+
+def _set_write_ahead_log(dbapi_connection, connection_record):
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def open_database(filename, timeout=600.0):
+    """
+    Open a session of a database (like `af.db.open_database`), which many processes can write the results of
+    searches to at once.
+
+    Every process opens its own session and passes it to its searches via their `session` input.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the .sqlite file of the database, which is in the output folder (see `database_path_from`).
+    timeout : float
+        The time (in seconds) a commit waits for the commits of other processes before raising an error.
+    """
+    database_path = database_path_from(filename=filename)
+
+    engine = create_engine(
+        f"sqlite:///{database_path}", connect_args={"timeout": timeout}
+    )
+    event.listen(engine, "connect", _set_write_ahead_log)
+
+    for attempt in range(10):
+        try:
+            af.db.Base.metadata.create_all(engine)
+            break
+        except OperationalError:
+            """
+            Another process created the tables after this process checked whether they exist. If the tables still
+            cannot be created after every attempt, the database cannot be used and the error is raised.
+            """
+            if attempt == 9:
+                raise
+
+            time.sleep(0.1)
+
+    return sessionmaker(bind=engine)()
+
+
+def _simulated_writer(
+    filename, concurrent, writer_index, total_fits, fit_time, total_objects, size
+):
+    """
+    Write the results of `total_fits` simulated searches to a database in the way a search does: committing its `Fit`
+    when it starts, "fitting" for `fit_time` seconds and committing `total_objects` objects of results when it
+    completes.
+
+    Returns the number of fits written and the number which failed because the database was locked.
+    """
+    if concurrent:
+        session = open_database(filename=filename)
+    else:
+        session = af.db.open_database(database_path_from(filename=filename))
+
+    written = 0
+    locked = 0
+
+    for fit_index in range(total_fits):
+
+        try:
+            fit = af.db.Fit(
+                id=f"writer_{writer_index}_fit_{fit_index}",
+                is_complete=False,
+                unique_tag=f"writer_{writer_index}",
+            )
+            session.add(fit)
+            session.commit()
+
+            time.sleep(fit_time)
+
+            for object_index in range(total_objects):
+                fit[f"object_{object_index}"] = pickle.dumps(os.urandom(size))
+
+            fit.is_complete = True
+            session.commit()
+
+            written += 1
+        except OperationalError:
+            session.rollback()
+            locked += 1
+
+    session.close()
+
+    return written, locked
+
+
+def benchmark_database_writes(
+    filename,
+    number_of_writers=8,
+    fits_per_writer=5,
+    fit_time=0.5,
+    total_objects=100,
+    size=10000,
+    concurrent=True,
+):
+    """
+    Benchmark writing to a database from many processes at once, where every process simulates searches writing
+    their results (see `_simulated_writer`).
+
+    Returns a dictionary of the number of fits written, the number which failed because the database was locked and
+    the time taken. If no process waited for another, the time taken is close to `fits_per_writer * fit_time`.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the .sqlite file of the database in the output folder, which is removed before the benchmark.
+    number_of_writers : int
+        The number of processes writing to the database at once.
+    fits_per_writer : int
+        The number of searches each process simulates, one after another.
+    fit_time : float
+        The time (in seconds) each simulated search takes between committing its start and its results.
+    total_objects : int
+        The number of objects each simulated search saves when it completes.
+    size : int
+        The size (in bytes) of each object a simulated search saves.
+    concurrent : bool
+        If `True` every process opens its session via `open_database`, else via `af.db.open_database`.
+    """
+    database_path = database_path_from(filename=filename)
+
+    for suffix in ("", "-wal", "-shm"):
+        if path.exists(f"{database_path}{suffix}"):
+            os.remove(f"{database_path}{suffix}")
+
+    """
+    The tables are created before the writers start, as processes creating them at once via `af.db.open_database`
+    fail.
+    """
+    if concurrent:
+        open_database(filename=filename).close()
+    else:
+        af.db.open_database(database_path).close()
+
+    start = time.perf_counter()
+
+    with mp.Pool(processes=number_of_writers) as pool:
+        results = pool.starmap(
+            _simulated_writer,
+            [
+                (
+                    filename,
+                    concurrent,
+                    writer_index,
+                    fits_per_writer,
+                    fit_time,
+                    total_objects,
+                    size,
+                )
+                for writer_index in range(number_of_writers)
+            ],
+        )
+
+    return {
+        "written": sum(written for written, _ in results),
+        "locked": sum(locked for _, locked in results),
+        "time": time.perf_counter() - start,
+    }
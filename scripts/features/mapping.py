@@ -0,0 +1,548 @@
+import autofit as af
+from autoconf import conf
+from autofit import exc
+import inspect
+from multiprocessing import reduction
+import numpy as np
+from scipy import special
+
+"""
+The `mapping.py` module contains faster alternatives to a model's `instance_from_vector` and
+`vector_from_unit_vector` methods.
+
+For every vector of parameters a non-linear search samples, `instance_from_vector` walks the tree of `Model`'s and
+`Collection`'s of the model, builds a dictionary mapping every prior to its value, looks up every argument of every
+component in it and checks every value is within its prior's limits one at a time. For a model with many components
+this can take as long as the likelihood function.
+
+A `MappingPlan` instead walks the model once, recording for every component its class, its fixed arguments and the
+index in the vector of each of its parameters. Instances are then created by indexing the vector and calling each
+class, with every value checked against the limits of its prior in one NumPy comparison.
+"""
+
+
+class ArgumentsPlan:
+    def __init__(self):
+        """
+        The arguments of a component of a model, where every argument is either fixed, the value of a parameter in
+        the vector or an instance of another component.
+        """
+        self.constants = {}
+        self.prior_indexes = []
+        self.children = []
+
+    def add(self, name, value, index_for_prior, template_vector):
+
+        if isinstance(value, af.AbstractPriorModel):
+            self.children.append(
+                (
+                    name,
+                    plan_from(
+                        model=value,
+                        index_for_prior=index_for_prior,
+                        template_vector=template_vector,
+                    ),
+                )
+            )
+        elif isinstance(value, af.Prior):
+            self.prior_indexes.append((name, index_for_prior[value.id]))
+        else:
+            self.constants[name] = value
+
+    def __len__(self):
+        return len(self.constants) + len(self.prior_indexes) + len(self.children)
+
+    def values_from(self, vector):
+
+        values = dict(self.constants)
+
+        for name, index in self.prior_indexes:
+            values[name] = vector[index]
+
+        for name, child in self.children:
+            values[name] = child.instance_from(vector)
+
+        return values
+
+    def update(self, instance, vector):
+
+        for name, index in self.prior_indexes:
+            instance.__dict__[name] = vector[index]
+
+        for name, child in self.children:
+            if child.can_update:
+                child.update(getattr(instance, name), vector)
+            else:
+                instance.__dict__[name] = child.instance_from(vector)
+
+
+class ComponentPlan:
+    def __init__(self, model, index_for_prior, template_vector):
+        """
+        The plan of a `Model` whose instances are created by calling its class with its arguments.
+
+        The attributes of the `Model` which the class does not set (e.g. attributes set on the model after it was
+        created) are set on every instance afterwards, as `instance_from_vector` does.
+
+        Parameters
+        ----------
+        model : af.Model
+            The model of the component.
+        index_for_prior : dict
+            The index in the vector of every prior of the whole model, keyed by the id of the prior.
+        template_vector : [float]
+            A vector of parameters which is used to create an instance of the class when the plan is compiled, in
+            order to find which attributes the class does not set.
+        """
+        self.cls = model.cls
+
+        self.arguments = ArgumentsPlan()
+
+        for name in model.constructor_argument_names:
+            if name in model.__dict__:
+                self.arguments.add(
+                    name=name,
+                    value=model.__dict__[name],
+                    index_for_prior=index_for_prior,
+                    template_vector=template_vector,
+                )
+
+        template = self.cls(**self.arguments.values_from(template_vector))
+
+        self.extras = ArgumentsPlan()
+
+        for name, value in model.__dict__.items():
+            if (
+                name == "cls"
+                or isinstance(value, af.Prior)
+                or hasattr(template, name)
+            ):
+                continue
+
+            if isinstance(value, af.Model):
+                self.extras.add(
+                    name=name,
+                    value=value,
+                    index_for_prior=index_for_prior,
+                    template_vector=template_vector,
+                )
+            else:
+                self.extras.constants[name] = value
+
+        self.can_update = True
+
+    def instance_from(self, vector):
+
+        instance = self.cls(**self.arguments.values_from(vector))
+
+        if len(self.extras) > 0:
+            for name, value in self.extras.values_from(vector).items():
+                try:
+                    setattr(instance, name, value)
+                except AttributeError:
+                    pass
+
+        return instance
+
+    def update(self, instance, vector):
+        self.arguments.update(instance=instance, vector=vector)
+        self.extras.update(instance=instance, vector=vector)
+
+
+class CollectionPlan:
+    def __init__(self, model, index_for_prior, template_vector):
+        """
+        The plan of a `Collection`, whose instances are a `ModelInstance` with an attribute for every item of the
+        collection, in the same order.
+        """
+        self.items = []
+
+        for name, value in model.__dict__.items():
+
+            arguments = ArgumentsPlan()
+            arguments.add(
+                name=name,
+                value=value,
+                index_for_prior=index_for_prior,
+                template_vector=template_vector,
+            )
+
+            self.items.append((name, arguments))
+
+        self.can_update = True
+
+    def instance_from(self, vector):
+
+        instance = af.ModelInstance()
+
+        for name, arguments in self.items:
+            setattr(instance, name, arguments.values_from(vector)[name])
+
+        return instance
+
+    def update(self, instance, vector):
+
+        for _, arguments in self.items:
+            arguments.update(instance=instance, vector=vector)
+
+
+class ModelPlan:
+    def __init__(self, model, index_for_prior):
+        """
+        The plan of a `Model` which cannot be compiled (e.g. because it has tuple priors or its class is a function),
+        whose instances are created by the model itself from the values of its priors.
+
+        Its instances cannot be updated with the values of a new vector, so when instances are reused the component or
+        collection containing it creates a new instance of it for every vector instead.
+        """
+        self.model = model
+        self.prior_indexes = [
+            (prior_tuple.prior, index_for_prior[prior_tuple.prior.id])
+            for prior_tuple in model.prior_tuples_ordered_by_id
+        ]
+        self.can_update = False
+
+    def instance_from(self, vector):
+        return self.model.instance_for_arguments(
+            {prior: vector[index] for prior, index in self.prior_indexes},
+            assert_priors_in_limits=False,
+        )
+
+
+def plan_from(model, index_for_prior, template_vector):
+    """
+    Returns the plan of a `Model` or `Collection` of a model.
+    """
+    if isinstance(model, af.Collection):
+        return CollectionPlan(
+            model=model,
+            index_for_prior=index_for_prior,
+            template_vector=template_vector,
+        )
+
+    if (
+        isinstance(model, af.Model)
+        and inspect.isclass(model.cls)
+        and not model.is_deferred_arguments
+        and len(model.tuple_prior_tuples) == 0
+    ):
+        return ComponentPlan(
+            model=model,
+            index_for_prior=index_for_prior,
+            template_vector=template_vector,
+        )
+
+    return ModelPlan(model=model, index_for_prior=index_for_prior)
+
+
+class MappingPlan:
+    def __init__(self, model, reuse_instances=False):
+        """
+        A compiled plan of how a model maps a vector of parameters to an instance, which creates the same instances
+        as the model's `instance_from_vector` method in less time.
+
+        If `reuse_instances` is `True`, the instance created by the first call is reused by every call after it, with
+        its parameters assigned the values of the new vector rather than new objects being created. This is only
+        correct for classes whose `__init__` only stores its arguments as attributes of the same name (as the
+        `Gaussian` and `Exponential` of the examples do), and if the instance is not kept after the next vector is
+        mapped (the likelihood function of an `Analysis` does not keep it). Components which cannot be compiled (e.g.
+        components with tuple priors) are still created anew for every vector.
+
+        Parameters
+        ----------
+        model : af.Model or af.Collection
+            The model which is compiled.
+        reuse_instances : bool
+            If `True`, the same instance is updated for every vector instead of creating a new instance.
+        """
+        prior_tuples = model.prior_tuples_ordered_by_id
+
+        index_for_prior = {
+            prior_tuple.prior.id: index
+            for index, prior_tuple in enumerate(prior_tuples)
+        }
+
+        self.lower_limits = np.array(
+            [prior_tuple.prior.lower_limit for prior_tuple in prior_tuples]
+        )
+        self.upper_limits = np.array(
+            [prior_tuple.prior.upper_limit for prior_tuple in prior_tuples]
+        )
+
+        self.plan = plan_from(
+            model=model,
+            index_for_prior=index_for_prior,
+            template_vector=[
+                prior_tuple.prior.value_for(0.5) for prior_tuple in prior_tuples
+            ],
+        )
+
+        if reuse_instances and not self.plan.can_update:
+            raise exc.PriorException(
+                "Instances of this model cannot be reused, because it is a single component which is not created by "
+                "calling a class (e.g. a component with tuple priors)."
+            )
+
+        self.reuse_instances = reuse_instances
+        self._instance = None
+
+    def instance_from_vector(self, vector, assert_priors_in_limits=True):
+        """
+        Returns the instance of the model for a vector of physical parameter values, checking (unless
+        `ignore_prior_limits` is set in the config) that every value is within the limits of its prior.
+
+        Parameters
+        ----------
+        vector : [float]
+            A vector of physical parameter values, in the order of the model's `prior_tuples_ordered_by_id`.
+        assert_priors_in_limits : bool
+            If `True` it is checked that the physical values of priors are within set limits.
+        """
+        if (
+            assert_priors_in_limits
+            and not conf.instance["general"]["model"]["ignore_prior_limits"]
+        ):
+
+            values = np.asarray(vector, dtype="float")
+            outside_limits = (values < self.lower_limits) | (
+                values > self.upper_limits
+            )
+
+            if np.any(outside_limits):
+
+                index = np.argmax(outside_limits)
+
+                raise exc.PriorLimitException(
+                    "The physical value {} for a prior "
+                    "was not within its limits {}, {}".format(
+                        values[index], self.lower_limits[index], self.upper_limits[index]
+                    )
+                )
+
+        if not self.reuse_instances:
+            return self.plan.instance_from(vector)
+
+        if self._instance is None:
+            self._instance = self.plan.instance_from(vector)
+        else:
+            self.plan.update(instance=self._instance, vector=vector)
+
+        return self._instance
+
+
+"""
+__Prior Transforms__
+
+Nested samplers sample points in a unit hypercube, which the `vector_from_unit_vector` method of the model maps to
+physical parameter values by calling the `value_for` method of every prior, one value at a time. A `PriorTransform`
+instead maps a whole matrix of unit vectors at once, applying every type of prior to its columns with NumPy.
+"""
+
+
+class PriorTransform:
+    def __init__(self, model, truncate_gaussians=True):
+        """
+        Maps vectors of unit values to vectors of physical values using the priors of a model, where the columns of
+        every `UniformPrior`, `LogUniformPrior` and `GaussianPrior` are mapped with NumPy and the columns of any other
+        prior via its `value_for` method.
+
+        The `value_for` method of a `GaussianPrior` does not use its limits, so values outside them are only rejected
+        when an instance is created from them. Limits are set on a `GaussianPrior` when it is created from the results
+        of a previous search (using the `gaussian_limits` of the prior config files). If `truncate_gaussians` is
+        `True`, unit values are mapped to the Gaussian truncated at the limits, so that every value is within them and
+        no point sampled by the search is rejected. Within the limits the distribution is the same.
+
+        Parameters
+        ----------
+        model : af.Model or af.Collection
+            The model whose priors map the unit values.
+        truncate_gaussians : bool
+            If `True`, every `GaussianPrior` is truncated at its limits.
+        """
+        self.priors = [
+            prior_tuple.prior for prior_tuple in model.prior_tuples_ordered_by_id
+        ]
+
+        self.uniform_indexes = []
+        self.log_uniform_indexes = []
+        self.gaussian_indexes = []
+        self.other_indexes = []
+
+        for index, prior in enumerate(self.priors):
+
+            if isinstance(prior, af.LogUniformPrior):
+                self.log_uniform_indexes.append(index)
+            elif isinstance(prior, af.UniformPrior):
+                self.uniform_indexes.append(index)
+            elif isinstance(prior, af.GaussianPrior):
+                self.gaussian_indexes.append(index)
+            else:
+                self.other_indexes.append(index)
+
+        uniform_priors = [self.priors[index] for index in self.uniform_indexes]
+
+        self.uniform_lower_limits = np.array(
+            [prior.lower_limit for prior in uniform_priors]
+        )
+        self.uniform_widths = np.array(
+            [prior.upper_limit - prior.lower_limit for prior in uniform_priors]
+        )
+
+        log_uniform_priors = [self.priors[index] for index in self.log_uniform_indexes]
+
+        self.log_lower_limits = np.log10(
+            [prior.lower_limit for prior in log_uniform_priors]
+        )
+        self.log_widths = (
+            np.log10([prior.upper_limit for prior in log_uniform_priors])
+            - self.log_lower_limits
+        )
+
+        gaussian_priors = [self.priors[index] for index in self.gaussian_indexes]
+
+        self.means = np.array([prior.mean for prior in gaussian_priors])
+        self.sigmas = np.array([prior.sigma for prior in gaussian_priors])
+
+        if truncate_gaussians and len(gaussian_priors) > 0:
+
+            lower_limits = np.array([prior.lower_limit for prior in gaussian_priors])
+            upper_limits = np.array([prior.upper_limit for prior in gaussian_priors])
+
+            self.gaussian_unit_lower_limits = special.ndtr(
+                (lower_limits - self.means) / self.sigmas
+            )
+            self.gaussian_unit_widths = (
+                special.ndtr((upper_limits - self.means) / self.sigmas)
+                - self.gaussian_unit_lower_limits
+            )
+
+        else:
+
+            self.gaussian_unit_lower_limits = np.zeros(len(gaussian_priors))
+            self.gaussian_unit_widths = np.ones(len(gaussian_priors))
+
+    def vectors_from_unit_vectors(self, unit_vectors):
+        """
+        Map a matrix of unit vectors, of shape (total_vectors, total_parameters), to physical vectors of the same
+        shape. A single unit vector is mapped to a single physical vector.
+
+        Parameters
+        ----------
+        unit_vectors : np.ndarray
+            The unit vectors (each value between 0 and 1) which are mapped.
+        """
+        unit_vectors = np.asarray(unit_vectors, dtype="float")
+
+        if unit_vectors.ndim == 1:
+            return self.vectors_from_unit_vectors(unit_vectors[None, :])[0]
+
+        vectors = np.empty(unit_vectors.shape)
+
+        vectors[:, self.uniform_indexes] = (
+            self.uniform_lower_limits
+            + unit_vectors[:, self.uniform_indexes] * self.uniform_widths
+        )
+
+        vectors[:, self.log_uniform_indexes] = 10.0 ** (
+            self.log_lower_limits
+            + unit_vectors[:, self.log_uniform_indexes] * self.log_widths
+        )
+
+        vectors[:, self.gaussian_indexes] = self.means + self.sigmas * special.ndtri(
+            self.gaussian_unit_lower_limits
+            + unit_vectors[:, self.gaussian_indexes] * self.gaussian_unit_widths
+        )
+
+        for index in self.other_indexes:
+            vectors[:, index] = [
+                self.priors[index].value_for(unit) for unit in unit_vectors[:, index]
+            ]
+
+        return vectors
+
+
+def vectors_from_unit_vectors(model, unit_vectors, truncate_gaussians=True):
+    """
+    Map a matrix of unit vectors, of shape (total_vectors, total_parameters), to physical vectors using the priors of
+    a model (see `PriorTransform`).
+
+    This creates a `PriorTransform` for every call, so a `PriorTransform` should be created once and reused when many
+    batches of vectors are mapped.
+
+    Parameters
+    ----------
+    model : af.Model or af.Collection
+        The model whose priors map the unit values.
+    unit_vectors : np.ndarray
+        The unit vectors (each value between 0 and 1) which are mapped.
+    truncate_gaussians : bool
+        If `True`, every `GaussianPrior` is truncated at its limits.
+    """
+    return PriorTransform(
+        model=model, truncate_gaussians=truncate_gaussians
+    ).vectors_from_unit_vectors(unit_vectors=unit_vectors)
+
+
+def _model_from(model):
+    return model
+
+
+def _mapped_model_from(model, reuse_instances):
+    return MappedModel(model=model, reuse_instances=reuse_instances)
+
+
+class MappedModel:
+    def __init__(self, model, reuse_instances=False):
+        """
+        Wraps a model so that its `instance_from_vector` method uses a `MappingPlan` and its `vector_from_unit_vector`
+        method uses a `PriorTransform`, so that a non-linear search fitting the wrapped model maps every vector it
+        samples via them.
+
+        The `vectors_from_unit_vectors` method maps a whole matrix of unit vectors at once, for searches which
+        propose many points in one batch.
+
+        Every other attribute is that of the model. The wrapper pickles as the model itself, so the model output by
+        the search is not wrapped. When it is sent to the processes of a search with `number_of_cores` > 1 it is
+        pickled by **multiprocessing**, which recompiles the wrapper in every process so that they use it too.
+
+        Parameters
+        ----------
+        model : af.Model or af.Collection
+            The model which is compiled.
+        reuse_instances : bool
+            If `True`, the same instance is updated for every vector instead of creating a new instance.
+        """
+        self.model = model
+        self.reuse_instances = reuse_instances
+        self.mapping_plan = MappingPlan(model=model, reuse_instances=reuse_instances)
+        self.prior_transform = PriorTransform(model=model)
+
+    def __getattr__(self, item):
+
+        if item in ("model", "reuse_instances", "mapping_plan", "prior_transform"):
+            raise AttributeError(item)
+
+        return getattr(self.model, item)
+
+    def __reduce__(self):
+        return _model_from, (self.model,)
+
+    def instance_from_vector(self, vector, assert_priors_in_limits=True):
+        return self.mapping_plan.instance_from_vector(
+            vector=vector, assert_priors_in_limits=assert_priors_in_limits
+        )
+
+    def vector_from_unit_vector(self, unit_vector):
+        return list(
+            self.prior_transform.vectors_from_unit_vectors(unit_vectors=unit_vector)
+        )
+
+    def vectors_from_unit_vectors(self, unit_vectors):
+        return self.prior_transform.vectors_from_unit_vectors(unit_vectors=unit_vectors)
+
+
+def _reduce_mapped_model(mapped_model):
+    return _mapped_model_from, (mapped_model.model, mapped_model.reuse_instances)
+
+
+reduction.ForkingPickler.register(MappedModel, _reduce_mapped_model)
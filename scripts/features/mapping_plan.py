@@ -0,0 +1,165 @@
+"""
+Feature: Mapping Plan
+=====================
+
+For every vector of parameters a non-linear search samples, the model's `instance_from_vector` method maps the
+vector to an instance of the model, which is passed to the likelihood function. This walks the tree of `Model`'s and
+`Collection`'s that make up the model, so for models made of many components it can take as long as the likelihood
+function itself (the `Profiler` of the `profiling.py` example shows how long it takes for a model-fit).
+
+A `MappingPlan` (see `mapping.py`) walks the model once, recording the class of every component, its fixed arguments
+and the index in the vector of every parameter. Instances are then created by indexing the vector and calling each
+class. This example compares the two for a model of 10 `Gaussian`'s, does the same for mapping points from the unit
+hypercube to physical values via the priors, and then fits a model using both.
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+import autofit as af
+import numpy as np
+from os import path
+import timeit
+
+import model as m
+import analysis as a
+import mapping
+
+"""
+__Model__
+
+We compose a model of 10 `Gaussian`'s, where the first two share the same `centre` and the `sigma` of the third is
+fixed, giving N=28 parameters.
+"""
+model = af.Collection(**{f"gaussian_{index}": m.Gaussian for index in range(10)})
+
+model.gaussian_1.centre = model.gaussian_0.centre
+model.gaussian_2.sigma = 5.0
+
+print(model.prior_count)
+
+"""
+__Mapping Plan__
+
+We compile the model's plan and map the same vector using the model and using the plan, which gives the same
+instance.
+"""
+mapping_plan = mapping.MappingPlan(model=model)
+
+vector = [
+    prior_tuple.prior.value_for(0.5) for prior_tuple in model.prior_tuples_ordered_by_id
+]
+
+instance = model.instance_from_vector(vector=vector)
+instance_via_plan = mapping_plan.instance_from_vector(vector=vector)
+
+print(instance.gaussian_1.centre, instance_via_plan.gaussian_1.centre)
+print(instance.gaussian_2.sigma, instance_via_plan.gaussian_2.sigma)
+
+"""
+If `reuse_instances` is `True`, the plan creates an instance for the first vector and assigns the values of every
+later vector to the same instance, rather than creating new objects.
+
+This is only correct for classes whose `__init__` only stores its arguments as attributes (like the `Gaussian`), and
+when the instance is not kept after the next vector is mapped.
+"""
+mapping_plan_reuse = mapping.MappingPlan(model=model, reuse_instances=True)
+
+for name, plan in [
+    ("instance_from_vector", model),
+    ("MappingPlan", mapping_plan),
+    ("MappingPlan (reuse_instances=True)", mapping_plan_reuse),
+]:
+
+    time = min(
+        timeit.repeat(
+            lambda: plan.instance_from_vector(vector=vector), number=100, repeat=3
+        )
+    )
+
+    print(f"{name}: {1e6 * time / 100:.2f} microseconds per call")
+
+"""
+__Prior Transforms__
+
+Nested samplers sample points in a unit hypercube, which are mapped to physical parameter values using the priors
+of the model. The model's `vector_from_unit_vector` method maps one point at a time, calling every prior in turn.
+
+A `PriorTransform` maps a whole matrix of points, of shape (total_points, total_parameters), applying each type of
+prior to its columns with NumPy.
+"""
+prior_transform = mapping.PriorTransform(model=model)
+
+unit_vectors = np.random.uniform(low=0.0, high=1.0, size=(1000, model.prior_count))
+
+time_per_point = min(
+    timeit.repeat(
+        lambda: [
+            model.vector_from_unit_vector(unit_vector) for unit_vector in unit_vectors
+        ],
+        number=1,
+        repeat=3,
+    )
+)
+time_batched = min(
+    timeit.repeat(
+        lambda: prior_transform.vectors_from_unit_vectors(unit_vectors=unit_vectors),
+        number=1,
+        repeat=3,
+    )
+)
+
+print(
+    f"vector_from_unit_vector: {1e6 * time_per_point / 1000:.2f} microseconds per point"
+)
+print(f"PriorTransform: {1e6 * time_batched / 1000:.2f} microseconds per point")
+
+"""
+A `GaussianPrior` passed from the results of a previous search has limits (set by the `gaussian_limits` of the prior
+config files), and the `vector_from_unit_vector` method gives values outside them, which are then rejected by the
+search. The `PriorTransform` instead maps points to the Gaussian truncated at its limits, so every value is within
+them.
+"""
+model_gaussian = af.Collection(gaussian=m.Gaussian)
+model_gaussian.gaussian.sigma = af.GaussianPrior(
+    mean=1.0, sigma=2.0, lower_limit=0.0, upper_limit=np.inf
+)
+
+vectors = mapping.vectors_from_unit_vectors(
+    model=model_gaussian, unit_vectors=np.random.uniform(size=(1000, 3))
+)
+
+print(np.min(vectors, axis=0))
+
+"""
+__Search__
+
+To fit a model using the plan, we pass the search a `MappedModel`, whose `instance_from_vector` method uses the plan,
+whose `vector_from_unit_vector` method uses a `PriorTransform` and whose other attributes are those of the model. The
+model output by the search is the model itself.
+"""
+dataset_path = path.join("dataset", "example_1d", "gaussian_x1")
+
+data = af.util.numpy_array_from_json(file_path=path.join(dataset_path, "data.json"))
+noise_map = af.util.numpy_array_from_json(
+    file_path=path.join(dataset_path, "noise_map.json")
+)
+
+analysis = a.Analysis(data=data, noise_map=noise_map)
+
+dynesty = af.DynestyStatic(
+    name="mapping_plan", path_prefix=path.join("features"), nlive=50
+)
+
+result = dynesty.fit(
+    model=mapping.MappedModel(model=af.Collection(gaussian=m.Gaussian)),
+    analysis=analysis,
+)
+
+print(result.max_log_likelihood_instance.gaussian.centre)
+
+"""
+Finish.
+"""
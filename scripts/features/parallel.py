@@ -0,0 +1,471 @@
+import autofit as af
+from collections import deque
+import copy
+import hashlib
+import itertools
+import multiprocessing as mp
+from multiprocessing.reduction import ForkingPickler
+import numpy as np
+import os
+from os import path
+import pickle
+import shutil
+import tempfile
+import weakref
+
+"""
+The `parallel.py` module contains tools for performing many model-fits in parallel.
+
+When many short model-fits are performed one after another (e.g. fitting many datasets, or a chain of searches), the
+cost of creating a pool of processes and sending every `Analysis` (including its data) to every process can be
+comparable to the fits themselves. The `WorkerPool` below keeps its processes alive across fits and sends each
+`Analysis` to a process only once.
+
+The `map_aggregator` function applies a function to every fit of an `Aggregator` in parallel, for post-processing
+the results of many model-fits.
+"""
+
+"""
+__Shared Arrays__
+
+When a search uses `number_of_cores` > 1, or a fit is performed by a `WorkerPool`, the `Analysis` is pickled and sent
+to every process, meaning every process holds its own copy of the data. A shared array is instead stored in a
+memory-mapped file (in shared memory, `/dev/shm`, where available). Sending it to another process only sends the name
+of the file, and the process maps the same file read-only, so every process shares one copy of the data.
+"""
+shared_array_directory = "/dev/shm" if path.isdir("/dev/shm") else tempfile.gettempdir()
+
+"""
+The names of the arrays which are shared by default: the data and noise-map, and the arrays derived from them which
+the `Analysis` classes of the workspace compute once and only read during a fit (e.g. the `inverse_noise_map` and
+`xvalues` of the overview's `Analysis`).
+"""
+shared_array_names = ("data", "noise_map", "inverse_noise_map", "xvalues")
+
+
+"""
+A shared array is a plain `np.ndarray` view of a read-only `np.memmap` of its file, rather than the `np.memmap` itself,
+because every arithmetic result of an `np.memmap` (or a subclass of it) is itself an `np.memmap`, which makes every
+operation on the array in a log likelihood function several times slower.
+
+Arrays are sent to other processes by the `ForkingPickler` of `multiprocessing` (e.g. the arguments of every task of
+a `multiprocessing.Pool`), which is given a reducer of `np.ndarray` (when the first shared array of a process is
+created) that pickles a shared array as the name of its file and every other array as usual. Only what is sent
+between processes is changed: an array pickled by `pickle` (e.g. via `paths.save_object`, or to the database) is
+always pickled with its values, so it can be loaded after its file is removed. The files of the shared arrays of this
+process are kept in `_shared_array_filenames`.
+"""
+_shared_array_filenames = set()
+
+
+def is_shared_array(array):
+    """
+    Returns whether an array is a shared array, meaning it is sent to other processes as the name of its file. An
+    array which is only a view of part of a shared array (e.g. a slice) is not, and is sent as a copy of its values.
+    """
+    mapping = getattr(array, "base", None)
+
+    return (
+        type(array) is np.ndarray
+        and isinstance(mapping, np.memmap)
+        and mapping.filename in _shared_array_filenames
+        and array.shape == mapping.shape
+        and array.dtype == mapping.dtype
+        and array.ctypes.data == mapping.ctypes.data
+    )
+
+
+def _reduce_array(array):
+
+    if is_shared_array(array):
+        return (
+            _shared_array_from_file,
+            (array.base.filename, array.dtype.str, array.shape),
+        )
+
+    return array.__reduce__()
+
+
+def _shared_array_from_file(filename, dtype, shape):
+
+    mapping = np.memmap(filename, dtype=np.dtype(dtype), mode="r", shape=shape)
+
+    _shared_array_filenames.add(mapping.filename)
+    ForkingPickler.register(np.ndarray, _reduce_array)
+
+    return mapping.view(np.ndarray)
+
+
+def shared_array_from(array, directory=None):
+    """
+    Copy a NumPy array to a memory-mapped file in shared memory, returning a read-only shared array which every
+    process it is sent to shares, rather than receiving a copy.
+
+    If no `directory` is input, the file is removed when the returned array (and every view of it) is garbage
+    collected in the process which created it, or when that process exits. Processes which the array was sent to
+    must therefore only use it while this process holds a reference to it.
+
+    If a `directory` is input, the file is created in it and is not removed when the array is garbage collected, so
+    that whatever owns the directory (e.g. a `WorkerPool`) controls how long the file exists and removes it.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        The array that is shared.
+    directory : str, optional
+        The directory the file is created in, which is responsible for removing it.
+    """
+    array = np.ascontiguousarray(array)
+
+    file_descriptor, filename = tempfile.mkstemp(
+        prefix="shared_array_",
+        suffix=".bin",
+        dir=shared_array_directory if directory is None else directory,
+    )
+
+    with os.fdopen(file_descriptor, "wb") as f:
+        f.write(array.tobytes())
+
+    shared_array = _shared_array_from_file(
+        filename=filename, dtype=array.dtype.str, shape=array.shape
+    )
+
+    if directory is None:
+        weakref.finalize(shared_array.base, os.remove, filename)
+
+    return shared_array
+
+
+def share_arrays(analysis, names=shared_array_names, directory=None):
+    """
+    Replace arrays of an `Analysis` with shared arrays, so that sending the `Analysis` to other processes (e.g. by a
+    search with `number_of_cores` > 1) does not copy them.
+
+    The shared arrays are read-only, so only arrays which are not modified during a fit should be shared. Names which
+    the `Analysis` does not have as an array are skipped, so the default names can be used with any `Analysis`.
+
+    Parameters
+    ----------
+    analysis : af.Analysis
+        The `Analysis` whose arrays are shared.
+    names : (str)
+        The names of the attributes of the `Analysis` which are shared.
+    directory : str, optional
+        The directory the files of the arrays are created in (see `shared_array_from`).
+    """
+    for name in names:
+
+        array = getattr(analysis, name, None)
+
+        if isinstance(array, np.ndarray) and not is_shared_array(array):
+            setattr(
+                analysis, name, shared_array_from(array=array, directory=directory)
+            )
+
+    return analysis
+
+
+"""
+__Worker Pool__
+
+Every worker process caches the analyses it has loaded, keyed by a digest of their pickled state, so that
+consecutive fits using the same `Analysis` do not load it again. Only the most recently used analyses are kept, so
+that the memory of a worker does not grow with the number of datasets fitted.
+"""
+_analysis_cache = {}
+_analysis_cache_size = 4
+
+
+def _analysis_from(directory, digest):
+
+    try:
+        analysis = _analysis_cache.pop(digest)
+    except KeyError:
+        with open(path.join(directory, f"{digest}.pickle"), "rb") as f:
+            analysis = pickle.load(f)
+
+    _analysis_cache[digest] = analysis
+
+    while len(_analysis_cache) > _analysis_cache_size:
+        _analysis_cache.pop(next(iter(_analysis_cache)))
+
+    return analysis
+
+
+def _fit(directory, digest, search, model, info):
+    return search.fit(
+        model=model, analysis=_analysis_from(directory=directory, digest=digest), info=info
+    )
+
+
+class WorkerPool:
+    def __init__(self, number_of_cores, shared_array_names=shared_array_names):
+        """
+        A long-lived pool of processes which performs model-fits, where each fit runs in one process.
+
+        Fits are submitted using the `fit` method. Every `Analysis` is pickled once, when a fit using it is first
+        submitted, and is loaded at most once by each worker process. Repeated fits using the same `Analysis`
+        therefore only send the search and model to a worker, and do not pickle the `Analysis` again.
+
+        The pool assumes an `Analysis` is not changed after a fit using it is submitted. If it is, it must be
+        submitted with a new `key` (see `fit`) so that its new state is sent to the workers.
+
+        Worker processes cannot create processes of their own, so every search fitted by the pool must use
+        `number_of_cores=1`.
+
+        Parameters
+        ----------
+        number_of_cores : int
+            The number of processes in the pool, which is the number of fits performed simultaneously.
+        shared_array_names : (str), optional
+            The names of the arrays of every `Analysis` which are placed in shared memory before the `Analysis` is
+            sent to the workers, so that every worker shares one copy of them (names the `Analysis` does not have as
+            an array are skipped). The pool sends a copy of the `Analysis` with the shared arrays, and the `Analysis`
+            passed to `fit` is not changed. If `None`, every worker receives a copy of the `Analysis`.
+        """
+        self.number_of_cores = number_of_cores
+        self.shared_array_names = shared_array_names
+
+        """
+        The pickled analyses and the files of their shared arrays are written to a directory in shared memory, which
+        exists until the pool is closed, so that every fit can use them however long it waits in the queue.
+
+        The directory is also removed if the pool is garbage collected or the process exits (e.g. is interrupted)
+        without the pool being closed, so that its files do not remain in shared memory.
+        """
+        self._directory = tempfile.mkdtemp(
+            prefix="worker_pool_", dir=shared_array_directory
+        )
+        self._remove_directory = weakref.finalize(
+            self, shutil.rmtree, self._directory, ignore_errors=True
+        )
+        self._digests = set()
+        self._analysis_digests = weakref.WeakKeyDictionary()
+        self._key_digests = {}
+        self._shared_arrays = {}
+        self._pool = mp.Pool(processes=number_of_cores)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _shared_array_from(self, array):
+        """
+        Returns a shared array of an array in the pool's directory. The arrays are keyed by a digest of their values,
+        so that every fit of the same data uses the same file and the pickled `Analysis` (and therefore its digest)
+        is the same.
+        """
+        if is_shared_array(array):
+            return array
+
+        array = np.ascontiguousarray(array)
+
+        digest = hashlib.sha256(
+            f"{array.dtype.str}{array.shape}".encode() + array.tobytes()
+        ).hexdigest()
+
+        if digest not in self._shared_arrays:
+            self._shared_arrays[digest] = shared_array_from(
+                array=array, directory=self._directory
+            )
+
+        return self._shared_arrays[digest]
+
+    def _digest_from(self, analysis, key=None):
+        """
+        Returns the digest of an `Analysis`'s pickled state, writing it to the pool's directory (which every worker
+        loads analyses from) if it has not been written before.
+
+        The digest is cached for the `Analysis` object (without keeping it alive), or for the `key` if one is input,
+        so an `Analysis` is only pickled the first time a fit using it is submitted. An `Analysis` which cannot be
+        weakly referenced or hashed is pickled for every fit, unless a `key` is input.
+
+        The arrays which are shared are replaced with shared arrays in a (shallow) copy of the `Analysis`, so the
+        `Analysis` passed to the pool is not changed.
+        """
+        if key is not None:
+            cache, cache_key = self._key_digests, key
+        else:
+            cache, cache_key = self._analysis_digests, analysis
+
+        try:
+            return cache[cache_key]
+        except (KeyError, TypeError):
+            pass
+
+        analysis_to_pickle = analysis
+
+        if self.shared_array_names is not None:
+
+            analysis_to_pickle = copy.copy(analysis)
+
+            for name in self.shared_array_names:
+
+                array = getattr(analysis_to_pickle, name, None)
+
+                if isinstance(array, np.ndarray):
+                    setattr(
+                        analysis_to_pickle, name, self._shared_array_from(array=array)
+                    )
+
+        analysis_bytes = ForkingPickler.dumps(analysis_to_pickle)
+        digest = hashlib.sha256(analysis_bytes).hexdigest()
+
+        if digest not in self._digests:
+
+            with open(path.join(self._directory, f"{digest}.pickle"), "wb") as f:
+                f.write(analysis_bytes)
+
+            self._digests.add(digest)
+
+        try:
+            cache[cache_key] = digest
+        except TypeError:
+            pass
+
+        return digest
+
+    def fit(self, search, model, analysis, info=None, key=None):
+        """
+        Submit a model-fit to the pool, returning immediately.
+
+        Parameters
+        ----------
+        search : af.NonLinearSearch
+            The non-linear search used to fit the model, which must use `number_of_cores=1`.
+        model : af.Model or af.Collection
+            The model that is fitted.
+        analysis : af.Analysis
+            The `Analysis` containing the data and log likelihood function.
+        info : dict, optional
+            Information about the fit that is output to be loaded by the aggregator.
+        key : str, optional
+            A key identifying the state of the `Analysis` (e.g. the name of its dataset). Fits submitted with the same
+            key use the `Analysis` sent with the first of them. If `None`, the `Analysis` object is the key.
+
+        Returns
+        -------
+        multiprocessing.pool.AsyncResult
+            An object whose `get` method waits for the fit to finish and returns its `Result`.
+        """
+        if getattr(search, "number_of_cores", 1) != 1:
+            raise ValueError(
+                "Searches fitted by a WorkerPool must use number_of_cores=1, as each fit runs in one worker."
+            )
+
+        return self._pool.apply_async(
+            _fit,
+            args=(
+                self._directory,
+                self._digest_from(analysis=analysis, key=key),
+                search,
+                model,
+                info,
+            ),
+        )
+
+    def close(self):
+        """
+        Wait for all submitted fits to finish, stop the worker processes and remove the pickled analyses and the files
+        of their shared arrays.
+        """
+        self._pool.close()
+        self._pool.join()
+
+        self._remove_directory()
+
+
+"""
+__Aggregator Map__
+
+Every worker process opens its own session of the database, which it loads the fits of every chunk it is sent from.
+Only the ids of the fits are sent to the workers, and only the results of the function are sent back.
+"""
+_aggregator = None
+
+
+def _open_aggregator(filename):
+
+    global _aggregator
+
+    if filename is not None:
+        _aggregator = af.Aggregator.from_database(filename)
+
+
+def _map_chunk(func, items):
+
+    if _aggregator is None:
+        return [func(item) for item in items]
+
+    fits = {
+        fit.id: fit
+        for fit in _aggregator.session.query(af.db.Fit).filter(
+            af.db.Fit.id.in_(items)
+        )
+    }
+
+    return [func(fits[fit_id]) for fit_id in items]
+
+
+def map_aggregator(aggregator, func, number_of_cores=1, chunk_size=100, prefetch=2):
+    """
+    Apply a function to every fit of an `Aggregator` in parallel, returning a generator of its results in the order
+    of the fits (like `aggregator.map(func)`).
+
+    The fits are split into chunks of `chunk_size` fits, which are sent to a pool of `number_of_cores` processes. For
+    an `Aggregator` of a database, every process opens its own connection to the database and loads the fits of
+    each chunk itself.
+
+    At most `prefetch` chunks per process are submitted ahead of the result being returned, so the memory used does
+    not grow with the number of fits when the results are used one at a time (e.g. to plot or output them).
+
+    The function must be defined at the top-level of a module or script (so that it can be pickled) and its
+    results must be picklable.
+
+    Parameters
+    ----------
+    aggregator : af.Aggregator
+        The aggregator of the fits, which may have been queried.
+    func
+        The function applied to every fit (e.g. a `Fit` of the database), whose results are returned.
+    number_of_cores : int
+        The number of processes the function is applied in. If 1, it is applied in this process.
+    chunk_size : int
+        The number of fits sent to a process at once.
+    prefetch : int
+        The number of chunks per process submitted ahead of the result being returned.
+    """
+    if number_of_cores == 1:
+        yield from (func(fit) for fit in aggregator)
+        return
+
+    if hasattr(aggregator, "session"):
+        items = [fit.id for fit in aggregator]
+        filename = aggregator.session.bind.url.database
+    else:
+        items = list(aggregator)
+        filename = None
+
+    chunks = (
+        items[index : index + chunk_size] for index in range(0, len(items), chunk_size)
+    )
+
+    with mp.Pool(
+        processes=number_of_cores, initializer=_open_aggregator, initargs=(filename,)
+    ) as pool:
+
+        pending = deque(
+            pool.apply_async(_map_chunk, args=(func, chunk))
+            for chunk in itertools.islice(chunks, number_of_cores * prefetch)
+        )
+
+        while pending:
+
+            results = pending.popleft().get()
+
+            for chunk in itertools.islice(chunks, 1):
+                pending.append(pool.apply_async(_map_chunk, args=(func, chunk)))
+
+            yield from results
@@ -0,0 +1,628 @@
+import json
+import math
+import os
+from os import path
+import sys
+import time
+
+import autofit as af
+
+"""
+The `performance.py` module contains tools for controlling how the run time of a model-fit is spent.
+"""
+
+"""
+__Update Scheduling__
+
+Every `iterations_per_update` iterations a non-linear search performs an update, where it outputs its samples and
+model results and visualizes the maximum log likelihood model. The cost of an update does not depend on how long the
+likelihood function takes, so for a fixed `iterations_per_update` a cheap likelihood spends most of the run time on
+updates, whereas an expensive likelihood updates so rarely that a lot of work is lost if the search is interrupted.
+
+An `UpdateScheduler` instead measures how long each update takes and how long the iterations between updates take,
+and changes the `iterations_per_update` of the search after every update so that updates take a fixed fraction of
+the run time.
+"""
+
+
+class CountedAnalysis(af.Analysis):
+    def __init__(self, analysis):
+        """
+        Wraps an `Analysis`, counting the calls of its likelihood function, which an `UpdateScheduler` uses to
+        measure how many iterations a search performed between updates.
+
+        Attributes which are not part of the `Analysis` interface (e.g. its `data`) are those of the wrapped
+        `Analysis`.
+        """
+        super().__init__()
+
+        self.analysis = analysis
+        self.total_calls = 0
+
+    def __getattr__(self, item):
+
+        if item in ("analysis", "total_calls"):
+            raise AttributeError(item)
+
+        return getattr(self.analysis, item)
+
+    def log_likelihood_function(self, instance):
+
+        self.total_calls += 1
+
+        return self.analysis.log_likelihood_function(instance=instance)
+
+    def visualize(self, paths, instance, during_analysis):
+        return self.analysis.visualize(
+            paths=paths, instance=instance, during_analysis=during_analysis
+        )
+
+    def save_attributes_for_aggregator(self, paths):
+        return self.analysis.save_attributes_for_aggregator(paths=paths)
+
+    def save_results_for_aggregator(self, paths, model, samples):
+        return self.analysis.save_results_for_aggregator(
+            paths=paths, model=model, samples=samples
+        )
+
+    def make_result(self, samples, model, search):
+        return self.analysis.make_result(samples=samples, model=model, search=search)
+
+
+class UpdateScheduler:
+    def __init__(
+        self,
+        search,
+        update_fraction=0.02,
+        minimum_iterations=10,
+        maximum_interval=600.0,
+        maximum_growth=2.0,
+    ):
+        """
+        Replaces the `perform_update` and `fit` methods of a non-linear search, timing every update and the
+        iterations performed since the previous update and setting the search's `iterations_per_update` such that
+        updates take `update_fraction` of the run time.
+
+        Every search reads `iterations_per_update` before each batch of iterations, so a new value is used from the
+        next batch onwards. The search's initial `iterations_per_update` is used for the first batch.
+
+        A batch of iterations is often cut short, for example when a nested sampler converges or an MCMC search
+        reaches its final step, so the iterations performed in each batch are measured by counting the calls of the
+        likelihood function (via a `CountedAnalysis`), rather than assuming the batch performed
+        `iterations_per_update` iterations. Calls made in other processes (by a search with `number_of_cores` > 1)
+        cannot be counted, in which case every batch is assumed to perform `iterations_per_update` iterations.
+
+        Parameters
+        ----------
+        search : af.NonLinearSearch
+            The non-linear search whose updates are scheduled.
+        update_fraction : float
+            The fraction of the run time that updates should take.
+        minimum_iterations : int
+            The fewest iterations that are performed between updates.
+        maximum_interval : float
+            The longest time (in seconds) between updates, so that an interrupted search with an expensive likelihood
+            never has to repeat more than this much work when it resumes.
+        maximum_growth : float
+            The largest factor by which `iterations_per_update` can increase or decrease after one update, so that a
+            single unrepresentative batch does not change it by orders of magnitude.
+        """
+        self.search = search
+
+        self.update_fraction = update_fraction
+        self.minimum_iterations = minimum_iterations
+        self.maximum_interval = maximum_interval
+        self.maximum_growth = maximum_growth
+
+        self.total_update_time = 0.0
+        self.total_iteration_time = 0.0
+
+        """
+        For every batch of iterations between two updates, the iterations it performed, their time, the time of the
+        update after them and the `iterations_per_update` used for the next batch.
+        """
+        self.batches = []
+
+        self._update_end = None
+        self._calls_at_update_end = 0
+
+    @property
+    def calls_per_iteration(self):
+        """
+        The number of likelihood calls in one iteration of the search, which is the number of walkers of an MCMC
+        search or particles of a particle swarm, and 1 for a nested sampler (whose `iterations_per_update` is a
+        number of likelihood calls).
+        """
+        config_dict_search = getattr(self.search, "config_dict_search", {})
+
+        return (
+            config_dict_search.get("nwalkers")
+            or config_dict_search.get("n_particles")
+            or 1
+        )
+
+    def fit(self, model, analysis, info=None, **kwargs):
+        """
+        Fit the model with the search, wrapping the `Analysis` in a `CountedAnalysis` (the `Analysis` itself is not
+        changed).
+        """
+        self._update_end = None
+        self._calls_at_update_end = 0
+
+        return type(self.search).fit(
+            self.search,
+            model=model,
+            analysis=CountedAnalysis(analysis=analysis),
+            info=info,
+            **kwargs,
+        )
+
+    def __call__(self, model, analysis, during_analysis):
+
+        update_start = time.time()
+        calls_at_update_start = getattr(analysis, "total_calls", 0)
+
+        samples = type(self.search).perform_update(
+            self.search, model=model, analysis=analysis, during_analysis=during_analysis
+        )
+
+        update_end = time.time()
+
+        update_time = update_end - update_start
+        self.total_update_time += update_time
+
+        if self._update_end is not None:
+
+            iteration_time = update_start - self._update_end
+            self.total_iteration_time += iteration_time
+
+            if getattr(self.search, "number_of_cores", 1) > 1 or not hasattr(
+                analysis, "total_calls"
+            ):
+                iterations_performed = self.search.iterations_per_update
+            else:
+                iterations_performed = (
+                    calls_at_update_start - self._calls_at_update_end
+                ) // self.calls_per_iteration
+
+            """
+            A batch which performed no iterations (e.g. of a search which has converged) says nothing about how long
+            iterations take, so `iterations_per_update` is not changed.
+            """
+            if during_analysis and iterations_performed > 0:
+
+                self.search.iterations_per_update = self.iterations_per_update_from(
+                    iterations=self.search.iterations_per_update,
+                    iterations_performed=iterations_performed,
+                    iteration_time=iteration_time,
+                    update_time=update_time,
+                )
+
+            self.batches.append(
+                {
+                    "iterations_performed": iterations_performed,
+                    "iteration_time": iteration_time,
+                    "update_time": update_time,
+                    "iterations_per_update": self.search.iterations_per_update,
+                }
+            )
+
+        self._update_end = update_end
+        self._calls_at_update_end = getattr(analysis, "total_calls", 0)
+
+        return samples
+
+    def iterations_per_update_from(
+        self, iterations, iterations_performed, iteration_time, update_time
+    ):
+        """
+        Returns the number of iterations between updates which makes updates take `update_fraction` of the run time,
+        given that the previous batch of (at most) `iterations` iterations performed `iterations_performed`
+        iterations in `iteration_time` seconds and the update after them took `update_time` seconds.
+
+        The returned value is within a factor `maximum_growth` of `iterations`.
+        """
+        iteration_time = max(iteration_time, 1.0e-6)
+
+        target_iteration_time = min(
+            update_time * (1.0 - self.update_fraction) / self.update_fraction,
+            self.maximum_interval,
+        )
+
+        iterations_new = iterations_performed * target_iteration_time / iteration_time
+
+        iterations_new = min(
+            max(iterations_new, iterations / self.maximum_growth),
+            iterations * self.maximum_growth,
+        )
+
+        return max(int(iterations_new), self.minimum_iterations)
+
+    @property
+    def update_fraction_measured(self):
+        """
+        The fraction of the run time (since the end of the first update) that has been spent on updates.
+
+        This only approaches `update_fraction` for a fit which lasts many times the target time between updates
+        (the update time divided by `update_fraction`). The first batches perform the search's initial
+        `iterations_per_update`, which grows by at most `maximum_growth` per update, and the updates performed when
+        the search converges and finishes cannot be scheduled, so they dominate the run time of a short fit.
+        """
+        total_time = self.total_update_time + self.total_iteration_time
+
+        if total_time == 0.0:
+            return 0.0
+
+        return self.total_update_time / total_time
+
+
+def schedule_updates(
+    search,
+    update_fraction=0.02,
+    minimum_iterations=10,
+    maximum_interval=600.0,
+    maximum_growth=2.0,
+):
+    """
+    Make the updates of a non-linear search take a fixed fraction of its run time, by choosing its
+    `iterations_per_update` as it runs (see `UpdateScheduler`).
+
+    The `UpdateScheduler` is returned, so that the time spent on updates can be inspected after the fit.
+
+    Parameters
+    ----------
+    search : af.NonLinearSearch
+        The non-linear search whose updates are scheduled.
+    update_fraction : float
+        The fraction of the run time that updates should take.
+    minimum_iterations : int
+        The fewest iterations that are performed between updates.
+    maximum_interval : float
+        The longest time (in seconds) between updates.
+    maximum_growth : float
+        The largest factor by which `iterations_per_update` can change after one update.
+    """
+    scheduler = UpdateScheduler(
+        search=search,
+        update_fraction=update_fraction,
+        minimum_iterations=minimum_iterations,
+        maximum_interval=maximum_interval,
+        maximum_growth=maximum_growth,
+    )
+
+    search.perform_update = scheduler
+    search.fit = scheduler.fit
+
+    return scheduler
+
+
+"""
+__Profiling__
+
+A `Profiler` performs a model-fit and records how its run time is split between the likelihood function, mapping
+vectors of parameters to model instances, updates (which include visualization) and the non-linear search itself.
+For every phase it records the number of calls, their wall-clock and CPU times, a histogram of the wall-clock time
+of each call and the increase in peak memory during its calls.
+
+Calls of the likelihood function and `instance_from_vector` made during an update (e.g. to compute the maximum log
+likelihood instance which is visualized) are part of the time of the update, so they are not recorded in their own
+phases. The `visualize` phase is likewise part of the update phase.
+
+The report is output as the file `performance.json` in the output folder of the search and saved via the search's
+paths (e.g. into the sqlite database if the search uses one), so that it is available to the aggregator.
+
+The peak memory of the process is read via the `resource` module, which is only available on Linux and macOS. On
+Windows it is read via **psutil** if it is installed, and is otherwise not recorded (its values are `None`).
+"""
+
+
+def peak_memory_kb():
+    """
+    Returns the peak memory of this process in kilobytes, or `None` if it cannot be measured.
+
+    The peak memory given by `resource` (`ru_maxrss`) is in bytes on macOS and in kilobytes on Linux, so it is
+    converted according to the platform.
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+
+        memory_info = psutil.Process().memory_info()
+
+        return getattr(memory_info, "peak_wset", memory_info.rss) / 1024.0
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if sys.platform == "darwin":
+        return max_rss / 1024.0
+
+    return max_rss
+
+
+class PhaseTimer:
+
+    """
+    The edges (in seconds) of the bins of the histogram of the wall-clock time of every call.
+    """
+    histogram_edges = [10.0 ** power for power in range(-7, 4)]
+
+    def __init__(self):
+        """
+        Records the calls of one phase of a model-fit (e.g. the likelihood function).
+        """
+        self.calls = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.memory_increase = None if peak_memory_kb() is None else 0
+        self.histogram = [0] * (len(self.histogram_edges) + 1)
+
+    def time(self, function, *args, **kwargs):
+        """
+        Call a function, recording its wall-clock time, CPU time and the increase in peak memory during the call.
+        """
+        peak_memory = peak_memory_kb()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        result = function(*args, **kwargs)
+
+        wall_time = time.perf_counter() - wall_start
+
+        self.cpu_time += time.process_time() - cpu_start
+        self.wall_time += wall_time
+        self.calls += 1
+
+        if peak_memory is not None:
+            self.memory_increase += peak_memory_kb() - peak_memory
+
+        if wall_time > 0.0:
+            index = min(
+                max(math.floor(math.log10(wall_time)) + 8, 0), len(self.histogram) - 1
+            )
+        else:
+            index = 0
+
+        self.histogram[index] += 1
+
+        return result
+
+    @property
+    def dict(self):
+        return {
+            "calls": self.calls,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "wall_time_per_call": self.wall_time / self.calls
+            if self.calls > 0
+            else None,
+            "memory_increase_kb": self.memory_increase,
+            "histogram_edges": self.histogram_edges,
+            "histogram": self.histogram,
+        }
+
+
+class ProfiledAnalysis(af.Analysis):
+    def __init__(self, analysis, profiler):
+        """
+        Wraps an `Analysis`, recording the calls of its likelihood function and visualization in a `Profiler`.
+
+        Attributes which are not part of the `Analysis` interface (e.g. its `data`) are those of the wrapped
+        `Analysis`.
+        """
+        super().__init__()
+
+        self.analysis = analysis
+        self.profiler = profiler
+
+    def __getattr__(self, item):
+
+        if item in ("analysis", "profiler"):
+            raise AttributeError(item)
+
+        return getattr(self.analysis, item)
+
+    def log_likelihood_function(self, instance):
+
+        if self.profiler.updating:
+            return self.analysis.log_likelihood_function(instance=instance)
+
+        return self.profiler.phases["log_likelihood_function"].time(
+            self.analysis.log_likelihood_function, instance=instance
+        )
+
+    def visualize(self, paths, instance, during_analysis):
+        return self.profiler.phases["visualize"].time(
+            self.analysis.visualize,
+            paths=paths,
+            instance=instance,
+            during_analysis=during_analysis,
+        )
+
+    def save_attributes_for_aggregator(self, paths):
+        return self.analysis.save_attributes_for_aggregator(paths=paths)
+
+    def save_results_for_aggregator(self, paths, model, samples):
+        return self.analysis.save_results_for_aggregator(
+            paths=paths, model=model, samples=samples
+        )
+
+    def make_result(self, samples, model, search):
+        return self.analysis.make_result(samples=samples, model=model, search=search)
+
+
+def _model_from(model):
+    return model
+
+
+class ProfiledModel:
+    def __init__(self, model, profiler):
+        """
+        Wraps a model, recording the calls of its `instance_from_vector` method in a `Profiler`.
+
+        The wrapper pickles as the model itself, so the model output by the search (and sent to other processes) is
+        not wrapped.
+        """
+        self.model = model
+        self.profiler = profiler
+
+    def __getattr__(self, item):
+
+        if item in ("model", "profiler"):
+            raise AttributeError(item)
+
+        return getattr(self.model, item)
+
+    def __reduce__(self):
+        return _model_from, (self.model,)
+
+    def instance_from_vector(self, vector, *args, **kwargs):
+
+        if self.profiler.updating:
+            return self.model.instance_from_vector(vector, *args, **kwargs)
+
+        return self.profiler.phases["instance_from_vector"].time(
+            self.model.instance_from_vector, vector, *args, **kwargs
+        )
+
+
+class ProfiledUpdate:
+    def __init__(self, perform_update, profiler):
+        """
+        Replaces the `perform_update` method of a non-linear search, recording its calls in the update phase of a
+        `Profiler`, which is told it is updating for the duration of every call.
+        """
+        self.perform_update = perform_update
+        self.profiler = profiler
+
+    def __call__(self, model, analysis, during_analysis):
+
+        self.profiler.updating = True
+
+        try:
+            return self.profiler.phases["update"].time(
+                self.perform_update,
+                model=model,
+                analysis=analysis,
+                during_analysis=during_analysis,
+            )
+        finally:
+            self.profiler.updating = False
+
+
+class Profiler:
+
+    phase_names = (
+        "log_likelihood_function",
+        "instance_from_vector",
+        "update",
+        "visualize",
+    )
+
+    def __init__(self):
+        """
+        Performs model-fits while recording how their run time is split between the likelihood function, mapping
+        vectors of parameters to instances of the model, updates and the non-linear search.
+
+        Only calls made in the process performing the fit are recorded, so the likelihood function of a search which
+        uses `number_of_cores` > 1 (and therefore calls it in other processes) is only partially recorded.
+        """
+        self.phases = {name: PhaseTimer() for name in self.phase_names}
+        self.report = None
+        self.updating = False
+
+    def fit(self, search, model, analysis, info=None):
+        """
+        Fit a model using a non-linear search, returning its `Result` and outputting the performance report of the
+        fit to the file `performance.json` in the output folder of the search.
+
+        Parameters
+        ----------
+        search : af.NonLinearSearch
+            The non-linear search which fits the model.
+        model : af.Collection
+            The model that is fitted.
+        analysis : af.Analysis
+            The `Analysis` whose likelihood function is used by the search.
+        info : dict
+            Optional dictionary of information about the fit that can be loaded by the aggregator.
+        """
+        self.phases = {name: PhaseTimer() for name in self.phase_names}
+        self.updating = False
+
+        perform_update = vars(search).get("perform_update")
+
+        search.perform_update = ProfiledUpdate(
+            perform_update=search.perform_update, profiler=self
+        )
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        try:
+            result = search.fit(
+                model=ProfiledModel(model=model, profiler=self),
+                analysis=ProfiledAnalysis(analysis=analysis, profiler=self),
+                info=info,
+            )
+        finally:
+            if perform_update is None:
+                del search.perform_update
+            else:
+                search.perform_update = perform_update
+
+        self.report = self.report_from(
+            search=search,
+            wall_time=time.perf_counter() - wall_start,
+            cpu_time=time.process_time() - cpu_start,
+        )
+
+        os.makedirs(search.paths.output_path, exist_ok=True)
+
+        with open(path.join(search.paths.output_path, "performance.json"), "w+") as f:
+            json.dump(self.report, f, indent=4)
+
+        search.paths.save_object("performance", self.report)
+
+        session = getattr(search.paths, "session", None)
+
+        if session is not None:
+            session.commit()
+
+        return result
+
+    def report_from(self, search, wall_time, cpu_time):
+        """
+        Returns the performance report of a fit, where the time of the `sampler` is the time of the fit not spent in
+        the other phases.
+
+        The likelihood function and `instance_from_vector` phases only contain calls made outside of updates, and the
+        `visualize` phase is part of the update phase, so every phase subtracted does not overlap the others.
+        """
+        phases = {name: phase.dict for name, phase in self.phases.items()}
+
+        measured_wall_time = sum(
+            self.phases[name].wall_time
+            for name in ("log_likelihood_function", "instance_from_vector", "update")
+        )
+        measured_cpu_time = sum(
+            self.phases[name].cpu_time
+            for name in ("log_likelihood_function", "instance_from_vector", "update")
+        )
+
+        phases["sampler"] = {
+            "wall_time": wall_time - measured_wall_time,
+            "cpu_time": cpu_time - measured_cpu_time,
+        }
+
+        return {
+            "search": type(search).__name__,
+            "number_of_cores": getattr(search, "number_of_cores", 1),
+            "wall_time": wall_time,
+            "cpu_time": cpu_time,
+            "peak_memory_kb": peak_memory_kb(),
+            "phases": phases,
+        }
@@ -0,0 +1,77 @@
+"""
+Feature: Profiling
+==================
+
+When a model-fit is slow, we want to know where its run time is spent before trying to speed it up. Is it our
+likelihood function, and if so is it dominated by NumPy operations or Python overhead? Is it the mapping of the
+non-linear search's parameters to instances of our model, the updates that output results and visualization, or the
+non-linear search itself?
+
+The `Profiler` in `performance.py` performs a model-fit and records, for each of these phases, the number of calls,
+their wall-clock and CPU times, a histogram of the time of every call and the increase in peak memory during the
+calls. The report is output as `performance.json` in the output folder of the search.
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+import autofit as af
+import json
+from os import path
+
+import model as m
+import analysis as a
+import performance
+
+"""
+__Data__
+
+We load the dataset of a single `Gaussian` and create its `Analysis`.
+"""
+dataset_path = path.join("dataset", "example_1d", "gaussian_x1")
+
+data = af.util.numpy_array_from_json(file_path=path.join(dataset_path, "data.json"))
+noise_map = af.util.numpy_array_from_json(
+    file_path=path.join(dataset_path, "noise_map.json")
+)
+
+analysis = a.Analysis(data=data, noise_map=noise_map)
+
+model = af.Collection(gaussian=m.Gaussian)
+
+"""
+__Profiling__
+
+We perform the fit using the `Profiler`. The search uses one core, so that every call of the likelihood function is
+performed in this process and is recorded.
+"""
+dynesty = af.DynestyStatic(
+    name="profiling", path_prefix=path.join("features"), nlive=50, number_of_cores=1
+)
+
+profiler = performance.Profiler()
+
+result = profiler.fit(search=dynesty, model=model, analysis=analysis)
+
+"""
+The report is available via the profiler after the fit. The `sampler` phase is the time spent in the non-linear search
+itself, that is the time of the fit not spent in any other phase. The likelihood function and `instance_from_vector`
+phases only contain the calls made by the search, as the calls made during updates are part of the update phase.
+
+If the CPU time of the likelihood function is much less than its wall-clock time, the process spends its time
+waiting (e.g. for files or other processes). If the time per call is dominated by Python overhead rather than NumPy
+operations, it changes little as the size of the data increases.
+"""
+print(json.dumps(profiler.report["phases"], indent=4))
+
+"""
+The report is also output to the file `performance.json` in the output folder of the search, and saved with the
+search's other results, so that it can be loaded using the aggregator (e.g. if the search writes to a database).
+"""
+print(path.join(dynesty.paths.output_path, "performance.json"))
+
+"""
+Finish.
+"""
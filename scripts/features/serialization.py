@@ -0,0 +1,415 @@
+import autofit as af
+import copy
+import numpy as np
+from os import path
+import pickle
+from sqlalchemy import bindparam, text
+import sys
+
+import columnar
+import database_util
+
+"""
+The encodings of arrays are written and read by `util.py` of the simulators, whose folder is found relative to this
+module rather than the folder scripts are run from.
+"""
+features_path = path.dirname(path.abspath(__file__))
+simulators_path = path.join(path.dirname(features_path), "simulators")
+
+if simulators_path not in sys.path:
+    sys.path.append(simulators_path)
+
+import util
+
+"""
+The `serialization.py` module saves the results of model-fits to the database (or output folder) in a typed, versioned
+binary format, rather than as pickles.
+
+Every object saved via `paths.save_object` is pickled, so loading it via `agg.values` unpickles the full object and
+requires the modules of its classes (e.g. the `model.py` of the `Gaussian`) to be importable. Objects saved via
+`serialization.save_object` are instead encoded as:
+
+ - NumPy arrays: their raw little-endian buffer, with a header describing their dtype and shape.
+ - Samples: the arrays of their `ColumnarSamples` (see `columnar.py`), including the samples after burn-in of an
+ MCMC search, and their model as .json.
+ - Models: a .json dictionary of their model components and priors.
+ - Python dictionaries, lists, strings and numbers: .json.
+
+Every other object is pickled. The encoding of every object begins with a header stating its type and the version of
+the encoding, and is decoded with every array as a view of the bytes loaded from the database, without copying them.
+
+A model is decoded as a model if the modules of its classes can be imported, and as its .json dictionary if they
+cannot, so the arrays and models of results can always be read, even by another version of **PyAutoFit**.
+"""
+serialization_magic = b"AFTYPE01"
+serialization_version = 1
+
+
+def _model_dict_from(model):
+    return model.dict() if callable(model.dict) else model.dict
+
+
+def _parameter_paths_from(model):
+    return [
+        list(model.path_for_prior(prior))
+        for _, prior in model.prior_tuples_ordered_by_id
+    ]
+
+
+def _model_metadata_from(model):
+    """
+    Returns the .json metadata of a model, which is its dictionary and the path of every parameter in the order of
+    the vectors of the model created from the dictionary, and the index of every one of these parameters in the
+    vectors of the input model.
+
+    A model whose dictionary does not reproduce it (e.g. a model where two parameters share one prior) is pickled, and
+    its pickle is returned as an array.
+    """
+    model_dict = _model_dict_from(model=model)
+    parameter_paths = _parameter_paths_from(model=model)
+
+    try:
+        model_from_dict = af.AbstractPriorModel.from_dict(copy.deepcopy(model_dict))
+        parameter_paths_from_dict = _parameter_paths_from(model=model_from_dict)
+    except (ImportError, AttributeError, KeyError, TypeError):
+        parameter_paths_from_dict = None
+
+    if parameter_paths_from_dict is None or sorted(parameter_paths_from_dict) != sorted(
+        parameter_paths
+    ):
+        return (
+            {"model": model_dict, "parameter_paths": parameter_paths},
+            {"model_pickle": np.frombuffer(pickle.dumps(model), dtype="uint8")},
+            list(range(len(parameter_paths))),
+        )
+
+    return (
+        {"model": model_dict, "parameter_paths": parameter_paths_from_dict},
+        {},
+        [parameter_paths.index(path) for path in parameter_paths_from_dict],
+    )
+
+
+def _model_from(metadata, arrays):
+    """
+    Returns the model of encoded metadata, or its .json dictionary if the modules of its classes cannot be imported.
+    """
+    try:
+        if "model_pickle" in arrays:
+            return pickle.loads(arrays["model_pickle"].tobytes())
+
+        return af.AbstractPriorModel.from_dict(copy.deepcopy(metadata["model"]))
+    except (ImportError, AttributeError):
+        return metadata["model"]
+
+
+class TypedSamples(columnar.ColumnarSamples):
+    def __init__(self, model_metadata, model_arrays, **kwargs):
+        """
+        `ColumnarSamples` decoded from their typed binary encoding, whose model is only created from its .json
+        dictionary when it is first used (creating a model takes longer than decoding the arrays of the samples).
+
+        The columns of the parameters are in the order of the vectors of the model created from its dictionary.
+        """
+        self._model_metadata = model_metadata
+        self._model_arrays = model_arrays
+
+        super().__init__(model=None, **kwargs)
+
+    @property
+    def model(self):
+
+        if self._model is None:
+            self._model = _model_from(
+                metadata=self._model_metadata, arrays=self._model_arrays
+            )
+
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+
+def _is_samples(obj):
+    return isinstance(obj, columnar.ColumnarSamples) or (
+        hasattr(obj, "model")
+        and (hasattr(obj, "parameter_lists") or hasattr(obj, "parameters"))
+        and (hasattr(obj, "log_likelihood_list") or hasattr(obj, "log_likelihoods"))
+    )
+
+
+def _is_json(obj):
+
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return True
+
+    if isinstance(obj, (list, tuple)):
+        return all(_is_json(value) for value in obj)
+
+    if isinstance(obj, dict):
+        return all(
+            isinstance(key, str) and _is_json(value) for key, value in obj.items()
+        )
+
+    return False
+
+
+def encode(obj):
+    """
+    Returns the bytes of the typed binary encoding of an object.
+
+    Parameters
+    ----------
+    obj
+        A NumPy array, samples, model, .json compatible Python object or any other (picklable) object.
+    """
+    if isinstance(obj, np.ndarray):
+
+        obj_type = "array"
+        arrays = {"array": obj}
+        metadata = {}
+
+    elif isinstance(obj, af.AbstractPriorModel):
+
+        obj_type = "model"
+        metadata, arrays, _ = _model_metadata_from(model=obj)
+
+    elif _is_samples(obj):
+
+        if not isinstance(obj, columnar.ColumnarSamples):
+            obj = columnar.ColumnarSamples.from_samples(samples=obj)
+
+        obj_type = "samples"
+        metadata, arrays, parameter_indexes = _model_metadata_from(model=obj.model)
+        metadata["info"] = obj.info
+
+        arrays.update(
+            {
+                "parameters": obj.parameters[:, parameter_indexes],
+                "log_likelihoods": obj.log_likelihoods,
+                "log_priors": obj.log_priors,
+                "weights": obj.weights,
+            }
+        )
+
+        if obj.is_mcmc:
+            arrays["samples_after_burn_in"] = np.reshape(
+                obj.samples_after_burn_in, (-1, obj.parameters.shape[1])
+            )[:, parameter_indexes]
+
+    elif _is_json(obj):
+
+        obj_type = "json"
+        arrays = {}
+        metadata = {"value": obj}
+
+    else:
+
+        obj_type = "pickle"
+        arrays = {"pickle": np.frombuffer(pickle.dumps(obj), dtype="uint8")}
+        metadata = {}
+
+    return util.bytes_from_arrays(
+        arrays=arrays,
+        metadata={"type": obj_type, "version": serialization_version, **metadata},
+        magic=serialization_magic,
+    )
+
+
+def decode(buffer):
+    """
+    Returns the object of a typed binary encoding, from its bytes.
+
+    Arrays (including those of samples) are read-only views of the bytes rather than copies.
+
+    Parameters
+    ----------
+    buffer : bytes
+        The bytes of the encoding, output by `encode`.
+    """
+    arrays, metadata = util.arrays_from_buffer(
+        buffer=buffer, magic=serialization_magic
+    )
+
+    if metadata["version"] > serialization_version:
+        raise IOError(
+            f"The encoding has version {metadata['version']}, which is newer than the version "
+            f"{serialization_version} of this module."
+        )
+
+    obj_type = metadata["type"]
+
+    if obj_type == "array":
+        return arrays["array"]
+
+    if obj_type == "json":
+        return metadata["value"]
+
+    if obj_type == "pickle":
+        return pickle.loads(arrays["pickle"].tobytes())
+
+    if obj_type == "model":
+        return _model_from(metadata=metadata, arrays=arrays)
+
+    return TypedSamples(
+        model_metadata=metadata,
+        model_arrays=arrays,
+        parameters=arrays["parameters"],
+        log_likelihoods=arrays["log_likelihoods"],
+        log_priors=arrays["log_priors"],
+        weights=arrays["weights"],
+        info=metadata["info"],
+        samples_after_burn_in=arrays.get("samples_after_burn_in"),
+    )
+
+
+def save_object(paths, name, obj):
+    """
+    Save an object to the database (or the pickles folder of the output folder) in its typed binary encoding, which
+    is called in the `save_attributes_for_aggregator` or `save_results_for_aggregator` methods of an `Analysis`.
+
+    Parameters
+    ----------
+    paths : af.DirectoryPaths or af.DatabasePaths
+        The paths of the search, which save the object to the output folder or database.
+    name : str
+        The name of the object, which is used to load it via `values`.
+    obj
+        The object which is saved.
+    """
+    paths.save_object(name, encode(obj))
+
+
+def values(aggregator, name):
+    """
+    Returns a list of the id and object with a name saved via `save_object` of every fit of an `Aggregator`, as
+    `(fit_id, obj)` tuples in the order of the ids (see `database_util.values_from`).
+
+    For an `Aggregator` of a database, the encodings of every fit are read with a single SQL query, which selects the
+    fits of the `Aggregator` as a subquery (so no `Fit` is loaded), and decoded without unpickling them. (The `values`
+    method of the `Aggregator` cannot read them, as it unpickles every object saved in the database).
+
+    A fit which does not have the object has the value `None`.
+
+    Parameters
+    ----------
+    aggregator : af.Aggregator
+        The aggregator of the fits, which may have been queried.
+    name : str
+        The name of the objects.
+    """
+    return [
+        (fit_id, None if buffer is None else decode(buffer))
+        for fit_id, buffer in database_util.values_from(
+            aggregator=aggregator, name=name
+        )
+    ]
+
+
+def _value_from(value):
+    """
+    Returns the object of a value saved in the database, which is a typed binary encoding, a pickle or a string.
+    """
+    if isinstance(value, str):
+        return value
+
+    if bytes(value[: len(serialization_magic)]) == serialization_magic:
+        return decode(value)
+
+    return pickle.loads(value)
+
+
+def values_many(aggregator, names, batch_size=100):
+    """
+    Returns a generator of tuples of the objects with the input names (e.g. `("data", "noise_map", "samples")`) of
+    every fit of an `Aggregator`, which replaces zipping the generators of `agg.values` of every name.
+
+    For an `Aggregator` of a database, the fits are read in batches of `batch_size` fits in the order of their ids
+    (see `database_util.fit_batches_from`), and the objects of every name for a batch are read with a single SQL
+    query, rather than one query per fit and name. No `Fit` is loaded, so the memory used does not grow with the
+    number of fits. Objects saved via `paths.save_object` (which are pickled) and `save_object` (which are encoded)
+    are both loaded. A name which is a column of the `fit` table (e.g. `unique_tag`) is the value of that column.
+
+    A fit which does not have an object has the value `None`, and a name which no fit has raises a `KeyError`.
+
+    Parameters
+    ----------
+    aggregator : af.Aggregator
+        The aggregator of the fits, which may have been queried.
+    names : [str]
+        The names of the objects.
+    batch_size : int
+        The number of fits whose objects are read with each query.
+    """
+    names = list(names)
+
+    if not hasattr(aggregator, "session"):
+
+        yield from zip(
+            *[
+                (
+                    decode(value)
+                    if isinstance(value, bytes)
+                    and value[: len(serialization_magic)] == serialization_magic
+                    else value
+                    for value in aggregator.values(name)
+                )
+                for name in names
+            ]
+        )
+        return
+
+    column_names = [name for name in names if name in database_util.fit_columns]
+    object_names = [name for name in names if name not in column_names]
+
+    fit_ids_query = database_util.fit_ids_query_from(aggregator=aggregator)
+
+    if object_names:
+
+        saved_names = {
+            name
+            for name, in aggregator.session.execute(
+                text(
+                    "SELECT DISTINCT name FROM pickle WHERE name IN :names "
+                    f"AND fit_id IN ({fit_ids_query})"
+                ).bindparams(bindparam("names", expanding=True)),
+                {"names": object_names},
+            )
+        }
+
+        unknown_names = [name for name in object_names if name not in saved_names]
+
+        if unknown_names:
+            raise KeyError(
+                f"No fit of the aggregator has an object or attribute named {unknown_names}."
+            )
+
+    query = text(
+        "SELECT fit_id, name, string FROM pickle "
+        "WHERE name IN :names AND fit_id IN :fit_ids"
+    ).bindparams(
+        bindparam("names", expanding=True), bindparam("fit_ids", expanding=True)
+    )
+
+    for batch in database_util.fit_batches_from(
+        aggregator=aggregator,
+        batch_size=batch_size,
+        columns=["id"] + [name for name in column_names if name != "id"],
+    ):
+
+        values_dict = {}
+
+        if object_names:
+            for fit_id, name, value in aggregator.session.execute(
+                query, {"names": object_names, "fit_ids": [fit.id for fit in batch]}
+            ):
+                values_dict[(fit_id, name)] = _value_from(value)
+
+        for fit in batch:
+            yield tuple(
+                getattr(fit, name)
+                if name in column_names
+                else values_dict.get((fit.id, name))
+                for name in names
+            )
@@ -0,0 +1,645 @@
+import autofit as af
+from autofit.database.query.condition import AbstractCondition, fit_table
+from autofit.database.query.query.attribute import AttributeQuery
+import math
+import numpy as np
+import os
+from os import path
+from sqlalchemy import bindparam, text
+
+import columnar
+import database_util
+
+"""
+The `summaries.py` module stores scalar summaries of every model-fit (e.g. the median PDF value of every parameter)
+when the fit is written to the database, and reads them back without loading the `Samples`.
+
+Loading the median PDF `centre` of every fit via `agg.values("samples")` unpickles the `Samples` of every fit, which
+for many fits takes hours. The summaries are instead stored as plain text, one per parameter, so the summary of every
+fit in a database is read with a single SQL query, e.g.:
+
+    summaries.values(aggregator=agg, name="median_pdf.gaussian.centre")
+
+The maximum likelihood and median PDF value of every parameter are also written to a `parameter_summary` table of the
+database, with an index on every parameter's path and value. Queries on them (e.g. `agg.query(summaries.median_pdf(
+"gaussian.sigma") < 3.0)`) are therefore index searches performed by the database, rather than comparisons of the
+value of every fit.
+
+The summaries, `unique_tag` and `info` of every fit can be exported to an Apache Arrow table or Parquet file (via
+`to_arrow` and `to_parquet`, which require **pyarrow**), with one row per fit, for analysis in **pandas**.
+"""
+
+"""
+__Parameter Summary Table__
+
+The table has one row per fit and parameter, with the columns below.
+"""
+parameter_summary_columns = ("max_log_likelihood", "median_pdf")
+parameter_summary_symbols = ("=", "<", "<=", ">", ">=")
+
+parameter_summary_schema = [
+    """
+    CREATE TABLE IF NOT EXISTS parameter_summary (
+        fit_id VARCHAR NOT NULL,
+        path VARCHAR NOT NULL,
+        max_log_likelihood FLOAT,
+        median_pdf FLOAT,
+        PRIMARY KEY (fit_id, path),
+        FOREIGN KEY (fit_id) REFERENCES fit (id)
+    )
+    """,
+    *[
+        f"CREATE INDEX IF NOT EXISTS ix_parameter_summary_{column} "
+        f"ON parameter_summary (path, {column})"
+        for column in parameter_summary_columns
+    ],
+]
+
+
+def create_parameter_summary_table(session):
+    """
+    Create the `parameter_summary` table and its indexes in a database, if they do not already exist.
+    """
+    for statement in parameter_summary_schema:
+        session.execute(text(statement))
+
+
+def open_database(filename):
+    """
+    Open a database in the output folder (see `database_util.database_path_from`) via `af.db.open_database`, including
+    the `parameter_summary` table.
+    """
+    session = af.db.open_database(database_util.database_path_from(filename=filename))
+
+    create_parameter_summary_table(session=session)
+    session.commit()
+
+    return session
+
+
+def migrate_database(filename):
+    """
+    Create the `parameter_summary` table and its indexes in a database in the output folder whose results were
+    written without them (e.g. via `af.db.open_database` rather than `open_database`), and fill it with the summaries
+    of every fit saved via `save_summaries`.
+
+    Loading an aggregator does not change its database, so a database is migrated once, before it is queried.
+    """
+    session = af.db.open_database(database_util.database_path_from(filename=filename))
+
+    create_parameter_summary_table(session=session)
+
+    rows = session.execute(
+        text(
+            "SELECT fit_id, name, string FROM pickle WHERE fit_id IS NOT NULL "
+            "AND (name LIKE 'max\\_log\\_likelihood.%' ESCAPE '\\' "
+            "OR name LIKE 'median\\_pdf.%' ESCAPE '\\')"
+        )
+    )
+
+    parameter_summaries = {}
+
+    for fit_id, name, value in rows:
+
+        column, parameter_path = name.split(".", 1)
+
+        parameter_summaries.setdefault(
+            (fit_id, parameter_path), dict.fromkeys(parameter_summary_columns)
+        )[column] = _float_from(value)
+
+    if parameter_summaries:
+        session.execute(
+            text(
+                "INSERT OR REPLACE INTO parameter_summary "
+                "(fit_id, path, max_log_likelihood, median_pdf) "
+                "VALUES (:fit_id, :path, :max_log_likelihood, :median_pdf)"
+            ),
+            [
+                {"fit_id": fit_id, "path": parameter_path, **columns}
+                for (fit_id, parameter_path), columns in parameter_summaries.items()
+            ],
+        )
+
+    session.commit()
+    session.close()
+
+
+def aggregator_from_database(filename):
+    """
+    Load the `Aggregator` of a database in the output folder (see `database_util.database_path_from`).
+
+    The database is only read. Queries on the `parameter_summary` table require the database to have one, which is
+    created when results are written via `open_database` or `save_summaries`, or by `migrate_database`.
+    """
+    return af.Aggregator.from_database(
+        database_util.database_path_from(filename=filename)
+    )
+
+
+def parameter_paths_from(model):
+    """
+    The path of every parameter of a model (e.g. `gaussian.centre`), in the order of its vectors.
+    """
+    return [
+        ".".join(model.path_for_prior(prior))
+        for _, prior in model.prior_tuples_ordered_by_id
+    ]
+
+
+def summaries_from(samples, sigmas=(3.0,)):
+    """
+    Returns a dictionary of the scalar summaries of the samples of a model-fit, which are:
+
+     - `max_log_likelihood`, `time` (the run time of the search in seconds, if known) and (for nested samplers)
+     `log_evidence`.
+     - `max_log_likelihood.<path>` and `median_pdf.<path>` for every parameter (e.g. `median_pdf.gaussian.centre`).
+     - `upper_sigma_<sigma>.<path>`, `lower_sigma_<sigma>.<path>`, `error_upper_sigma_<sigma>.<path>` and
+     `error_lower_sigma_<sigma>.<path>` for every parameter and sigma (e.g. `error_upper_sigma_3.gaussian.centre`).
+
+    Every value is computed by the samples themselves (e.g. via `samples.median_pdf_vector`), so it is the value
+    the `Samples` loaded by the aggregator give.
+
+    Parameters
+    ----------
+    samples : af.Samples or ColumnarSamples
+        The samples of the model-fit.
+    sigmas : [float]
+        The sigma values at which the values and errors of every parameter are summarized.
+    """
+    vectors = {
+        "max_log_likelihood": samples.max_log_likelihood_vector,
+        "median_pdf": samples.median_pdf_vector,
+    }
+
+    for sigma in sigmas:
+        vectors[f"upper_sigma_{sigma:g}"] = samples.vector_at_upper_sigma(sigma=sigma)
+        vectors[f"lower_sigma_{sigma:g}"] = samples.vector_at_lower_sigma(sigma=sigma)
+        vectors[f"error_upper_sigma_{sigma:g}"] = samples.error_vector_at_upper_sigma(
+            sigma=sigma
+        )
+        vectors[f"error_lower_sigma_{sigma:g}"] = samples.error_vector_at_lower_sigma(
+            sigma=sigma
+        )
+
+    summaries = {
+        "max_log_likelihood": float(
+            np.max(
+                columnar.values_from(samples, "log_likelihood_list", "log_likelihoods")
+            )
+        )
+    }
+
+    for name in ("log_evidence", "time"):
+
+        value = getattr(samples, name, None)
+
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            summaries[name] = float(value)
+
+    parameter_paths = parameter_paths_from(model=samples.model)
+
+    for prefix, vector in vectors.items():
+        for parameter_path, value in zip(parameter_paths, vector):
+            summaries[f"{prefix}.{parameter_path}"] = float(value)
+
+    return summaries
+
+
+"""
+The names of the summaries which are not of a parameter, and the prefixes of the names of those which are.
+"""
+summary_scalar_names = ("max_log_likelihood", "log_evidence", "time")
+summary_prefixes = (
+    "max_log_likelihood.",
+    "median_pdf.",
+    "upper_sigma_",
+    "lower_sigma_",
+    "error_upper_sigma_",
+    "error_lower_sigma_",
+)
+
+
+def is_summary_name(name):
+    """
+    Whether a name is that of a summary saved by `save_summaries` (see `summaries_from`), rather than of another
+    object saved via `paths.save_object`.
+    """
+    return name in summary_scalar_names or name.startswith(summary_prefixes)
+
+
+def save_summaries(paths, samples, sigmas=(3.0,)):
+    """
+    Save the scalar summaries of the samples of a model-fit (see `summaries_from`), which is called in the
+    `save_results_for_aggregator` method of an `Analysis`.
+
+    Every summary is saved as a string, which the database stores as plain text rather than as a pickle. If the
+    results are written to a database, the maximum likelihood and median PDF value of every parameter are also written
+    to the `parameter_summary` table.
+
+    Parameters
+    ----------
+    paths : af.DirectoryPaths or af.DatabasePaths
+        The paths of the search, which save the summaries to the output folder or database.
+    samples : af.Samples or ColumnarSamples
+        The samples of the model-fit.
+    sigmas : [float]
+        The sigma values at which the values and errors of every parameter are summarized.
+    """
+    summaries = summaries_from(samples=samples, sigmas=sigmas)
+
+    for name, value in summaries.items():
+        paths.save_object(name, repr(value))
+
+    if not hasattr(paths, "session"):
+        return
+
+    create_parameter_summary_table(session=paths.session)
+
+    paths.session.execute(
+        text(
+            "INSERT OR REPLACE INTO parameter_summary "
+            "(fit_id, path, max_log_likelihood, median_pdf) "
+            "VALUES (:fit_id, :path, :max_log_likelihood, :median_pdf)"
+        ),
+        [
+            {
+                "fit_id": paths.fit.id,
+                "path": parameter_path,
+                "max_log_likelihood": summaries[f"max_log_likelihood.{parameter_path}"],
+                "median_pdf": summaries[f"median_pdf.{parameter_path}"],
+            }
+            for parameter_path in parameter_paths_from(model=samples.model)
+        ],
+    )
+
+
+def _float_from(value):
+
+    if value is None:
+        return None
+
+    return float(value)
+
+
+def values(aggregator, name):
+    """
+    Returns a list of the id and value of a summary (e.g. `median_pdf.gaussian.centre`) of every fit of an
+    `Aggregator`, as `(fit_id, value)` tuples in the order of the ids.
+
+    For an `Aggregator` of a database, the values of every fit are read with a single SQL query, which selects the
+    fits of the `Aggregator` as a subquery, so no `Fit`, `Samples` (or any other pickle) is loaded. For an `Aggregator`
+    of an output folder, every value is loaded from its own pickle, and the id of a fit is the name of its output
+    folder (which is its id in a database).
+
+    The values are returned with their ids because the order in which an `Aggregator` iterates over its fits is not
+    defined, so they cannot be matched to other results of the fits by their position.
+
+    A fit which does not have the summary (e.g. `log_evidence` of a fit using an optimizer) has the value `None`.
+
+    Parameters
+    ----------
+    aggregator : af.Aggregator
+        The aggregator of the fits, which may have been queried.
+    name : str
+        The name of the summary.
+    """
+    return [
+        (fit_id, _float_from(value))
+        for fit_id, value in database_util.values_from(aggregator=aggregator, name=name)
+    ]
+
+
+"""
+__Queries__
+
+Queries on the `parameter_summary` table, which are combined with other queries of the aggregator using `&`, `|`
+and `~`, e.g.:
+
+    agg.query((agg.gaussian == m.Gaussian) & (summaries.median_pdf("gaussian.sigma") < 3.0))
+"""
+
+
+class SummaryCondition(AbstractCondition):
+    def __init__(self, path, column, symbol, value):
+        """
+        A condition on the value of a parameter in the `parameter_summary` table, which selects the ids of every fit
+        whose parameter satisfies the condition.
+
+        Parameters
+        ----------
+        path : str
+            The path of the parameter in the model (e.g. `gaussian.sigma`).
+        column : str
+            The column of the table the condition is on (`max_log_likelihood` or `median_pdf`).
+        symbol : str
+            =, <=, >=, < or >
+        value : float
+            The value the parameter is compared to, which must be finite.
+        """
+        if column not in parameter_summary_columns:
+            raise ValueError(
+                f"The column {column} is not one of {parameter_summary_columns}."
+            )
+
+        if symbol not in parameter_summary_symbols:
+            raise ValueError(
+                f"The symbol {symbol} is not one of {parameter_summary_symbols}."
+            )
+
+        value = float(value)
+
+        if not math.isfinite(value):
+            raise ValueError(
+                f"The value {value} a parameter is compared to must be finite."
+            )
+
+        self.path = path
+        self.column = column
+        self.symbol = symbol
+        self.value = value
+
+    @property
+    def tables(self):
+        return {fit_table}
+
+    def __str__(self):
+        """
+        The condition as SQL. The path is quoted as an SQL string (with every quote in it doubled), the column and
+        symbol are one of a fixed set and the value is a finite float, so nothing in the condition is read as SQL.
+        """
+        path = self.path.replace("'", "''")
+
+        return (
+            f"id IN (SELECT fit_id FROM parameter_summary WHERE "
+            f"path = '{path}' AND {self.column} {self.symbol} {self.value!r})"
+        )
+
+
+class SummaryColumn:
+    def __init__(self, path, column):
+        """
+        The value of a parameter in the `parameter_summary` table, which is compared to a value to create a query.
+        """
+        if column not in parameter_summary_columns:
+            raise ValueError(
+                f"The column {column} is not one of {parameter_summary_columns}."
+            )
+
+        self.path = path
+        self.column = column
+
+    def _query(self, symbol, value):
+        return AttributeQuery(
+            SummaryCondition(
+                path=self.path, column=self.column, symbol=symbol, value=value
+            )
+        )
+
+    def __eq__(self, other):
+        return self._query(symbol="=", value=other)
+
+    def __lt__(self, other):
+        return self._query(symbol="<", value=other)
+
+    def __le__(self, other):
+        return self._query(symbol="<=", value=other)
+
+    def __gt__(self, other):
+        return self._query(symbol=">", value=other)
+
+    def __ge__(self, other):
+        return self._query(symbol=">=", value=other)
+
+    def __hash__(self):
+        return hash((self.path, self.column))
+
+
+def median_pdf(path):
+    """
+    The median PDF value of a parameter (e.g. `gaussian.sigma`), used to query the aggregator.
+    """
+    return SummaryColumn(path=path, column="median_pdf")
+
+
+def max_log_likelihood(path):
+    """
+    The maximum likelihood value of a parameter (e.g. `gaussian.sigma`), used to query the aggregator.
+    """
+    return SummaryColumn(path=path, column="max_log_likelihood")
+
+
+"""
+__Export__
+
+The columns of an export are `unique_tag`, `info.<key>` for every key of the `info` dictionaries of the fits and
+every string saved via `paths.save_object`, which includes every summary saved via `save_summaries` (e.g.
+`median_pdf.gaussian.centre`). Summaries are exported as floats. `info` values and other strings are exported as floats
+if every value is a number, and as strings otherwise.
+
+The fits are exported in batches, in the order of their ids, so that only one batch of rows is held in memory when
+writing a Parquet file. Every batch is read with its own SQL query, which selects the next `batch_size` fits of the
+`Aggregator` after the last fit of the previous batch, so no `Fit` is loaded and the ids of every fit are never held
+in memory at once.
+"""
+
+
+def _is_float(value):
+
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return value is None
+
+    return True
+
+
+def _export_column_types_from(aggregator, batch_size):
+    """
+    Returns a dictionary of every column of the fits of an aggregator and whether its values are strings.
+    """
+    string_query = text(
+        "SELECT name, string FROM pickle WHERE typeof(string) = 'text' "
+        "AND fit_id IN :fit_ids ORDER BY id"
+    ).bindparams(bindparam("fit_ids", expanding=True))
+
+    info_query = text(
+        "SELECT key, value FROM info WHERE fit_id IN :fit_ids ORDER BY id"
+    ).bindparams(bindparam("fit_ids", expanding=True))
+
+    string_is_string = {}
+    info_is_string = {}
+
+    for batch in database_util.fit_batches_from(aggregator=aggregator, batch_size=batch_size):
+
+        fit_ids = {"fit_ids": [fit.id for fit in batch]}
+
+        for name, value in aggregator.session.execute(string_query, fit_ids):
+            string_is_string[name] = string_is_string.get(name, False) or not (
+                is_summary_name(name) or _is_float(value)
+            )
+
+        for key, value in aggregator.session.execute(info_query, fit_ids):
+            info_is_string[f"info.{key}"] = info_is_string.get(
+                f"info.{key}", False
+            ) or not _is_float(value)
+
+    return {"unique_tag": True, **info_is_string, **string_is_string}
+
+
+def _export_schema_from(aggregator, columns, batch_size):
+
+    import pyarrow as pa
+
+    column_types = _export_column_types_from(
+        aggregator=aggregator, batch_size=batch_size
+    )
+
+    if columns is None:
+        columns = list(column_types)
+
+    return pa.schema(
+        [
+            pa.field(
+                column,
+                pa.string()
+                if column_types.get(column, column.startswith("info."))
+                else pa.float64(),
+            )
+            for column in columns
+        ]
+    )
+
+
+def _record_batches_from(aggregator, schema, batch_size):
+    """
+    Returns a generator of the rows of the fits of an aggregator as Apache Arrow record batches, where every batch
+    of fits is read with two SQL queries.
+    """
+    import pyarrow as pa
+
+    summary_names = [
+        name
+        for name in schema.names
+        if name != "unique_tag" and not name.startswith("info.")
+    ]
+    info_keys = [
+        name[len("info.") :] for name in schema.names if name.startswith("info.")
+    ]
+
+    summary_query = text(
+        "SELECT fit_id, name, string FROM pickle "
+        "WHERE name IN :names AND fit_id IN :fit_ids"
+    ).bindparams(
+        bindparam("names", expanding=True), bindparam("fit_ids", expanding=True)
+    )
+
+    info_query = text(
+        "SELECT fit_id, key, value FROM info WHERE key IN :keys AND fit_id IN :fit_ids"
+    ).bindparams(
+        bindparam("keys", expanding=True), bindparam("fit_ids", expanding=True)
+    )
+
+    for batch in database_util.fit_batches_from(aggregator=aggregator, batch_size=batch_size):
+
+        fit_ids = [fit.id for fit in batch]
+
+        values_dict = {}
+
+        if summary_names:
+            for fit_id, name, value in aggregator.session.execute(
+                summary_query, {"names": summary_names, "fit_ids": fit_ids}
+            ):
+                values_dict[(fit_id, name)] = value
+
+        if info_keys:
+            for fit_id, key, value in aggregator.session.execute(
+                info_query, {"keys": info_keys, "fit_ids": fit_ids}
+            ):
+                values_dict[(fit_id, f"info.{key}")] = value
+
+        arrays = []
+
+        for field in schema:
+
+            if field.name == "unique_tag":
+                values = [fit.unique_tag for fit in batch]
+            else:
+                values = [values_dict.get((fit.id, field.name)) for fit in batch]
+
+            if field.type == pa.string():
+                values = [None if value is None else str(value) for value in values]
+            else:
+                values = [_float_from(value) for value in values]
+
+            arrays.append(pa.array(values, type=field.type))
+
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def to_arrow(aggregator, columns=None, batch_size=1000):
+    """
+    Returns an Apache Arrow table of the results of every fit of an `Aggregator` of a database, with one row per fit
+    (see `__Export__` above for its columns). It is converted to a **pandas** `DataFrame` via its `to_pandas` method.
+
+    Parameters
+    ----------
+    aggregator : af.Aggregator
+        The aggregator of the fits, which may have been queried.
+    columns : [str], optional
+        The columns which are exported (e.g. `["unique_tag", "median_pdf.gaussian.centre", "log_evidence"]`). If
+        `None`, every column is exported.
+    batch_size : int
+        The number of fits whose results are read with each query.
+    """
+    import pyarrow as pa
+
+    schema = _export_schema_from(
+        aggregator=aggregator, columns=columns, batch_size=batch_size
+    )
+
+    return pa.Table.from_batches(
+        list(
+            _record_batches_from(
+                aggregator=aggregator, schema=schema, batch_size=batch_size
+            )
+        ),
+        schema=schema,
+    )
+
+
+def to_parquet(aggregator, file_path, columns=None, batch_size=1000):
+    """
+    Write the results of every fit of an `Aggregator` of a database to a Parquet file, with one row per fit (see
+    `__Export__` above for its columns).
+
+    The fits are written in batches of `batch_size` fits, so the memory used does not grow with the number of fits.
+
+    Parameters
+    ----------
+    aggregator : af.Aggregator
+        The aggregator of the fits, which may have been queried.
+    file_path : str
+        The full path of the Parquet file that is output.
+    columns : [str], optional
+        The columns which are exported (e.g. `["unique_tag", "median_pdf.gaussian.centre", "log_evidence"]`). If
+        `None`, every column is exported.
+    batch_size : int
+        The number of fits whose results are read and written at once.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _export_schema_from(
+        aggregator=aggregator, columns=columns, batch_size=batch_size
+    )
+
+    file_dir = path.split(file_path)[0]
+
+    if file_dir and not path.exists(file_dir):
+        os.makedirs(file_dir)
+
+    with pq.ParquetWriter(file_path, schema) as writer:
+        for record_batch in _record_batches_from(
+            aggregator=aggregator, schema=schema, batch_size=batch_size
+        ):
+            writer.write_table(pa.Table.from_batches([record_batch], schema=schema))
@@ -0,0 +1,97 @@
+"""
+Feature: Update Scheduling
+==========================
+
+Every `iterations_per_update` iterations a non-linear search performs an update, where it outputs its samples and
+model results and visualizes the maximum log likelihood model. The value of `iterations_per_update` comes from the
+search's config file (e.g. 5000 for `DynestyStatic`, 2500 for `Emcee`, 500 for `PySwarms`) and does not depend on how
+long the likelihood function takes:
+
+ - For a cheap likelihood function, 5000 iterations may take a fraction of a second, meaning the search spends most
+ of its time performing updates.
+
+ - For an expensive likelihood function, 5000 iterations may take hours, meaning a search which is interrupted loses
+ hours of work when it resumes from its last update.
+
+The `schedule_updates` function in `performance.py` instead measures how long updates and the iterations between them
+take during the model-fit, and changes `iterations_per_update` after every update so that updates take a fixed
+fraction (by default 2%) of the run time.
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+import autofit as af
+from os import path
+
+import model as m
+import analysis as a
+import performance
+
+"""
+__Data__
+
+We load the dataset of a single `Gaussian` and create its `Analysis`.
+"""
+dataset_path = path.join("dataset", "example_1d", "gaussian_x1")
+
+data = af.util.numpy_array_from_json(file_path=path.join(dataset_path, "data.json"))
+noise_map = af.util.numpy_array_from_json(
+    file_path=path.join(dataset_path, "noise_map.json")
+)
+
+analysis = a.Analysis(data=data, noise_map=noise_map)
+
+model = af.Collection(gaussian=m.Gaussian)
+
+"""
+__Search__
+
+We create the search with a small `iterations_per_update`, which is used for the first batch of iterations, and then
+schedule its updates to take 2% of the run time.
+
+The `maximum_interval` sets the longest time (in seconds) between updates, so that a search with an expensive
+likelihood still updates often enough to be resumed without losing much work.
+"""
+dynesty = af.DynestyStatic(
+    name="update_scheduling",
+    path_prefix=path.join("features"),
+    nlive=50,
+    iterations_per_update=500,
+)
+
+scheduler = performance.schedule_updates(
+    search=dynesty, update_fraction=0.02, maximum_interval=600.0
+)
+
+result = dynesty.fit(model=model, analysis=analysis)
+
+"""
+After the fit, the scheduler tells us every batch of iterations it measured: the iterations performed (counted from
+the calls of the likelihood function, as a batch is cut short when the search converges), their time, the time of the
+update after them and the `iterations_per_update` chosen for the next batch.
+"""
+for batch in scheduler.batches:
+    print(
+        f"{batch['iterations_performed']} iterations in {batch['iteration_time']:.2f}s, "
+        f"update {batch['update_time']:.2f}s -> {batch['iterations_per_update']} iterations per update"
+    )
+
+"""
+The scheduler also tells us the fraction of the run time that was spent on updates.
+
+This fit of a single `Gaussian` takes only a few seconds, which is shorter than the time updates are aiming to be
+apart (for an update taking 0.5s and an `update_fraction` of 2%, 25s). Its fraction is therefore far above 2%: it
+is dominated by the first batches, where `iterations_per_update` is growing from its small initial value (by at most
+a factor `maximum_growth` per update), and by the updates performed when the search converges and finishes, which
+cannot be scheduled. For a fit lasting many update intervals (e.g. with an expensive likelihood function) the
+fraction approaches `update_fraction`.
+"""
+print(f"Fraction of run time spent on updates: {scheduler.update_fraction_measured}")
+print(f"Final iterations per update: {dynesty.iterations_per_update}")
+
+"""
+Finish.
+"""
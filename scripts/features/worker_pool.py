@@ -0,0 +1,140 @@
+"""
+Feature: Worker Pool
+====================
+
+When we fit many datasets, or fit a dataset many times (e.g. with different models or search settings), each model-fit
+is often short. Starting a new pool of processes for every fit, and sending every `Analysis` (and therefore its data)
+to every process, can then take a significant fraction of the total run time.
+
+The `WorkerPool` in `parallel.py` instead keeps a pool of processes alive across many model-fits, where each fit runs
+in one process. Every `Analysis` is sent to the processes only once, so fitting the same dataset again only sends
+the search and model.
+
+This example fits the 3 datasets of the `database.py` example simultaneously, and then fits them all again with a
+second model. It then shows how the data of an `Analysis` can be placed in shared memory, so that processes share
+one copy of it.
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+import autofit as af
+import os
+from os import path
+
+import model as m
+import analysis as a
+import parallel
+
+"""
+__Analysis__
+
+We load each dataset and create its `Analysis`.
+
+The example is run inside an `if __name__ == "__main__":` block, because the processes of the pool import this
+script when they are started by the `spawn` method (the default on macOS and Windows) and must not run it again.
+"""
+if __name__ == "__main__":
+
+    dataset_names = ["gaussian_x1_0", "gaussian_x1_1", "gaussian_x1_2"]
+
+    analysis_list = []
+
+    for dataset_name in dataset_names:
+
+        dataset_path = path.join("dataset", "example_1d", dataset_name)
+
+        data = af.util.numpy_array_from_json(
+            file_path=path.join(dataset_path, "data.json")
+        )
+        noise_map = af.util.numpy_array_from_json(
+            file_path=path.join(dataset_path, "noise_map.json")
+        )
+
+        analysis_list.append(a.Analysis(data=data, noise_map=noise_map))
+
+    """
+    __Worker Pool__
+
+    We create a `WorkerPool` with one process per dataset, up to the number of CPUs of this computer, so the datasets
+    are fitted simultaneously without more processes than CPUs competing for them. The `fit` method returns
+    immediately and the results are retrieved with `get`, which waits for each fit to finish.
+
+    Each fit runs in one process, so every search must use `number_of_cores=1`.
+    """
+    number_of_cores = min(len(dataset_names), os.cpu_count() or 1)
+
+    with parallel.WorkerPool(number_of_cores=number_of_cores) as pool:
+
+        model = af.Collection(gaussian=m.Gaussian)
+
+        fits = [
+            pool.fit(
+                search=af.DynestyStatic(
+                    name="search[1]__gaussian",
+                    path_prefix=path.join("features", "worker_pool", dataset_name),
+                    nlive=50,
+                    number_of_cores=1,
+                ),
+                model=model,
+                analysis=analysis,
+            )
+            for dataset_name, analysis in zip(dataset_names, analysis_list)
+        ]
+
+        result_list = [fit.get() for fit in fits]
+
+        """
+        We now fit every dataset again with a model of two `Gaussian`'s. The processes of the pool are already running
+        and have loaded every `Analysis`, so neither cost is repeated.
+        """
+        model = af.Collection(gaussian_0=m.Gaussian, gaussian_1=m.Gaussian)
+
+        fits = [
+            pool.fit(
+                search=af.DynestyStatic(
+                    name="search[2]__gaussian_x2",
+                    path_prefix=path.join("features", "worker_pool", dataset_name),
+                    nlive=50,
+                    number_of_cores=1,
+                ),
+                model=model,
+                analysis=analysis,
+            )
+            for dataset_name, analysis in zip(dataset_names, analysis_list)
+        ]
+
+        result_x2_list = [fit.get() for fit in fits]
+
+    for result, result_x2 in zip(result_list, result_x2_list):
+
+        print(result.log_likelihood, result_x2.log_likelihood)
+
+    """
+    __Shared Arrays__
+
+    By default, the `WorkerPool` places the `data` and `noise_map` of every `Analysis` (and the read-only arrays derived
+    from them, like an `inverse_noise_map`) in shared memory before sending it to its processes, so that every process
+    shares one copy of the data rather than receiving its own.
+
+    The same can be done for a single fit using a search with `number_of_cores` > 1, where the `Analysis` is pickled to
+    every process of the search. After calling `share_arrays`, only the names of the shared memory files are pickled.
+    """
+    analysis = parallel.share_arrays(
+        analysis=analysis_list[0], names=("data", "noise_map")
+    )
+
+    dynesty = af.DynestyStatic(
+        name="search[3]__gaussian_shared",
+        path_prefix=path.join("features", "worker_pool", dataset_names[0]),
+        nlive=50,
+        number_of_cores=2,
+    )
+
+    result = dynesty.fit(model=af.Collection(gaussian=m.Gaussian), analysis=analysis)
+
+"""
+Finish.
+"""
@@ -0,0 +1,56 @@
+import numpy as np
+
+"""
+The `fitting.py` module contains the functions the `Analysis` of this chapter uses to fit model data to a dataset.
+"""
+
+
+def model_data_from(instance, xvalues, model_data=None):
+    """
+    Sum the profiles of every model component in an instance to create the model data, accumulating each profile
+    in place into a single buffer rather than building a list of profiles which is then summed.
+
+    Parameters
+    ----------
+    instance : af.Collection
+        The model instances of the profiles.
+    xvalues : np.ndarray
+        The x coordinates the profiles are evaluated on.
+    model_data : np.ndarray, optional
+        A buffer of the same shape as the xvalues the model data is written into.
+    """
+    if model_data is None:
+        model_data = np.zeros(shape=xvalues.shape[0])
+    else:
+        model_data.fill(0.0)
+
+    for profile in instance:
+        np.add(
+            model_data, profile.profile_from_xvalues(xvalues=xvalues), out=model_data
+        )
+
+    return model_data
+
+
+def chi_squared_from(data, model_data, inverse_noise_map, residual_map=None):
+    """
+    Compute the chi-squared of a fit of model data to data, where the normalized residuals are computed in place in
+    one buffer and squared and summed via a single dot product.
+
+    This avoids the builtin Python `sum`, which iterates over a NumPy array element by element.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        The data that is fitted.
+    model_data : np.ndarray
+        The model data fitted to the data.
+    inverse_noise_map : np.ndarray
+        The inverse of the noise-map of the data (e.g. 1.0 / noise_map).
+    residual_map : np.ndarray, optional
+        A buffer of the same shape as the data the normalized residuals are written into.
+    """
+    residual_map = np.subtract(data, model_data, out=residual_map)
+    np.multiply(residual_map, inverse_noise_map, out=residual_map)
+
+    return np.dot(residual_map, residual_map)
@@ -3,7 +3,12 @@ import autofit as af
 import numpy as np
 import matplotlib.pyplot as plt
 from os import path
+import math
 import os
+import time
+
+from fitting import chi_squared_from, model_data_from
+from visualization import BackgroundVisualizer
 
 """
 The `analysis.py` module contains the dataset and log likelihood function which given a model instance (set up by
@@ -11,19 +16,227 @@ the non-linear search) fits the dataset and returns the log likelihood of that m
 """
 
 
+class Convolver:
+
+    """
+    Direct convolution is O(N*K) for a dataset of N pixels and a kernel of K pixels, whereas convolution via a
+    fast Fourier transform (FFT) is O(L log L), where L is N + K - 1 rounded up to a power of 2.
+
+    When the choice is automatic, the FFT is used if N * K > `fft_cost_factor` * L * log2(L). Both took the same time
+    when this ratio was between 4 and 8 for N from 1e3 to 1e5 (e.g. N=1e4 and K=101), so small kernels are convolved
+    directly. The choice only depends on the sizes of the data and kernel, so every run of a fit on every computer
+    uses the same convolution and gives the same log likelihoods (the two differ by around 1e-12).
+
+    Alternatively both can be timed on data of the same size and the faster one used, which is best for one computer
+    but may choose differently between runs. Each is timed `timing_repeats` times and its fastest time is compared, so
+    that a single slow call (e.g. when the FFT plan is first created) does not decide the choice.
+    """
+
+    fft_cost_factor = 6.0
+    timing_repeats = 3
+
+    def __init__(self, kernel, pixels, use_fft=None, timed=False):
+        """
+        Convolves model data with a kernel, giving identical results to `np.convolve(model_data, kernel, mode="same")`.
+
+        If the FFT is used, the FFT of the kernel is computed once here, so that every convolution only requires one
+        forward and one inverse FFT of the model data.
+
+        Parameters
+        ----------
+        kernel : np.ndarray
+            The 1D kernel the model data is convolved with, which cannot have more pixels than the model data.
+        pixels : int
+            The number of pixels in the model data that is convolved.
+        use_fft : bool, optional
+            Whether to convolve via an FFT. If `None`, it is chosen from the sizes of the data and kernel.
+        timed : bool
+            If `True` and `use_fft` is `None`, both convolutions are timed and the faster is used instead.
+        """
+        if kernel.shape[0] > pixels:
+            raise ValueError(
+                f"The kernel has {kernel.shape[0]} pixels, which is more than the {pixels} pixels of the data it "
+                f"convolves."
+            )
+
+        self.kernel = kernel
+        self.pixels = pixels
+
+        self.fft_pixels = 1 << (pixels + kernel.shape[0] - 2).bit_length()
+        self.offset = (kernel.shape[0] - 1) // 2
+
+        self.kernel_fft = np.fft.rfft(kernel, n=self.fft_pixels)
+
+        if use_fft is None:
+            use_fft = self.fft_is_faster() if timed else self.fft_is_cheaper
+
+        self.use_fft = use_fft
+
+    @property
+    def fft_is_cheaper(self):
+        """
+        Returns whether the cost of convolving model data of this size via the FFT is lower than direct convolution.
+        """
+        return (
+            self.pixels * self.kernel.shape[0]
+            > self.fft_cost_factor * self.fft_pixels * math.log2(self.fft_pixels)
+        )
+
+    def fft_is_faster(self):
+        """
+        Returns whether convolving model data of this size via the FFT is faster than direct convolution, by timing
+        both.
+        """
+        model_data = np.zeros(shape=self.pixels)
+
+        times = {}
+
+        for use_fft in (False, True):
+
+            self.use_fft = use_fft
+
+            call_times = []
+
+            for _ in range(self.timing_repeats):
+                start = time.perf_counter()
+                self.convolve(model_data=model_data)
+                call_times.append(time.perf_counter() - start)
+
+            times[use_fft] = min(call_times)
+
+        return times[True] < times[False]
+
+    def convolve(self, model_data):
+        """
+        Convolve model data with the kernel, where the model data can be a single line of shape (pixels,) or many
+        lines of shape (total_lines, pixels), each of which is convolved separately.
+
+        Parameters
+        ----------
+        model_data : np.ndarray
+            The model data that is convolved.
+        """
+        if not self.use_fft:
+
+            if model_data.ndim == 1:
+                return np.convolve(model_data, self.kernel, mode="same")
+
+            return np.array(
+                [np.convolve(line, self.kernel, mode="same") for line in model_data]
+            )
+
+        blurred_model_data = np.fft.irfft(
+            np.fft.rfft(model_data, n=self.fft_pixels, axis=-1) * self.kernel_fft,
+            n=self.fft_pixels,
+            axis=-1,
+        )
+
+        return blurred_model_data[..., self.offset : self.offset + self.pixels]
+
+
 class Analysis(af.Analysis):
 
     """
     In this example the Analysis only contains the data and noise-map. It can be easily extended however, for more
     complex data-sets and model fitting problems.
+
+    For example, datasets which are blurred by a kernel (e.g. `dataset/example_1d/gaussian_x1_convolved`) can be fitted
+    by passing the kernel to the Analysis, such that the model data is convolved with it before being fitted.
+
+    Passing the model to the Analysis lets it also fit many models at once via `log_likelihood_function_vectorized`,
+    which pairs the columns of the parameters it is passed with the parameters of this model.
+
+    Visualization during a non-linear search can also be performed in a background process, by passing
+    `visualize_in_background=True`, so that the search does not wait for plotting to finish. Plots are then made at
+    most once every `visualize_interval` seconds.
     """
 
-    def __init__(self, data, noise_map):
+    def __init__(
+        self,
+        data,
+        noise_map,
+        kernel=None,
+        model=None,
+        visualize_in_background=False,
+        visualize_interval=0.0,
+    ):
 
         super().__init__()
 
         self.data = data
         self.noise_map = noise_map
+        self.model = model
+
+        """
+        The x-values and inverse noise-map do not change during the model-fit, so we compute them once here. We also
+        create the buffers the model data and residuals of every fit are written into.
+        """
+        self.xvalues = np.arange(self.data.shape[0])
+        self.inverse_noise_map = 1.0 / self.noise_map
+
+        self._model_data = np.zeros(shape=self.data.shape[0])
+        self._residual_map = np.zeros(shape=self.data.shape[0])
+
+        """
+        If there is a kernel we set up its `Convolver` once, so that the FFT of the kernel is not recomputed for every
+        fit.
+        """
+        self.convolver = (
+            Convolver(kernel=kernel, pixels=self.data.shape[0])
+            if kernel is not None
+            else None
+        )
+
+        self.background_visualizer = (
+            BackgroundVisualizer(
+                plot_function=self.plot_model_fit, interval=visualize_interval
+            )
+            if visualize_in_background
+            else None
+        )
+
+    def __getstate__(self):
+        """
+        The buffers of the model data and residuals are the size of the data, but their values are not needed by
+        another process, so they are not pickled (e.g. when the `Analysis` is sent to the processes of a search) and
+        are recreated when the `Analysis` is unpickled.
+
+        The `BackgroundVisualizer` plots via a method bound to this `Analysis`, so pickling it would pickle this
+        `Analysis` again, including arrays which a copy being pickled has replaced (e.g. with shared arrays). Only its
+        interval is therefore pickled, and the unpickled `Analysis` creates a visualizer bound to itself.
+        """
+        state = self.__dict__.copy()
+
+        state.pop("_model_data", None)
+        state.pop("_residual_map", None)
+
+        background_visualizer = state.pop("background_visualizer", None)
+
+        state["_visualize_interval"] = (
+            background_visualizer.interval
+            if background_visualizer is not None
+            else None
+        )
+
+        return state
+
+    def __setstate__(self, state):
+
+        state = state.copy()
+        visualize_interval = state.pop("_visualize_interval", None)
+
+        self.__dict__.update(state)
+
+        self._model_data = np.zeros(shape=self.data.shape[0])
+        self._residual_map = np.zeros(shape=self.data.shape[0])
+
+        self.background_visualizer = (
+            BackgroundVisualizer(
+                plot_function=self.plot_model_fit, interval=visualize_interval
+            )
+            if visualize_interval is not None
+            else None
+        )
 
     """
     In the log_likelihood_function function below, `instance` is an instance of our model, which in this example is
@@ -61,7 +274,7 @@ class Analysis(af.Analysis):
 
         """Get the range of x-values the data is defined on, to evaluate the model of the profiles."""
 
-        xvalues = np.arange(self.data.shape[0])
+        xvalues = self.xvalues
 
         """
         The simplest way to create the summed profile is to add the profile of each model component. If we
@@ -75,31 +288,147 @@ class Analysis(af.Analysis):
         our model components. We can iterate over this list, calling their profile_from_xvalues and summing the result
         to compute the summed profile of any model.
         
-        Use these xvalues to create model data of our profiles.
+        Use these xvalues to create model data of our profiles, which `model_data_from` sums in place into a buffer.
         
         """
-        model_data = sum(
-            [line.profile_from_xvalues(xvalues=xvalues) for line in instance]
+        model_data = model_data_from(
+            instance=instance, xvalues=xvalues, model_data=self._model_data
         )
 
-        """Fit the model profile data to the observed data, computing the residuals and chi-squareds."""
-        residual_map = self.data - model_data
-        chi_squared_map = (residual_map / self.noise_map) ** 2.0
-        log_likelihood = -0.5 * sum(chi_squared_map)
+        """If the data is blurred by a kernel, we blur the model data with the same kernel."""
+        if self.convolver is not None:
+            model_data = self.convolver.convolve(model_data=model_data)
+
+        """Fit the model profile data to the observed data, computing the residuals and chi-squared."""
+        chi_squared = chi_squared_from(
+            data=self.data,
+            model_data=model_data,
+            inverse_noise_map=self.inverse_noise_map,
+            residual_map=self._residual_map,
+        )
+        log_likelihood = -0.5 * chi_squared
 
         return log_likelihood
 
+    """
+    The `log_likelihood_function` above is called once per model, meaning a non-linear search which proposes many
+    models per iteration (e.g. the 50 walkers of Emcee or 50 particles of PySwarms) pays Python overhead for every
+    one of them. For a 100 pixel dataset, this overhead is far larger than the cost of the chi-squared itself.
+
+    The method below is an opt-in vectorized version of the log likelihood function, which scores a whole population
+    of models in one call using the `profiles_from_xvalues` methods of the profiles in `model.py`. It is passed a
+    matrix of physical parameters, with one row per model and one column per free parameter, in the same order as the
+    vectors of the model passed to the Analysis (its `prior_tuples_ordered_by_id`).
+    """
+
+    def log_likelihood_function_vectorized(self, parameter_matrix):
+        """
+        Determine the log likelihoods of fits of many models to the dataset in one vectorized call.
+
+        Parameters
+        ----------
+        parameter_matrix : np.ndarray
+            The physical parameters of every model, of shape (total_models, total_parameters), where every column
+            corresponds to a prior in `model.prior_tuples_ordered_by_id` of the model passed to the Analysis.
+
+        Returns
+        -------
+        log_likelihoods : np.ndarray
+            The log likelihood of every model, of shape (total_models,).
+        """
+        if self.model is None:
+            raise ValueError(
+                "The vectorized log likelihood function requires the model to be passed to the Analysis."
+            )
+
+        model = self.model
+
+        parameter_matrix = np.atleast_2d(parameter_matrix)
+
+        xvalues = self.xvalues
+
+        """
+        Every column is paired with its prior, rather than with a path, so that a prior shared by many parameters
+        (e.g. `model.exponential.centre = model.gaussian.centre`) sets all of them.
+        """
+        columns = {
+            prior.id: parameter_matrix[:, index]
+            for index, (_, prior) in enumerate(model.prior_tuples_ordered_by_id)
+        }
+
+        """
+        The model data of every model is the sum of the profiles of every component, which are computed in one
+        call per component (e.g. one call for every `Gaussian` in the population) into a reused buffer.
+        """
+        model_datas = np.zeros(shape=(parameter_matrix.shape[0], self.data.shape[0]))
+        profiles = np.empty(shape=model_datas.shape)
+
+        for _, profile_model in model.direct_prior_model_tuples:
+
+            """
+            Parameters which are fixed in the model are not in the `parameter_matrix`, so we use their fixed value
+            for every model.
+            """
+            arguments = {}
+
+            for argument in profile_model.constructor_argument_names:
+
+                value = getattr(profile_model, argument)
+
+                if isinstance(value, af.Prior):
+                    arguments[argument] = columns[value.id]
+                else:
+                    arguments[argument] = np.full(parameter_matrix.shape[0], value)
+
+            profile_model.cls.profiles_from_xvalues(
+                xvalues=xvalues, profiles=profiles, **arguments
+            )
+            model_datas += profiles
+
+        if self.convolver is not None:
+            model_datas = self.convolver.convolve(model_data=model_datas)
+
+        """Fit every model data to the observed data, computing the chi-squared of every model."""
+        residual_maps = (self.data - model_datas) * self.inverse_noise_map
+        chi_squareds = np.einsum("ij,ij->i", residual_maps, residual_maps)
+
+        return -0.5 * chi_squareds
+
     def visualize(self, paths, instance, during_analysis):
 
         """
         During a model-fit, the `visualize` method is called throughout the non-linear search. The `instance` passed
         into the visualize method is maximum log likelihood solution obtained by the model-fit so far and it can be
         used to provide on-the-fly images showing how the model-fit is going.
+
+        If visualization is performed in the background, every plot requested during the search is passed to the
+        `BackgroundVisualizer`. The final visualization, after the search has finished, is performed straight away
+        once the background process has stopped, so that the final images are always of the final instance.
         """
+        if self.background_visualizer is not None:
 
-        xvalues = np.arange(self.data.shape[0])
+            if during_analysis:
+                self.background_visualizer.plot(paths.image_path, instance)
+                return
+
+            self.background_visualizer.close()
+
+        self.plot_model_fit(image_path=paths.image_path, instance=instance)
+
+    def plot_model_fit(self, image_path, instance):
+        """
+        Plot the fit of a model instance to the data, outputting the image to the `image_path` folder.
+        """
+        xvalues = self.xvalues
 
         model_datas = [line.profile_from_xvalues(xvalues=xvalues) for line in instance]
+
+        if self.convolver is not None:
+            model_datas = [
+                self.convolver.convolve(model_data=model_data)
+                for model_data in model_datas
+            ]
+
         model_data = sum(model_datas)
 
         plt.errorbar(
@@ -118,6 +447,6 @@ class Analysis(af.Analysis):
         plt.xlabel("x values of profile")
         plt.ylabel("Profile intensity")
 
-        os.makedirs(paths.image_path, exist_ok=True)
-        plt.savefig(path.join(paths.image_path, "model_fit.png"))
+        os.makedirs(image_path, exist_ok=True)
+        plt.savefig(path.join(image_path, "model_fit.png"))
         plt.clf()
@@ -14,9 +14,11 @@ import autofit.plot as aplt
 import model as m
 import analysis as a
 
+from emcee import EnsembleSampler
 import matplotlib.pyplot as plt
 import numpy as np
 from os import path
+import time
 
 """
 __Data__
@@ -262,6 +264,88 @@ tool `corner.py`, which is wrapped via the `EmceePlotter` object.
 emcee_plotter = aplt.EmceePlotter(samples=result.samples)
 emcee_plotter.corner()
 
+"""
+__Vectorized Likelihood (Standalone Emcee Demo)__
+
+Every step, Emcee moves all 50 of its walkers, meaning it proposes 50 models at once. The `Emcee` search above calls
+the `log_likelihood_function` once per walker, but the `Analysis` also has a `log_likelihood_function_vectorized`
+method which scores a whole population of models in one call (see `analysis.py`). **emcee** itself can pass the
+positions of every walker to one call, via its `vectorize` input.
+
+This section is a standalone demo of **emcee**, which shows the speed-up of the vectorized log likelihood. It uses
+**emcee** directly rather than the `Emcee` search of **PyAutoFit**, so it does not output results to the output
+folder, cannot be resumed, does not check the auto-correlation times of the walkers for convergence and its
+results cannot be loaded via the database or aggregator.
+
+The vectorized log likelihood function pairs the columns of the parameters it is passed with the parameters of a
+model, so the model is passed to the `Analysis`.
+"""
+analysis_vectorized = a.Analysis(data=data, noise_map=noise_map, model=model)
+
+"""
+The function below computes the log posterior of every walker at once. It is the vectorized log likelihood plus the
+log prior of every parameter, and is minus infinity for a walker with a parameter outside the limits of its prior, so
+that every walker stays within the priors.
+"""
+
+
+def log_posteriors_from(parameter_matrix):
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+
+        log_posteriors = analysis_vectorized.log_likelihood_function_vectorized(
+            parameter_matrix=parameter_matrix
+        )
+
+        outside_limits = np.zeros(shape=parameter_matrix.shape[0], dtype="bool")
+
+        for index, (_, prior) in enumerate(model.prior_tuples_ordered_by_id):
+
+            values = parameter_matrix[:, index]
+
+            log_posteriors = log_posteriors + prior.log_prior_from_value(value=values)
+            outside_limits |= (values < prior.lower_limit) | (values > prior.upper_limit)
+
+    return np.where(outside_limits, -np.inf, log_posteriors)
+
+
+"""
+The walkers start in the same ball around the centre of the priors as the `Emcee` search above, and take the same
+number of steps.
+"""
+initial_parameters = np.array(
+    [
+        model.vector_from_unit_vector(
+            unit_vector=np.random.uniform(0.49, 0.51, model.prior_count)
+        )
+        for _ in range(50)
+    ]
+)
+
+sampler = EnsembleSampler(
+    nwalkers=50,
+    ndim=model.prior_count,
+    log_prob_fn=log_posteriors_from,
+    vectorize=True,
+)
+
+start = time.perf_counter()
+
+sampler.run_mcmc(initial_state=initial_parameters, nsteps=2000)
+
+print(f"Vectorized emcee run time: {time.perf_counter() - start:.2f} seconds")
+
+"""
+The run time is far lower than that of the `Emcee` search above, which scores every walker in its own call. The
+maximum log posterior parameters are the solution of the fit.
+"""
+parameters = sampler.get_chain(flat=True)[np.argmax(sampler.get_log_prob(flat=True))]
+
+instance = model.instance_from_vector(vector=list(parameters))
+
+print("Gaussian centre = ", instance.gaussian.centre)
+print("Exponential centre = ", instance.exponential.centre)
+
 """
 ############################
 ###### PARTICLE SWARM ######
@@ -0,0 +1,189 @@
+import logging
+import matplotlib.pyplot as plt
+import multiprocessing as mp
+import numpy as np
+import threading
+import time
+
+"""
+The `visualization.py` module contains the `BackgroundVisualizer`, which the `Analysis` of the overview uses to
+visualize a model-fit in a background process.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def _plot_in_background(plot_function, connection):
+    """
+    The loop run by the background process of a `BackgroundVisualizer`, which plots every request it receives until
+    it receives `None`, telling the `BackgroundVisualizer` after every plot that it is ready for the next request.
+    """
+    plt.switch_backend("Agg")
+
+    while True:
+
+        arguments = connection.recv()
+
+        if arguments is None:
+            return
+
+        plot_function(*arguments)
+
+        connection.send(True)
+
+
+class BackgroundVisualizer:
+    def __init__(self, plot_function, interval=0.0):
+        """
+        Performs visualization in a background process, so that a non-linear search never waits for plotting.
+
+        The latest request is kept in this process and sent to the background process only once it has finished
+        the previous plot and `interval` seconds have passed since the previous request was sent. A new request made
+        before then replaces the kept request, which is stale, so only the latest (e.g. maximum log likelihood)
+        instance is plotted and the latest request is always plotted once the interval has passed.
+
+        If the background process stops (e.g. because the plot function raised an exception), a warning is logged
+        and every later request is plotted in this process instead, at most once every `interval` seconds.
+
+        Parameters
+        ----------
+        plot_function : function
+            The function performing the visualization, which is called with the arguments of every request.
+        interval : float
+            The minimum wall-clock time in seconds between requests that are plotted.
+        """
+        self.plot_function = plot_function
+        self.interval = interval
+
+        self._process = None
+        self._thread = None
+        self._connection = None
+        self._condition = threading.Condition()
+        self._arguments = None
+        self._closing = False
+        self._failed = False
+        self._synchronous = False
+        self._last_send_time = -np.inf
+        self._last_request_time = -np.inf
+
+    def __getstate__(self):
+        """
+        The background process cannot be pickled (e.g. when the `Analysis` is sent to other processes), so an
+        unpickled visualizer starts its own background process when it is first used.
+        """
+        return {"plot_function": self.plot_function, "interval": self.interval}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _send_requests(self):
+        """
+        The loop run by a thread of this process, which sends the latest request to the background process whenever
+        it is ready for one and the interval has passed, and `None` once the visualizer is closed.
+        """
+        try:
+            while True:
+
+                with self._condition:
+
+                    while self._arguments is None and not self._closing:
+                        self._condition.wait()
+
+                    if self._closing:
+                        break
+
+                    wait_time = self._last_send_time + self.interval - time.time()
+
+                    if wait_time > 0.0:
+                        """
+                        The request is kept until the interval has passed, and may be replaced by a newer request
+                        while it waits.
+                        """
+                        self._condition.wait(timeout=wait_time)
+                        continue
+
+                    arguments = self._arguments
+                    self._arguments = None
+                    self._last_send_time = time.time()
+
+                self._connection.send(arguments)
+                self._connection.recv()
+
+            self._connection.send(None)
+
+        except (EOFError, OSError):
+            """
+            The background process has stopped (e.g. because the plot function raised an exception), which the next
+            request falls back to plotting in this process for.
+            """
+            self._failed = True
+
+    def plot(self, *arguments):
+        """
+        Request a plot, returning immediately without waiting for it to be performed.
+
+        If the background process has stopped, the plot is performed in this process (unless the previous plot was
+        performed less than `interval` seconds ago), so that an exception raised by the plot function is raised here.
+        """
+        if self._process is not None and (
+            self._failed or not self._process.is_alive()
+        ):
+            logger.warning(
+                f"The background process of the BackgroundVisualizer stopped (exit code {self._process.exitcode}), "
+                "so visualization is now performed in this process."
+            )
+
+            self.close()
+            self._synchronous = True
+
+        if self._synchronous:
+
+            request_time = time.time()
+
+            if request_time - self._last_request_time < self.interval:
+                return
+
+            self._last_request_time = request_time
+
+            self.plot_function(*arguments)
+            return
+
+        if self._process is None:
+
+            self._connection, connection = mp.Pipe()
+            self._process = mp.Process(
+                target=_plot_in_background,
+                args=(self.plot_function, connection),
+                daemon=True,
+            )
+            self._process.start()
+            connection.close()
+
+            self._closing = False
+            self._failed = False
+            self._thread = threading.Thread(target=self._send_requests, daemon=True)
+            self._thread.start()
+
+        with self._condition:
+            self._arguments = arguments
+            self._condition.notify()
+
+    def close(self):
+        """
+        Discard any request which has not started, wait for the current plot to finish and stop the background process.
+        """
+        if self._process is None:
+            return
+
+        with self._condition:
+            self._arguments = None
+            self._closing = True
+            self._condition.notify()
+
+        self._thread.join()
+        self._process.join()
+        self._connection.close()
+
+        self._process = None
+        self._thread = None
+        self._connection = None
@@ -5,6 +5,8 @@ from os import path
 import matplotlib.pyplot as plt
 import numpy as np
 
+from fitting import chi_squared_from
+
 """
 The `analysis.py` module contains the dataset and log likelihood function which given a model instance (set up by
 the non-linear search) fits the dataset and returns the log likelihood of that model.
@@ -25,6 +27,12 @@ class Analysis(af.Analysis):
         self.data = data
         self.noise_map = noise_map
 
+        """
+        The x-values and inverse noise-map do not change during the model-fit, so we compute them once here.
+        """
+        self.xvalues = np.arange(self.data.shape[0])
+        self.inverse_noise_map = 1.0 / self.noise_map
+
     """
     In the log_likelihood_function function below, `instance` is an instance of our model, which in this example is
     an instance of the `Gaussian` class in `model.py`. The parameters of the `Gaussian` are set via the non-linear
@@ -54,15 +62,18 @@ class Analysis(af.Analysis):
         # print("Sigma = ", instance.sigma)
 
         """Get the range of x-values the data is defined on, to evaluate the model of the Gaussian."""
-        xvalues = np.arange(self.data.shape[0])
+        xvalues = self.xvalues
 
         """Use these xvalues to create model data of our Gaussian."""
         model_data = instance.profile_from_xvalues(xvalues=xvalues)
 
-        """Fit the model gaussian line data to the observed data, computing the residuals and chi-squareds."""
-        residual_map = self.data - model_data
-        chi_squared_map = (residual_map / self.noise_map) ** 2.0
-        log_likelihood = -0.5 * sum(chi_squared_map)
+        """Fit the model gaussian line data to the observed data, computing the residuals and chi-squared."""
+        chi_squared = chi_squared_from(
+            data=self.data,
+            model_data=model_data,
+            inverse_noise_map=self.inverse_noise_map,
+        )
+        log_likelihood = -0.5 * chi_squared
 
         return log_likelihood
 
@@ -0,0 +1,29 @@
+import numpy as np
+
+"""
+The `fitting.py` module contains the functions the `Analysis` of this example uses to fit model data to a dataset.
+"""
+
+
+def chi_squared_from(data, model_data, inverse_noise_map, residual_map=None):
+    """
+    Compute the chi-squared of a fit of model data to data, where the normalized residuals are computed in place in
+    one buffer and squared and summed via a single dot product.
+
+    This avoids the builtin Python `sum`, which iterates over a NumPy array element by element.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        The data that is fitted.
+    model_data : np.ndarray
+        The model data fitted to the data.
+    inverse_noise_map : np.ndarray
+        The inverse of the noise-map of the data (e.g. 1.0 / noise_map).
+    residual_map : np.ndarray, optional
+        A buffer of the same shape as the data the normalized residuals are written into.
+    """
+    residual_map = np.subtract(data, model_data, out=residual_map)
+    np.multiply(residual_map, inverse_noise_map, out=residual_map)
+
+    return np.dot(residual_map, residual_map)
@@ -0,0 +1,81 @@
+"""
+__Convert To Binary__
+
+This script converts every dataset in the `autofit_workspace/dataset/example_1d` folder from .json files to a single
+binary `dataset.bin` file, which can be loaded instantly via memory-mapping using the `util.dataset_from_binary`
+function. It then packs all datasets into one binary file indexed by a catalog.
+
+The .json files are not removed, so example scripts which load them continue to work.
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+import util
+import os
+from os import path
+
+dataset_path = path.join("dataset", "example_1d")
+
+for dataset_name in sorted(os.listdir(dataset_path)):
+
+    if not path.exists(path.join(dataset_path, dataset_name, "data.json")):
+        continue
+
+    util.dataset_binary_from_json(
+        dataset_path=path.join(dataset_path, dataset_name), overwrite=True
+    )
+
+"""
+The binary dataset can now be loaded as follows, where the `data` and `noise_map` are memory-mapped NumPy arrays.
+"""
+arrays, metadata = util.dataset_from_binary(
+    file_path=path.join(dataset_path, "gaussian_x1", "dataset.bin")
+)
+
+data = arrays["data"]
+noise_map = arrays["noise_map"]
+
+"""
+Single arrays can also be loaded, mirroring the `af.util.numpy_array_from_json` function.
+"""
+data = util.numpy_array_from_binary(
+    file_path=path.join(dataset_path, "gaussian_x1", "dataset.bin"), name="data"
+)
+
+"""
+__Catalog__
+
+All datasets can also be packed into a single binary file with a .json catalog, which indexes every dataset and
+stores metadata that can be filtered on before any dataset is loaded.
+"""
+dataset_paths = [
+    path.join(dataset_path, dataset_name)
+    for dataset_name in sorted(os.listdir(dataset_path))
+    if path.exists(path.join(dataset_path, dataset_name, "data.json"))
+]
+
+util.pack_datasets_from_json(
+    dataset_paths=dataset_paths,
+    file_path=path.join(dataset_path, "datasets.bin"),
+    overwrite=True,
+)
+
+catalog = util.DatasetCatalog.from_json(
+    file_path=path.join(dataset_path, "datasets.json")
+)
+
+"""
+For example, we can load only the low signal-to-noise datasets.
+"""
+catalog_low_snr = catalog.filter(lambda entry: entry["max_signal_to_noise"] < 10.0)
+
+for name, arrays, metadata in catalog_low_snr.datasets():
+
+    print(name, arrays["data"].shape)
+
+"""
+Finish.
+"""
@@ -0,0 +1,68 @@
+"""
+__Simulators: Batch__
+
+This script simulates many 1D datasets at once using the `util.simulate_lines_from_profiles` function, which is used
+for studies requiring thousands of datasets (e.g. sensitivity studies).
+
+Unlike `simulators.py`, the datasets are not output to separate folders of .json files and are not plotted. Instead,
+they are packed into one binary file with a .json catalog (see `convert_to_binary.py`).
+"""
+# %matplotlib inline
+# from pyprojroot import here
+# workspace_path = str(here())
+# %cd $workspace_path
+# print(f"Working Directory has been set to `{workspace_path}`")
+
+import profiles
+import util
+import numpy as np
+from os import path
+
+"""
+__Gaussian x1 + Exponential x1__
+
+We simulate 10000 datasets, each a `Gaussian` + `Exponential` whose centres are drawn randomly.
+
+The datasets are simulated inside an `if __name__ == "__main__":` block, as the processes which simulate them import
+this script when they are started by the `spawn` method (the default on macOS and Windows) and must not simulate
+every dataset again.
+"""
+if __name__ == "__main__":
+
+    total_datasets = 10000
+
+    centres = np.random.default_rng(seed=1).uniform(20.0, 80.0, size=total_datasets)
+
+    profiles_list = [
+        [
+            profiles.Gaussian(centre=centre, intensity=25.0, sigma=10.0),
+            profiles.Exponential(centre=centre, intensity=40.0, rate=0.05),
+        ]
+        for centre in centres
+    ]
+
+    """
+    The datasets are simulated over 4 cores. The noise of every dataset is drawn from a random number generator spawned
+    from `seed`, so the same datasets are simulated for any `number_of_cores` or `chunk_size`.
+    """
+    catalog = util.simulate_lines_from_profiles(
+        profiles_list=profiles_list,
+        file_path=path.join("dataset", "example_1d_batch", "datasets.bin"),
+        seed=1,
+        number_of_cores=4,
+        chunk_size=1000,
+        overwrite=True,
+    )
+
+    """
+    Plotting is deferred, so we can plot only the datasets we want to inspect.
+    """
+    util.plot_datasets_from_catalog(
+        catalog=catalog,
+        output_path=path.join("dataset", "example_1d_batch", "images"),
+        names=catalog.names[:5],
+    )
+
+"""
+Finish.
+"""
@@ -1,6 +1,13 @@
 import autofit as af
 import profiles
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import hashlib
+import inspect
+import io
+import json
+import os
 from os import path
 import numpy as np
 import matplotlib.pyplot as plt
@@ -259,3 +266,751 @@ def simulate_line_with_kernel_from_profiles(profiles, dataset_path):
     plt.ylabel("Profile intensity")
     plt.savefig(path.join(dataset_path, "image.png"))
     plt.close()
+
+
+"""
+__Binary Datasets__
+
+Loading a dataset from .json files requires every value to be parsed from text into a Python list before it is
+converted to a NumPy array, which is slow for large datasets. The functions below instead store every array of a
+dataset (the data, noise-map and optional kernel) and its metadata in one binary file.
+
+The file begins with a short header (a magic string, the header length and a .json header describing the dtype,
+shape and byte offset of every array), followed by the raw little-endian arrays aligned to 64 bytes. Arrays are
+loaded via `np.memmap`, meaning no data is read or copied until it is used.
+
+Many datasets can be packed into one file, one after another, in which case every function below is passed the
+`offset` in bytes of the dataset in the file.
+
+The same file format, with a different magic string, stores other results as binary (e.g. the samples of
+`features/columnar.py`), via `bytes_from_arrays` and `arrays_from_buffer`.
+"""
+
+binary_magic = b"AFDATA01"
+binary_alignment = 64
+
+
+def _aligned(offset):
+    return -(-offset // binary_alignment) * binary_alignment
+
+
+def _little_endian(array):
+    return np.ascontiguousarray(array, dtype=np.asarray(array).dtype.newbyteorder("<"))
+
+
+def numpy_arrays_to_binary(arrays, file_path, metadata=None, overwrite=False):
+    """
+    Write a dictionary of NumPy arrays, and optional metadata, to a single binary file.
+
+    Parameters
+    ----------
+    arrays : dict
+        The arrays that are written to the file, keyed by their name (e.g. `data`, `noise_map`).
+    file_path : str
+        The full path of the file that is output, including the file name and extension.
+    metadata : dict, optional
+        A dictionary of information about the arrays which can be serialized to .json.
+    overwrite : bool
+        If `True` and a file already exists with the input file_path it is overwritten. If `False`, an error will be
+        raised.
+    """
+    if path.exists(file_path) and not overwrite:
+        raise FileExistsError(
+            f"The file {file_path} already exists. Set overwrite=True to overwrite this file."
+        )
+
+    file_dir = path.split(file_path)[0]
+
+    if file_dir and not path.exists(file_dir):
+        os.makedirs(file_dir)
+
+    with open(file_path, "wb") as f:
+        size = _write_binary(f=f, arrays=arrays, metadata=metadata)
+        f.truncate(size)
+
+
+def _write_binary(f, arrays, metadata=None, magic=binary_magic):
+    """
+    Write arrays and metadata to an open binary file, starting at its current position (which must be aligned to
+    `binary_alignment` bytes), and return the number of bytes the arrays take up in the file.
+    """
+    start = f.tell()
+
+    arrays = {name: _little_endian(array) for name, array in arrays.items()}
+
+    """
+    The offset of every array depends on the length of the header, which itself contains the offsets. We therefore
+    reserve space for the header assuming every offset is written with the maximum number of digits.
+    """
+    header = {
+        "arrays": {
+            name: {"dtype": array.dtype.str, "shape": array.shape, "offset": 10 ** 18}
+            for name, array in arrays.items()
+        },
+        "metadata": metadata or {},
+    }
+
+    offset = _aligned(len(magic) + 8 + len(json.dumps(header).encode()))
+
+    for name, array in arrays.items():
+        header["arrays"][name]["offset"] = offset
+        offset = _aligned(offset + array.nbytes)
+
+    header_bytes = json.dumps(header).encode()
+
+    f.write(magic)
+    f.write(len(header_bytes).to_bytes(8, "little"))
+    f.write(header_bytes)
+
+    for name, array in arrays.items():
+        f.seek(start + header["arrays"][name]["offset"])
+        f.write(array.tobytes())
+
+    f.seek(start + offset)
+
+    return offset
+
+
+def bytes_from_arrays(arrays, metadata=None, magic=binary_magic):
+    """
+    Returns the bytes of a binary file containing a dictionary of NumPy arrays and metadata (see
+    `numpy_arrays_to_binary`), for storing them other than as a file (e.g. in a database).
+
+    Parameters
+    ----------
+    arrays : dict
+        The arrays that are written, keyed by their name.
+    metadata : dict, optional
+        A dictionary of information about the arrays which can be serialized to .json.
+    magic : bytes
+        The 8 byte magic string the file begins with, which identifies what it contains.
+    """
+    with io.BytesIO() as f:
+        size = _write_binary(f=f, arrays=arrays, metadata=metadata, magic=magic)
+        return f.getvalue().ljust(size, b"\0")
+
+
+def arrays_from_buffer(buffer, magic=binary_magic):
+    """
+    Returns the arrays and metadata of a binary file from its bytes (or a memory-map of it), where every array is a
+    read-only view of the buffer rather than a copy.
+
+    Parameters
+    ----------
+    buffer : bytes or np.ndarray
+        The bytes of the file, or a memory-map of it starting at the beginning of the arrays.
+    magic : bytes
+        The 8 byte magic string the file must begin with.
+    """
+    if not isinstance(buffer, np.ndarray):
+        buffer = np.frombuffer(buffer, dtype="uint8")
+
+    if buffer[: len(magic)].tobytes() != magic:
+        raise IOError(f"The buffer does not begin with the magic string {magic}.")
+
+    header_length = int.from_bytes(
+        buffer[len(magic) : len(magic) + 8].tobytes(), "little"
+    )
+
+    header = json.loads(
+        buffer[len(magic) + 8 : len(magic) + 8 + header_length].tobytes().decode()
+    )
+
+    arrays = {}
+
+    for name, array_header in header["arrays"].items():
+
+        dtype = np.dtype(array_header["dtype"])
+        shape = tuple(array_header["shape"])
+        offset = array_header["offset"]
+
+        nbytes = dtype.itemsize * int(np.prod(shape))
+
+        arrays[name] = buffer[offset : offset + nbytes].view(dtype).reshape(shape)
+
+    return arrays, header["metadata"]
+
+
+def header_from_binary(file_path, offset=0):
+    """
+    Read the header of a binary file written by `numpy_arrays_to_binary`, which describes the dtype, shape and
+    offset of every array in the file and contains its metadata.
+
+    Parameters
+    ----------
+    file_path : str
+        The full path of the binary file.
+    offset : int
+        The offset in bytes of the dataset in the file.
+    """
+    with open(file_path, "rb") as f:
+
+        f.seek(offset)
+
+        if f.read(len(binary_magic)) != binary_magic:
+            raise IOError(f"The file {file_path} is not a binary dataset file.")
+
+        header_length = int.from_bytes(f.read(8), "little")
+
+        return json.loads(f.read(header_length))
+
+
+def numpy_array_from_binary(file_path, name="data", offset=0):
+    """
+    Load a NumPy array from a binary file written by `numpy_arrays_to_binary`.
+
+    The array is memory-mapped, meaning the load is instantaneous and values are only read from hard-disk when they
+    are used. The array is read-only, so it must be copied (e.g. `np.array(array)`) before it is modified.
+
+    Parameters
+    ----------
+    file_path : str
+        The full path of the binary file.
+    name : str
+        The name of the array in the file that is loaded (e.g. `data`, `noise_map`, `kernel`).
+    offset : int
+        The offset in bytes of the dataset in the file.
+    """
+    header = header_from_binary(file_path=file_path, offset=offset)
+
+    try:
+        array_header = header["arrays"][name]
+    except KeyError:
+        raise KeyError(f"The file {file_path} does not contain an array named {name}.")
+
+    return np.memmap(
+        file_path,
+        dtype=np.dtype(array_header["dtype"]),
+        mode="r",
+        offset=offset + array_header["offset"],
+        shape=tuple(array_header["shape"]),
+    )
+
+
+def dataset_to_binary(
+    file_path, data, noise_map, kernel=None, metadata=None, overwrite=False
+):
+    """
+    Write a dataset (its data, noise-map and optional kernel) and its metadata to a single binary file.
+
+    Parameters
+    ----------
+    file_path : str
+        The full path of the file that is output, including the file name and extension.
+    data : np.ndarray
+        The data of the dataset.
+    noise_map : np.ndarray
+        The noise-map of the dataset.
+    kernel : np.ndarray, optional
+        The kernel the dataset is blurred by.
+    metadata : dict, optional
+        A dictionary of information about the dataset which can be serialized to .json.
+    overwrite : bool
+        If `True` and a file already exists with the input file_path it is overwritten.
+    """
+    numpy_arrays_to_binary(
+        arrays=_dataset_arrays(data=data, noise_map=noise_map, kernel=kernel),
+        file_path=file_path,
+        metadata=metadata,
+        overwrite=overwrite,
+    )
+
+
+def _dataset_arrays(data, noise_map, kernel=None):
+
+    arrays = {"data": data, "noise_map": noise_map}
+
+    if kernel is not None:
+        arrays["kernel"] = kernel
+
+    return arrays
+
+
+def dataset_from_binary(file_path, offset=0):
+    """
+    Load every array of a dataset from a binary file, returning a dictionary of the memory-mapped arrays (e.g.
+    `data`, `noise_map` and `kernel`) and the dataset metadata.
+
+    Parameters
+    ----------
+    file_path : str
+        The full path of the binary file.
+    offset : int
+        The offset in bytes of the dataset in the file.
+    """
+    return arrays_from_buffer(
+        buffer=np.memmap(file_path, dtype="uint8", mode="r", offset=offset)
+    )
+
+
+def dataset_arrays_from_json(dataset_path):
+    """
+    Load the arrays of a dataset stored as .json files (`data.json`, `noise_map.json` and optionally `kernel.json`).
+
+    Parameters
+    ----------
+    dataset_path : str
+        The path of the folder containing the dataset's .json files.
+    """
+    data = af.util.numpy_array_from_json(file_path=path.join(dataset_path, "data.json"))
+    noise_map = af.util.numpy_array_from_json(
+        file_path=path.join(dataset_path, "noise_map.json")
+    )
+
+    kernel_file_path = path.join(dataset_path, "kernel.json")
+
+    kernel = (
+        af.util.numpy_array_from_json(file_path=kernel_file_path)
+        if path.exists(kernel_file_path)
+        else None
+    )
+
+    return _dataset_arrays(data=data, noise_map=noise_map, kernel=kernel)
+
+
+def dataset_binary_from_json(dataset_path, file_name="dataset.bin", overwrite=False):
+    """
+    Convert a dataset stored as .json files (`data.json`, `noise_map.json` and optionally `kernel.json`) to a single
+    binary file in the same folder.
+
+    Parameters
+    ----------
+    dataset_path : str
+        The path of the folder containing the dataset's .json files.
+    file_name : str
+        The name of the binary file that is output.
+    overwrite : bool
+        If `True` and the binary file already exists it is overwritten.
+    """
+    numpy_arrays_to_binary(
+        arrays=dataset_arrays_from_json(dataset_path=dataset_path),
+        file_path=path.join(dataset_path, file_name),
+        metadata={"name": path.basename(path.normpath(dataset_path))},
+        overwrite=overwrite,
+    )
+
+
+"""
+__Dataset Catalogs__
+
+Fitting many thousands of datasets stored in separate folders requires a directory scan and multiple file opens per
+dataset. Instead, the datasets can be packed one after another into a single binary file, with a .json catalog
+mapping every dataset name to its offset in the file alongside metadata (its size, maximum signal-to-noise and a
+checksum of its arrays).
+
+The catalog can be filtered on this metadata before any dataset is loaded, and loading a dataset only memory-maps
+its arrays at their offset in the packed file.
+"""
+
+
+def _checksum_from(arrays):
+    """
+    The checksum of the bytes of the arrays as they are stored in a binary file (little-endian), so that the checksum
+    of arrays input in any byte order matches that of the arrays loaded from the file.
+    """
+    checksum = hashlib.sha256()
+
+    for name, array in sorted(arrays.items()):
+        checksum.update(name.encode())
+        checksum.update(_little_endian(array).tobytes())
+
+    return checksum.hexdigest()
+
+
+class DatasetCatalog:
+    def __init__(self, file_path, entries):
+        """
+        An index of the datasets packed into a single binary file by `pack_datasets`.
+
+        Parameters
+        ----------
+        file_path : str
+            The full path of the packed binary file the datasets are stored in.
+        entries : dict
+            A dictionary mapping the name of every dataset to its entry, which contains the `offset` of the dataset in
+            the packed file and its metadata.
+        """
+        self.file_path = file_path
+        self.entries = entries
+
+    @classmethod
+    def from_json(cls, file_path):
+        """
+        Load a catalog from the .json file output by `pack_datasets`.
+
+        Parameters
+        ----------
+        file_path : str
+            The full path of the catalog .json file.
+        """
+        with open(file_path, "r") as f:
+            catalog_dict = json.load(f)
+
+        return DatasetCatalog(
+            file_path=path.join(path.split(file_path)[0], catalog_dict["file_name"]),
+            entries=catalog_dict["entries"],
+        )
+
+    @property
+    def names(self):
+        return list(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def filter(self, func):
+        """
+        Returns a catalog containing only the datasets whose entry satisfies a condition, without loading any dataset.
+
+        For example, `catalog.filter(lambda entry: entry["max_signal_to_noise"] > 10.0)`.
+
+        Parameters
+        ----------
+        func : function
+            A function which takes the entry of a dataset and returns `True` if the dataset is kept.
+        """
+        return DatasetCatalog(
+            file_path=self.file_path,
+            entries={name: entry for name, entry in self.entries.items() if func(entry)},
+        )
+
+    def dataset(self, name, verify=False):
+        """
+        Load the arrays of a dataset (e.g. `data`, `noise_map`) via memory-mapping and its metadata.
+
+        Parameters
+        ----------
+        name : str
+            The name of the dataset that is loaded.
+        verify : bool
+            If `True`, the checksum of the arrays is recomputed and compared to the catalog, which requires every
+            array to be read from hard-disk.
+        """
+        entry = self.entries[name]
+
+        arrays, metadata = dataset_from_binary(
+            file_path=self.file_path, offset=entry["offset"]
+        )
+
+        if verify and _checksum_from(arrays=arrays) != entry["checksum"]:
+            raise IOError(
+                f"The checksum of dataset {name} does not match the catalog, the packed file may be corrupted."
+            )
+
+        return arrays, metadata
+
+    def datasets(self):
+        """
+        Iterate over the name, arrays and metadata of every dataset in the catalog, in the order they are stored.
+        """
+        for name in sorted(self.entries, key=lambda name: self.entries[name]["offset"]):
+            yield (name, *self.dataset(name=name))
+
+
+def pack_datasets(datasets, file_path, catalog_file_path=None, overwrite=False):
+    """
+    Pack many datasets into a single binary file and write a .json catalog indexing them.
+
+    Parameters
+    ----------
+    datasets : iterable
+        An iterable of (name, arrays, metadata) tuples, where `arrays` is a dictionary containing the `data`,
+        `noise_map` and optionally `kernel` of the dataset and `metadata` is a dictionary which can be serialized to
+        .json. This can be a generator, so that datasets are never all held in memory at once.
+    file_path : str
+        The full path of the packed binary file that is output.
+    catalog_file_path : str, optional
+        The full path of the catalog .json file. If not input, it is the `file_path` with a `.json` extension.
+    overwrite : bool
+        If `True` and the files already exist they are overwritten.
+
+    Returns
+    -------
+    DatasetCatalog
+        The catalog of the packed datasets.
+    """
+    if catalog_file_path is None:
+        catalog_file_path = f"{path.splitext(file_path)[0]}.json"
+
+    for output_path in (file_path, catalog_file_path):
+        if path.exists(output_path) and not overwrite:
+            raise FileExistsError(
+                f"The file {output_path} already exists. Set overwrite=True to overwrite this file."
+            )
+
+    file_dir = path.split(file_path)[0]
+
+    if file_dir and not path.exists(file_dir):
+        os.makedirs(file_dir)
+
+    entries = {}
+
+    with open(file_path, "wb") as f:
+
+        for name, arrays, metadata in datasets:
+
+            if name in entries:
+                raise KeyError(f"The dataset name {name} is packed more than once.")
+
+            offset = f.tell()
+
+            _write_binary(f=f, arrays=arrays, metadata=metadata)
+
+            entries[name] = {
+                **(metadata or {}),
+                "offset": offset,
+                "pixels": int(np.shape(arrays["data"])[0]),
+                "max_signal_to_noise": float(
+                    np.max(np.divide(arrays["data"], arrays["noise_map"]))
+                ),
+                "checksum": _checksum_from(arrays=arrays),
+            }
+
+        f.truncate(f.tell())
+
+    with open(catalog_file_path, "w") as f:
+        json.dump(
+            {"file_name": path.basename(file_path), "entries": entries}, f, indent=1
+        )
+
+    return DatasetCatalog(file_path=file_path, entries=entries)
+
+
+def pack_datasets_from_json(dataset_paths, file_path, overwrite=False):
+    """
+    Pack datasets stored as .json files in separate folders into a single binary file and .json catalog, where every
+    dataset is named after its folder.
+
+    Parameters
+    ----------
+    dataset_paths : [str]
+        The paths of the folders containing each dataset's .json files.
+    file_path : str
+        The full path of the packed binary file that is output.
+    overwrite : bool
+        If `True` and the files already exist they are overwritten.
+    """
+    return pack_datasets(
+        datasets=(
+            (
+                path.basename(path.normpath(dataset_path)),
+                dataset_arrays_from_json(dataset_path=dataset_path),
+                None,
+            )
+            for dataset_path in dataset_paths
+        ),
+        file_path=file_path,
+        overwrite=overwrite,
+    )
+
+
+"""
+__Batch Simulation__
+
+The `simulate_line_*` functions above simulate one dataset at a time, write it to .json files and plot it, which is
+slow when simulating many thousands of datasets (e.g. for sensitivity studies). The functions below instead:
+
+ - Evaluate the profiles of many datasets at once, using the vectorized `profiles_from_xvalues` methods.
+ - Draw the noise of every dataset from its own random number generator, spawned from a single seed, so that results
+   are reproducible regardless of how the datasets are split over processes.
+ - Simulate chunks of datasets in parallel over a pool of processes.
+ - Pack all datasets into one binary file with a catalog (see `pack_datasets`), and do not plot anything. Datasets can
+   be plotted afterwards using `plot_datasets_from_catalog`.
+"""
+
+
+def model_lines_from(profiles_list, xvalues):
+    """
+    Compute the model line of many datasets, where the profiles of every class (e.g. every `Gaussian` of every
+    dataset) are evaluated in one vectorized call and added to the model line of their dataset.
+
+    Parameters
+    ----------
+    profiles_list : [[profiles.Profile]]
+        The profiles of every dataset, where every entry is the list of profiles summed to make one model line.
+    xvalues : np.ndarray
+        The x coordinates the profiles are evaluated on.
+    """
+    model_lines = np.zeros(shape=(len(profiles_list), xvalues.shape[0]))
+
+    profiles_of_class = {}
+
+    for index, profiles_of_dataset in enumerate(profiles_list):
+        for profile in profiles_of_dataset:
+            profiles_of_class.setdefault(type(profile), []).append((index, profile))
+
+    for cls, index_profile_tuples in profiles_of_class.items():
+
+        arguments = {
+            argument: np.array(
+                [getattr(profile, argument) for _, profile in index_profile_tuples]
+            )
+            for argument in inspect.getfullargspec(cls.__init__).args[1:]
+        }
+
+        indexes = [index for index, _ in index_profile_tuples]
+
+        np.add.at(
+            model_lines,
+            indexes,
+            cls.profiles_from_xvalues(xvalues=xvalues, **arguments),
+        )
+
+    return model_lines
+
+
+def _simulate_lines(profiles_list, seed_sequences, pixels, signal_to_noise_ratio):
+    """
+    Simulate the data and noise-map of a chunk of datasets, where the noise of every dataset is drawn using its own
+    `np.random.SeedSequence`.
+    """
+    xvalues = np.arange(pixels)
+
+    data = model_lines_from(profiles_list=profiles_list, xvalues=xvalues)
+
+    for line, seed_sequence in zip(data, seed_sequences):
+        line += np.random.default_rng(seed_sequence).normal(
+            0.0, 1.0 / signal_to_noise_ratio, pixels
+        )
+
+    noise_map = (1.0 / signal_to_noise_ratio) * np.ones(pixels)
+
+    return data, noise_map
+
+
+def simulate_lines_from_profiles(
+    profiles_list,
+    file_path,
+    pixels=100,
+    signal_to_noise_ratio=25.0,
+    seed=1,
+    number_of_cores=1,
+    chunk_size=1000,
+    overwrite=False,
+):
+    """
+    Simulate many datasets, each the sum of a list of profiles plus noise, and pack them into a single binary file
+    with a catalog.
+
+    Every dataset is named by its index in `profiles_list` and the parameters of its profiles are stored in the
+    catalog, so that the true model of every dataset is known.
+
+    Parameters
+    ----------
+    profiles_list : [[profiles.Profile]]
+        The profiles of every dataset, where every entry is the list of profiles summed to make one dataset.
+    file_path : str
+        The full path of the packed binary file that is output, which has a .json catalog output next to it.
+    pixels : int
+        The number of pixels in every dataset.
+    signal_to_noise_ratio : float
+        The signal to noise level of the noise added to every dataset.
+    seed : int
+        The seed from which the random number generator of every dataset is spawned.
+    number_of_cores : int
+        The number of processes the datasets are simulated using.
+    chunk_size : int
+        The number of datasets simulated in every vectorized call, and sent to each process at once.
+    overwrite : bool
+        If `True` and the files already exist they are overwritten.
+
+    Returns
+    -------
+    DatasetCatalog
+        The catalog of the simulated datasets.
+    """
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(profiles_list))
+
+    chunks = [
+        (
+            profiles_list[index : index + chunk_size],
+            seed_sequences[index : index + chunk_size],
+        )
+        for index in range(0, len(profiles_list), chunk_size)
+    ]
+
+    def datasets_from(results):
+        """
+        Yield every simulated dataset in order, so they are written to the packed file as each chunk completes.
+        """
+        index = 0
+
+        for (profiles_of_chunk, _), (data, noise_map) in zip(chunks, results):
+            for profiles_of_dataset, line in zip(profiles_of_chunk, data):
+
+                metadata = {
+                    "profiles": [
+                        {
+                            "class": type(profile).__name__,
+                            **{
+                                name: float(value)
+                                for name, value in vars(profile).items()
+                            },
+                        }
+                        for profile in profiles_of_dataset
+                    ]
+                }
+
+                yield str(index), {"data": line, "noise_map": noise_map}, metadata
+
+                index += 1
+
+    simulate_lines = partial(
+        _simulate_lines, pixels=pixels, signal_to_noise_ratio=signal_to_noise_ratio
+    )
+
+    if number_of_cores == 1:
+
+        results = (simulate_lines(*chunk) for chunk in chunks)
+
+        return pack_datasets(
+            datasets=datasets_from(results=results),
+            file_path=file_path,
+            overwrite=overwrite,
+        )
+
+    with ProcessPoolExecutor(max_workers=number_of_cores) as executor:
+
+        results = executor.map(simulate_lines, *zip(*chunks))
+
+        return pack_datasets(
+            datasets=datasets_from(results=results),
+            file_path=file_path,
+            overwrite=overwrite,
+        )
+
+
+def plot_datasets_from_catalog(catalog, output_path, names=None):
+    """
+    Plot datasets in a catalog, outputting an image of every dataset to `output_path` named after the dataset.
+
+    Parameters
+    ----------
+    catalog : DatasetCatalog
+        The catalog of the datasets that are plotted.
+    output_path : str
+        The path of the folder the images are output to.
+    names : [str], optional
+        The names of the datasets that are plotted. If not input, every dataset in the catalog is plotted.
+    """
+    if not path.exists(output_path):
+        os.makedirs(output_path)
+
+    for name in names or catalog.names:
+
+        arrays, _ = catalog.dataset(name=name)
+
+        plt.errorbar(
+            x=np.arange(arrays["data"].shape[0]),
+            y=arrays["data"],
+            yerr=arrays["noise_map"],
+            color="k",
+            ecolor="k",
+            elinewidth=1,
+            capsize=2,
+        )
+        plt.title(f"1D Profiles Dataset {name}.")
+        plt.xlabel("x values of profile")
+        plt.ylabel("Profile intensity")
+        plt.savefig(path.join(output_path, f"{name}.png"))
+        plt.close()
@@ -0,0 +1,128 @@
+import autofit as af
+from autofit.non_linear.samples import NestSamples, Sample
+import numpy as np
+from os import path
+import pickle
+import sys
+
+import pytest
+
+workspace_path = path.dirname(path.dirname(path.abspath(__file__)))
+
+"""
+The overview folder is put first on the path, so that its `model` module is imported rather than that of
+`scripts/features`.
+"""
+sys.path.insert(0, path.join(workspace_path, "scripts", "overview", "complex"))
+
+import model as m
+
+sys.path.append(path.join(workspace_path, "scripts", "features"))
+
+import columnar
+
+
+def nest_samples_from(weights):
+    model = af.Collection(gaussian=m.Gaussian)
+
+    total_samples = len(weights)
+
+    parameters = np.random.normal(loc=[50.0, 10.0, 5.0], size=(total_samples, 3))
+
+    return NestSamples(
+        model=model,
+        samples=Sample.from_lists(
+            model=model,
+            parameters=parameters.tolist(),
+            log_likelihoods=np.random.normal(size=total_samples).tolist(),
+            log_priors=[0.0] * total_samples,
+            weights=list(weights),
+        ),
+        number_live_points=50,
+        log_evidence=1.0,
+        total_samples=total_samples,
+        unconverged_sample_size=50,
+    )
+
+
+@pytest.fixture(name="nest_samples")
+def make_nest_samples():
+    weights = np.random.uniform(size=1000)
+
+    return nest_samples_from(weights=weights / np.sum(weights))
+
+
+@pytest.mark.parametrize("sigma", [1.0, 3.0])
+def test__from_samples__median_and_errors_match_samples(nest_samples, sigma):
+    samples = columnar.ColumnarSamples.from_samples(samples=nest_samples)
+
+    assert samples.pdf_converged
+    assert samples.median_pdf_vector == pytest.approx(nest_samples.median_pdf_vector)
+    assert np.array(samples.vector_at_sigma(sigma=sigma)) == pytest.approx(
+        np.array(nest_samples.vector_at_sigma(sigma=sigma))
+    )
+    assert np.array(samples.error_vector_at_sigma(sigma=sigma)) == pytest.approx(
+        np.array(nest_samples.error_vector_at_sigma(sigma=sigma))
+    )
+    assert samples.error_magnitude_vector_at_sigma(sigma=sigma) == pytest.approx(
+        nest_samples.error_magnitude_vector_at_sigma(sigma=sigma)
+    )
+    assert samples.max_log_likelihood_vector == pytest.approx(
+        nest_samples.max_log_likelihood_vector
+    )
+
+
+def test__from_samples__unconverged__median_and_errors_match_samples():
+    weights = np.full(1000, 1e-6)
+    weights[-1] = 1.0
+
+    nest_samples = nest_samples_from(weights=weights)
+
+    samples = columnar.ColumnarSamples.from_samples(samples=nest_samples)
+
+    assert not samples.pdf_converged
+    assert samples.median_pdf_vector == pytest.approx(nest_samples.median_pdf_vector)
+    assert np.array(samples.vector_at_sigma(sigma=1.0)) == pytest.approx(
+        np.array(nest_samples.vector_at_sigma(sigma=1.0))
+    )
+
+
+def test__quantiles__match_median_and_are_memoized(nest_samples):
+    samples = columnar.ColumnarSamples.from_samples(samples=nest_samples)
+
+    quantiles = samples.quantiles(q=[0.1, 0.5, 0.9])
+
+    assert quantiles.shape == (3, 3)
+    assert quantiles[1] == pytest.approx(samples.median_pdf_vector)
+    assert (quantiles[0] < quantiles[1]).all() and (quantiles[1] < quantiles[2]).all()
+
+    assert samples.quantiles(q=0.5)[0] == pytest.approx(quantiles[1])
+    assert set(samples._quantiles) == {0.1, 0.5, 0.9}
+
+    with pytest.raises(ValueError):
+        samples.quantiles(q=1.5)
+
+
+def test__save_and_load__arrays_info_and_results_match(tmp_path, nest_samples):
+    samples = columnar.ColumnarSamples.from_samples(samples=nest_samples)
+
+    file_path = str(tmp_path / "samples.bin")
+
+    samples.save(file_path=file_path)
+
+    with pytest.raises(FileExistsError):
+        samples.save(file_path=file_path)
+
+    for loaded_samples in (
+        columnar.ColumnarSamples.load(file_path=file_path),
+        pickle.loads(pickle.dumps(samples)),
+    ):
+
+        assert (loaded_samples.parameters == samples.parameters).all()
+        assert (loaded_samples.weights == samples.weights).all()
+        assert loaded_samples.info == samples.info
+        assert not loaded_samples.is_mcmc
+        assert loaded_samples.model.prior_count == 3
+        assert loaded_samples.median_pdf_vector == pytest.approx(
+            samples.median_pdf_vector
+        )
@@ -0,0 +1,201 @@
+import autofit as af
+from autofit import exc
+from multiprocessing.reduction import ForkingPickler
+import numpy as np
+from os import path
+import pickle
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+workspace_path = path.dirname(path.dirname(path.abspath(__file__)))
+
+"""
+The overview folder is put first on the path, so that its `model` module is imported rather than that of
+`scripts/features`.
+"""
+sys.path.insert(0, path.join(workspace_path, "scripts", "overview", "complex"))
+
+import model as m
+
+sys.path.append(path.join(workspace_path, "scripts", "features"))
+
+import mapping
+
+
+def model_from(shared_prior, fixed_parameter):
+    model = af.Collection(gaussian=m.Gaussian, exponential=m.Exponential)
+
+    if shared_prior:
+        model.exponential.centre = model.gaussian.centre
+
+    if fixed_parameter:
+        model.gaussian.sigma = 5.0
+
+    return model
+
+
+def vectors_from(model, total_vectors=5):
+    return [
+        model.vector_from_unit_vector(
+            unit_vector=list(np.random.uniform(0.1, 0.9, model.prior_count))
+        )
+        for _ in range(total_vectors)
+    ]
+
+
+def parameters_from(instance):
+    return [
+        instance.gaussian.centre,
+        instance.gaussian.intensity,
+        instance.gaussian.sigma,
+        instance.exponential.centre,
+        instance.exponential.intensity,
+        instance.exponential.rate,
+    ]
+
+
+@pytest.mark.parametrize("shared_prior", [False, True])
+@pytest.mark.parametrize("fixed_parameter", [False, True])
+@pytest.mark.parametrize("reuse_instances", [False, True])
+def test__mapping_plan__instance_from_vector__matches_model(
+    shared_prior, fixed_parameter, reuse_instances
+):
+    model = model_from(shared_prior=shared_prior, fixed_parameter=fixed_parameter)
+
+    mapping_plan = mapping.MappingPlan(model=model, reuse_instances=reuse_instances)
+
+    for vector in vectors_from(model=model):
+
+        instance = model.instance_from_vector(vector=vector)
+        instance_via_plan = mapping_plan.instance_from_vector(vector=vector)
+
+        assert isinstance(instance_via_plan.gaussian, m.Gaussian)
+        assert isinstance(instance_via_plan.exponential, m.Exponential)
+        assert parameters_from(instance=instance_via_plan) == pytest.approx(
+            parameters_from(instance=instance)
+        )
+
+    if fixed_parameter:
+        assert instance_via_plan.gaussian.sigma == 5.0
+
+    if shared_prior:
+        assert instance_via_plan.exponential.centre == instance_via_plan.gaussian.centre
+
+
+def test__mapping_plan__reuse_instances__returns_same_instance():
+    model = model_from(shared_prior=False, fixed_parameter=False)
+
+    mapping_plan = mapping.MappingPlan(model=model, reuse_instances=True)
+
+    vector_0, vector_1 = vectors_from(model=model, total_vectors=2)
+
+    instance_0 = mapping_plan.instance_from_vector(vector=vector_0)
+    instance_1 = mapping_plan.instance_from_vector(vector=vector_1)
+
+    assert instance_1 is instance_0
+    assert instance_1.gaussian.centre == vector_1[0]
+
+
+@pytest.mark.parametrize("ignore_prior_limits", [False, True])
+def test__mapping_plan__vector_outside_prior_limits__raises_unless_limits_ignored(
+    monkeypatch, ignore_prior_limits
+):
+    monkeypatch.setattr(
+        mapping,
+        "conf",
+        SimpleNamespace(
+            instance={
+                "general": {"model": {"ignore_prior_limits": ignore_prior_limits}}
+            }
+        ),
+    )
+
+    model = model_from(shared_prior=False, fixed_parameter=False)
+
+    vector = vectors_from(model=model, total_vectors=1)[0]
+    vector[0] = model.prior_tuples_ordered_by_id[0].prior.upper_limit + 1.0
+
+    mapping_plan = mapping.MappingPlan(model=model)
+
+    mapping_plan.instance_from_vector(vector=vector, assert_priors_in_limits=False)
+
+    if ignore_prior_limits:
+        mapping_plan.instance_from_vector(vector=vector)
+    else:
+        with pytest.raises(exc.PriorLimitException):
+            mapping_plan.instance_from_vector(vector=vector)
+
+
+@pytest.mark.parametrize("shared_prior", [False, True])
+@pytest.mark.parametrize("fixed_parameter", [False, True])
+def test__prior_transform__vectors_from_unit_vectors__match_vector_from_unit_vector(
+    shared_prior, fixed_parameter
+):
+    model = model_from(shared_prior=shared_prior, fixed_parameter=fixed_parameter)
+
+    model.gaussian.intensity = af.LogUniformPrior(lower_limit=1e-2, upper_limit=1e2)
+    model.exponential.rate = af.GaussianPrior(mean=1.0, sigma=2.0)
+
+    unit_vectors = np.random.uniform(0.01, 0.99, size=(10, model.prior_count))
+
+    vectors = mapping.PriorTransform(model=model).vectors_from_unit_vectors(
+        unit_vectors=unit_vectors
+    )
+
+    assert vectors.shape == unit_vectors.shape
+    assert vectors == pytest.approx(
+        np.array(
+            [
+                model.vector_from_unit_vector(unit_vector=list(unit_vector))
+                for unit_vector in unit_vectors
+            ]
+        )
+    )
+    assert mapping.PriorTransform(model=model).vectors_from_unit_vectors(
+        unit_vectors=unit_vectors[0]
+    ) == pytest.approx(vectors[0])
+
+
+def test__prior_transform__truncate_gaussians__values_within_limits():
+    model = af.Collection(gaussian=m.Gaussian)
+    model.gaussian.sigma = af.GaussianPrior(
+        mean=1.0, sigma=2.0, lower_limit=0.0, upper_limit=np.inf
+    )
+
+    unit_vectors = np.random.uniform(size=(1000, 3))
+
+    vectors = mapping.vectors_from_unit_vectors(model=model, unit_vectors=unit_vectors)
+    vectors_untruncated = mapping.vectors_from_unit_vectors(
+        model=model, unit_vectors=unit_vectors, truncate_gaussians=False
+    )
+
+    assert np.min(vectors[:, 2]) >= 0.0
+    assert np.min(vectors_untruncated[:, 2]) < 0.0
+
+
+def test__mapped_model__pickles_as_model_and_recompiles_via_forking_pickler():
+    model = model_from(shared_prior=True, fixed_parameter=False)
+
+    mapped_model = mapping.MappedModel(model=model, reuse_instances=True)
+
+    assert mapped_model.prior_count == model.prior_count
+
+    unpickled_model = pickle.loads(pickle.dumps(mapped_model))
+
+    assert not isinstance(unpickled_model, mapping.MappedModel)
+    assert unpickled_model.prior_count == model.prior_count
+
+    unpickled_mapped_model = pickle.loads(ForkingPickler.dumps(mapped_model))
+
+    assert isinstance(unpickled_mapped_model, mapping.MappedModel)
+    assert unpickled_mapped_model.reuse_instances
+
+    vector = vectors_from(model=model, total_vectors=1)[0]
+
+    instance = unpickled_mapped_model.instance_from_vector(vector=vector)
+
+    assert parameters_from(instance=instance) == pytest.approx(
+        parameters_from(instance=model.instance_from_vector(vector=vector))
+    )
@@ -0,0 +1,37 @@
+from os import path
+import sys
+
+import pytest
+
+workspace_path = path.dirname(path.dirname(path.abspath(__file__)))
+
+sys.path.append(path.join(workspace_path, "scripts", "features"))
+
+import performance
+
+
+@pytest.fixture(name="no_memory_modules")
+def make_no_memory_modules(monkeypatch):
+    """
+    Imports of `resource` and `psutil` raise an `ImportError`, as they do on Windows without **psutil**.
+    """
+    monkeypatch.setitem(sys.modules, "resource", None)
+    monkeypatch.setitem(sys.modules, "psutil", None)
+
+
+def test__peak_memory_kb():
+    assert performance.peak_memory_kb() > 0.0
+
+
+def test__peak_memory_kb__no_memory_modules__is_none(no_memory_modules):
+    assert performance.peak_memory_kb() is None
+
+
+def test__phase_timer__no_memory_modules__records_calls_without_memory(
+    no_memory_modules,
+):
+    phase_timer = performance.PhaseTimer()
+
+    assert phase_timer.time(lambda value: 2 * value, 3) == 6
+    assert phase_timer.dict["calls"] == 1
+    assert phase_timer.dict["memory_increase_kb"] is None
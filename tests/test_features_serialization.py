@@ -0,0 +1,117 @@
+import autofit as af
+from autofit.non_linear.samples import MCMCSamples, Sample
+import numpy as np
+from os import path
+import sys
+
+import pytest
+
+workspace_path = path.dirname(path.dirname(path.abspath(__file__)))
+
+"""
+The overview folder is put first on the path, so that its `model` and `analysis` modules are imported rather than
+those of `scripts/features`.
+"""
+sys.path.insert(0, path.join(workspace_path, "scripts", "overview", "complex"))
+
+import model as m
+
+sys.path.append(path.join(workspace_path, "scripts", "features"))
+
+import columnar
+import serialization
+
+
+class MockMCMCSamples(MCMCSamples):
+    def __init__(self, burn_in, **kwargs):
+        """
+        The samples of an MCMC search whose burn-in period is the first `burn_in` samples, rather than being estimated
+        from the auto-correlation times of an `Emcee` run.
+        """
+        super().__init__(
+            auto_correlations=None, total_walkers=10, total_steps=100, **kwargs
+        )
+
+        self.burn_in = burn_in
+
+    @property
+    def samples_after_burn_in(self):
+        return np.asarray(self.parameters)[self.burn_in :]
+
+
+@pytest.fixture(name="mcmc_samples")
+def make_mcmc_samples():
+    model = af.Collection(gaussian=m.Gaussian)
+
+    """
+    The samples during burn-in are far from the samples after it and have the highest likelihoods, so the median PDF
+    values and errors are only correct if they are computed from the samples after burn-in.
+    """
+    parameters = np.concatenate(
+        (
+            np.random.uniform(1.0, 2.0, size=(200, 3)),
+            np.random.normal(loc=10.0, scale=0.5, size=(800, 3)),
+        )
+    )
+    log_likelihoods = np.concatenate((np.full(200, 10.0), np.zeros(800)))
+
+    return MockMCMCSamples(
+        burn_in=200,
+        model=model,
+        samples=Sample.from_lists(
+            model=model,
+            parameters=parameters.tolist(),
+            log_likelihoods=log_likelihoods.tolist(),
+            log_priors=[0.0] * 1000,
+            weights=[1.0] * 1000,
+        ),
+    )
+
+
+def test__encode_and_decode_mcmc_samples__median_pdf_and_errors_match_samples(
+    mcmc_samples,
+):
+    samples = serialization.decode(serialization.encode(mcmc_samples))
+
+    assert samples.is_mcmc
+    assert samples.pdf_converged
+    assert samples.median_pdf_vector == pytest.approx(mcmc_samples.median_pdf_vector)
+    assert np.array(samples.vector_at_sigma(sigma=1.0)) == pytest.approx(
+        np.array(mcmc_samples.vector_at_sigma(sigma=1.0))
+    )
+    assert np.array(samples.error_vector_at_sigma(sigma=3.0)) == pytest.approx(
+        np.array(mcmc_samples.error_vector_at_sigma(sigma=3.0))
+    )
+
+
+def test__columnar_samples_from_mcmc_samples__median_pdf_and_errors_match_samples(
+    mcmc_samples,
+):
+    samples = columnar.ColumnarSamples.from_samples(samples=mcmc_samples)
+
+    assert samples.is_mcmc
+    assert samples.median_pdf_vector == pytest.approx(mcmc_samples.median_pdf_vector)
+    assert np.array(samples.vector_at_sigma(sigma=1.0)) == pytest.approx(
+        np.array(mcmc_samples.vector_at_sigma(sigma=1.0))
+    )
+
+
+def test__encode_and_decode_columnar_samples__matches_columnar_samples(mcmc_samples):
+    columnar_samples = columnar.ColumnarSamples.from_samples(samples=mcmc_samples)
+
+    samples = serialization.decode(serialization.encode(columnar_samples))
+
+    assert samples.parameters == pytest.approx(columnar_samples.parameters)
+    assert samples.samples_after_burn_in == pytest.approx(
+        columnar_samples.samples_after_burn_in
+    )
+    assert samples.median_pdf_vector == pytest.approx(
+        columnar_samples.median_pdf_vector
+    )
+    assert samples.model.prior_count == 3
+
+
+def test__encode_and_decode_array__is_equal_to_array():
+    array = np.random.normal(size=(10, 3))
+
+    assert (serialization.decode(serialization.encode(array)) == array).all()
@@ -0,0 +1,200 @@
+import autofit as af
+import copy
+import gc
+from multiprocessing.reduction import ForkingPickler
+import numpy as np
+from os import path
+import pickle
+import sys
+
+import pytest
+
+workspace_path = path.dirname(path.dirname(path.abspath(__file__)))
+
+"""
+The overview folder is put first on the path, so that its `model` and `analysis` modules are imported rather than
+those of `scripts/features`.
+"""
+sys.path.insert(0, path.join(workspace_path, "scripts", "overview", "complex"))
+
+import analysis as a
+import model as m
+
+sys.path.append(path.join(workspace_path, "scripts", "features"))
+
+import parallel
+
+
+@pytest.fixture(name="analysis")
+def make_analysis():
+
+    xvalues = np.arange(100)
+
+    data = m.Gaussian(centre=50.0, intensity=20.0, sigma=5.0).profile_from_xvalues(
+        xvalues=xvalues
+    ) + m.Exponential(centre=50.0, intensity=10.0, rate=0.1).profile_from_xvalues(
+        xvalues=xvalues
+    )
+
+    return a.Analysis(data=data, noise_map=np.full(100, 0.5))
+
+
+def log_likelihoods_via_instances_from(analysis, model, parameter_matrix):
+    return np.array(
+        [
+            analysis.log_likelihood_function(
+                instance=model.instance_from_vector(vector=list(vector))
+            )
+            for vector in parameter_matrix
+        ]
+    )
+
+
+def parameter_matrix_from(model, total_models=5):
+    return np.array(
+        [
+            model.vector_from_unit_vector(
+                unit_vector=np.random.uniform(0.1, 0.9, model.prior_count)
+            )
+            for _ in range(total_models)
+        ]
+    )
+
+
+@pytest.mark.parametrize("shared_prior", [False, True])
+@pytest.mark.parametrize("fixed_parameter", [False, True])
+def test__log_likelihood_function_vectorized__matches_log_likelihood_function(
+    analysis, shared_prior, fixed_parameter
+):
+    model = af.Collection(gaussian=m.Gaussian, exponential=m.Exponential)
+
+    if shared_prior:
+        model.exponential.centre = model.gaussian.centre
+
+    if fixed_parameter:
+        model.gaussian.sigma = 5.0
+
+    parameter_matrix = parameter_matrix_from(model=model)
+
+    analysis.model = model
+
+    assert parameter_matrix.shape[1] == model.prior_count
+    assert analysis.log_likelihood_function_vectorized(
+        parameter_matrix=parameter_matrix
+    ) == pytest.approx(
+        log_likelihoods_via_instances_from(
+            analysis=analysis, model=model, parameter_matrix=parameter_matrix
+        )
+    )
+
+
+def test__log_likelihood_function_vectorized__no_model__raises_value_error(analysis):
+    with pytest.raises(ValueError):
+        analysis.log_likelihood_function_vectorized(parameter_matrix=np.ones((5, 6)))
+
+
+def test__pickled_shared_analysis__only_contains_names_of_shared_arrays():
+    data = np.random.normal(size=100000)
+
+    analysis = a.Analysis(
+        data=data, noise_map=np.ones(100000), visualize_in_background=True
+    )
+
+    shared_analysis = parallel.share_arrays(analysis=copy.copy(analysis))
+
+    analysis_bytes = ForkingPickler.dumps(shared_analysis)
+
+    assert len(analysis_bytes) < data.nbytes / 100
+    assert not parallel.is_shared_array(analysis.data)
+
+    unpickled_analysis = pickle.loads(analysis_bytes)
+
+    assert unpickled_analysis.data == pytest.approx(data)
+    assert (
+        unpickled_analysis.background_visualizer.plot_function.__self__
+        is unpickled_analysis
+    )
+
+
+def test__worker_pool__digest_from__pickles_analysis_once(analysis, monkeypatch):
+    with parallel.WorkerPool(number_of_cores=1) as pool:
+
+        digest = pool._digest_from(analysis=analysis)
+        key_digest = pool._digest_from(analysis=analysis, key="dataset_0")
+
+        def dumps(*args, **kwargs):
+            raise AssertionError("The Analysis was pickled again.")
+
+        """
+        The pool itself pickles with the `ForkingPickler` when it is closed, so it is only patched inside the block.
+        """
+        with monkeypatch.context() as patch:
+
+            patch.setattr(parallel.ForkingPickler, "dumps", dumps)
+
+            assert pool._digest_from(analysis=analysis) == digest
+            assert (
+                pool._digest_from(analysis=copy.copy(analysis), key="dataset_0")
+                == key_digest
+            )
+
+            with pytest.raises(AssertionError):
+                pool._digest_from(analysis=copy.copy(analysis))
+
+
+def test__pickle_shared_array__pickles_values_which_load_after_file_is_removed():
+    array = np.random.normal(size=1000)
+
+    shared_array = parallel.shared_array_from(array=array)
+
+    array_bytes = pickle.dumps(shared_array)
+
+    assert len(array_bytes) > array.nbytes
+
+    filename = shared_array.base.filename
+
+    del shared_array
+    gc.collect()
+
+    assert not path.exists(filename)
+
+    assert pickle.loads(array_bytes) == pytest.approx(array)
+
+
+@pytest.mark.parametrize("use_fft", [False, True, None])
+@pytest.mark.parametrize("kernel_pixels", [1, 4, 21, 100])
+def test__convolver__matches_np_convolve(use_fft, kernel_pixels):
+    model_data = np.random.normal(size=100)
+    kernel = np.random.uniform(size=kernel_pixels)
+
+    convolver = a.Convolver(kernel=kernel, pixels=100, use_fft=use_fft)
+
+    assert convolver.convolve(model_data=model_data) == pytest.approx(
+        np.convolve(model_data, kernel, mode="same")
+    )
+
+
+@pytest.mark.parametrize(
+    "pixels, kernel_pixels, use_fft",
+    [(100, 3, False), (10000, 11, False), (10000, 1001, True), (100000, 3001, True)],
+)
+def test__convolver__use_fft_from_sizes(pixels, kernel_pixels, use_fft):
+    convolver = a.Convolver(kernel=np.ones(kernel_pixels), pixels=pixels)
+
+    assert convolver.use_fft is use_fft
+
+
+def test__convolver__timed__matches_np_convolve():
+    model_data = np.random.normal(size=100)
+    kernel = np.random.uniform(size=21)
+
+    convolver = a.Convolver(kernel=kernel, pixels=100, timed=True)
+
+    assert convolver.convolve(model_data=model_data) == pytest.approx(
+        np.convolve(model_data, kernel, mode="same")
+    )
+
+
+def test__convolver__kernel_larger_than_data__raises_value_error():
+    with pytest.raises(ValueError):
+        a.Convolver(kernel=np.ones(101), pixels=100)
@@ -0,0 +1,80 @@
+import logging
+import multiprocessing as mp
+from os import path
+import sys
+import time
+
+workspace_path = path.dirname(path.dirname(path.abspath(__file__)))
+
+sys.path.insert(0, path.join(workspace_path, "scripts", "overview", "complex"))
+
+from visualization import BackgroundVisualizer
+
+
+def _write_value(filename, value):
+    with open(filename, "w") as f:
+        f.write(str(value))
+
+
+def _read_value(filename, timeout=10.0):
+    """
+    Wait for a background plot to be written, returning the value it wrote.
+    """
+    start = time.time()
+
+    while time.time() - start < timeout:
+
+        if path.exists(filename):
+            with open(filename) as f:
+                value = f.read()
+            if value:
+                return int(value)
+
+        time.sleep(0.05)
+
+
+_values_plotted_in_this_process = []
+
+
+def _plot_only_in_this_process(value):
+    if mp.parent_process() is not None:
+        raise RuntimeError("The plot failed in the background process.")
+
+    _values_plotted_in_this_process.append(value)
+
+
+def test__plot__requests_within_interval__latest_request_is_plotted(tmp_path):
+    filename = str(tmp_path / "value.txt")
+
+    visualizer = BackgroundVisualizer(plot_function=_write_value, interval=0.5)
+
+    visualizer.plot(filename, 1)
+
+    assert _read_value(filename=filename) == 1
+
+    visualizer.plot(filename, 2)
+    visualizer.plot(filename, 3)
+
+    time.sleep(1.0)
+
+    assert _read_value(filename=filename) == 3
+
+    visualizer.close()
+
+
+def test__plot__background_process_stopped__plots_in_this_process(caplog):
+    visualizer = BackgroundVisualizer(plot_function=_plot_only_in_this_process)
+
+    visualizer.plot(1)
+    visualizer._process.join(timeout=10.0)
+
+    with caplog.at_level(logging.WARNING):
+        visualizer.plot(2)
+
+    assert "stopped" in caplog.text
+    assert _values_plotted_in_this_process == [2]
+    assert visualizer._process is None
+
+    visualizer.plot(3)
+
+    assert _values_plotted_in_this_process == [2, 3]
@@ -0,0 +1,154 @@
+import numpy as np
+from os import path
+import sys
+
+import pytest
+
+workspace_path = path.dirname(path.dirname(path.abspath(__file__)))
+
+sys.path.append(path.join(workspace_path, "scripts", "simulators"))
+
+import util
+
+
+@pytest.fixture(name="arrays")
+def make_arrays():
+    return {
+        "data": np.random.normal(loc=10.0, size=100),
+        "noise_map": np.full(100, 0.5),
+        "kernel": np.array([0.25, 0.5, 0.25]),
+    }
+
+
+def test__dataset_to_binary__dataset_from_binary__arrays_and_metadata_match(
+    tmp_path, arrays
+):
+    file_path = str(tmp_path / "dataset.bin")
+
+    util.dataset_to_binary(file_path=file_path, metadata={"name": "dataset"}, **arrays)
+
+    loaded_arrays, metadata = util.dataset_from_binary(file_path=file_path)
+
+    assert metadata == {"name": "dataset"}
+    assert set(loaded_arrays) == {"data", "noise_map", "kernel"}
+
+    for name, array in arrays.items():
+        assert (loaded_arrays[name] == array).all()
+        assert (
+            util.numpy_array_from_binary(file_path=file_path, name=name) == array
+        ).all()
+
+    with pytest.raises(KeyError):
+        util.numpy_array_from_binary(file_path=file_path, name="psf")
+
+
+def test__dataset_to_binary__big_endian_arrays__load_as_little_endian_with_same_values(
+    tmp_path, arrays
+):
+    file_path = str(tmp_path / "dataset.bin")
+
+    big_endian_arrays = {
+        name: array.astype(array.dtype.newbyteorder(">"))
+        for name, array in arrays.items()
+    }
+
+    util.dataset_to_binary(file_path=file_path, **big_endian_arrays)
+
+    loaded_arrays, _ = util.dataset_from_binary(file_path=file_path)
+
+    for name, array in arrays.items():
+        assert loaded_arrays[name].dtype.str == "<f8"
+        assert (loaded_arrays[name] == array).all()
+
+
+def test__bytes_from_arrays__arrays_from_buffer__round_trip(arrays):
+    buffer = util.bytes_from_arrays(
+        arrays=arrays, metadata={"total": 3}, magic=b"AFTEST01"
+    )
+
+    assert len(buffer) % util.binary_alignment == 0
+
+    loaded_arrays, metadata = util.arrays_from_buffer(buffer=buffer, magic=b"AFTEST01")
+
+    assert metadata == {"total": 3}
+
+    for name, array in arrays.items():
+        assert (loaded_arrays[name] == array).all()
+
+    with pytest.raises(IOError):
+        util.arrays_from_buffer(buffer=buffer)
+
+
+def test__pack_datasets__catalog_loads_every_dataset_at_its_offset(tmp_path, arrays):
+    file_path = str(tmp_path / "datasets.bin")
+
+    datasets = [
+        (
+            f"dataset_{index}",
+            {**arrays, "data": arrays["data"] + index},
+            {"index": index},
+        )
+        for index in range(3)
+    ]
+
+    util.pack_datasets(datasets=datasets, file_path=file_path)
+
+    catalog = util.DatasetCatalog.from_json(file_path=str(tmp_path / "datasets.json"))
+
+    assert catalog.names == ["dataset_0", "dataset_1", "dataset_2"]
+    assert len(catalog.filter(lambda entry: entry["index"] > 0)) == 2
+
+    for (name, arrays, metadata), (loaded_name, loaded_arrays, loaded_metadata) in zip(
+        datasets, catalog.datasets()
+    ):
+        assert loaded_name == name
+        assert loaded_metadata == metadata
+        assert (loaded_arrays["data"] == arrays["data"]).all()
+
+    with pytest.raises(FileExistsError):
+        util.pack_datasets(datasets=datasets, file_path=file_path)
+
+
+def test__dataset_catalog__verify__big_endian_dataset_passes(tmp_path, arrays):
+    file_path = str(tmp_path / "datasets.bin")
+
+    catalog = util.pack_datasets(
+        datasets=[
+            (
+                "dataset",
+                {
+                    name: array.astype(array.dtype.newbyteorder(">"))
+                    for name, array in arrays.items()
+                },
+                None,
+            )
+        ],
+        file_path=file_path,
+    )
+
+    loaded_arrays, _ = catalog.dataset(name="dataset", verify=True)
+
+    assert (loaded_arrays["data"] == arrays["data"]).all()
+
+
+def test__dataset_catalog__verify__corrupted_dataset_raises_io_error(
+    tmp_path, arrays
+):
+    file_path = str(tmp_path / "datasets.bin")
+
+    catalog = util.pack_datasets(
+        datasets=[("dataset", arrays, None)], file_path=file_path
+    )
+
+    data_offset = util.header_from_binary(file_path=file_path)["arrays"]["data"][
+        "offset"
+    ]
+
+    with open(file_path, "r+b") as f:
+        f.seek(data_offset)
+        f.write(b"\xff" * 8)
+
+    catalog.dataset(name="dataset")
+
+    with pytest.raises(IOError):
+        catalog.dataset(name="dataset", verify=True)